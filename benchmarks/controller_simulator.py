@@ -0,0 +1,578 @@
+"""UniFi Network controller simulator for UniFi Hotspot Manager.
+
+In-process aiohttp stand-in for the controller endpoints used by the
+integration: login, self, self/sites, wlanconf, stat/voucher, cmd/hotspot
+and the event stream of a site. The number of vouchers, latency, error
+injection and session expiry are configurable, so the API client and the
+coordinator can be tested and benchmarked without a console.
+
+Run from the repository root with the test requirements installed:
+
+    python -m benchmarks.controller_simulator --port 8443 --vouchers 1000
+
+Or start it from a benchmark or test:
+
+    async with ControllerSimulator(SimulatorConfig(vouchers=1000)) as simulator:
+        client = UnifiVoucherApiClient(hass, host="127.0.0.1", port=simulator.port, ...)
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import contextlib
+import json
+import os
+import random
+import secrets
+import shutil
+import ssl
+import subprocess
+import tempfile
+import time
+
+from collections import Counter
+from dataclasses import (
+    dataclass,
+    field,
+)
+
+from aiohttp import (
+    WSMsgType,
+    web,
+)
+
+from benchmarks.voucher_memory import make_raw_vouchers
+
+SIMULATOR_USERNAME = "homeassistant"
+SIMULATOR_PASSWORD = "secret"
+
+
+@dataclass
+class SimulatorConfig:
+    """Configuration of the controller simulator."""
+
+    # HA generated and foreign vouchers per site
+    vouchers: int = 100
+    foreign_vouchers: int = 0
+    sites: tuple[str, ...] = ("default",)
+    guest_wlans: tuple[str, ...] = ("Guest",)
+    unifi_os: bool = True
+    username: str = SIMULATOR_USERNAME
+    password: str = SIMULATOR_PASSWORD
+    role: str = "admin"
+    # Seconds added to every response
+    latency: float = 0.0
+    # Share of requests answered with error_status instead
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Seconds until a session is rejected, None for sessions without expiry
+    session_lifetime: float | None = None
+    seed: int | None = None
+
+
+@dataclass
+class SimulatorStats:
+    """Requests served by the controller simulator."""
+
+    requests: Counter = field(default_factory=Counter)
+    logins: int = 0
+    errors: int = 0
+    rejected: int = 0
+
+
+class ControllerSimulator:
+    """In-process UniFi Network controller."""
+
+    def __init__(
+        self,
+        config: SimulatorConfig | None = None,
+    ) -> None:
+        """Initialize the simulator."""
+        self.config = config or SimulatorConfig()
+        self.stats = SimulatorStats()
+        self.port: int | None = None
+        self.vouchers: dict[str, dict[str, dict[str, any]]] = {
+            _site: self._make_vouchers(_site)
+            for _site in self.config.sites
+        }
+
+        self._random = random.Random(self.config.seed)
+        self._sessions: dict[str, float | None] = {}
+        self._websockets: dict[str, set[web.WebSocketResponse]] = {}
+        self._last_create_time = 0
+        self._tasks: set[asyncio.Task] = set()
+        self._runner: web.AppRunner | None = None
+        self._certificate_dir: tempfile.TemporaryDirectory | None = None
+
+    def _make_vouchers(
+        self,
+        site: str,
+    ) -> dict[str, dict[str, any]]:
+        """Create the initial vouchers of a site."""
+        _vouchers = {}
+        _raw = make_raw_vouchers(self.config.vouchers + self.config.foreign_vouchers)
+        for _i, _voucher in enumerate(_raw):
+            _voucher["_id"] = f"{site[:8]:0>8}{_i:016x}"
+            _voucher["site_id"] = site
+            if _i >= self.config.vouchers:
+                _voucher["note"] = f"Front desk {_i}"
+            _vouchers[_voucher["_id"]] = _voucher
+        return _vouchers
+
+    @property
+    def api_prefix(self) -> str:
+        """Return prefix of the API urls."""
+        return "/proxy/network/api" if self.config.unifi_os else "/api"
+
+    async def start(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> int:
+        """Start serving HTTPS, return the port."""
+        app = web.Application(middlewares=[self._middleware])
+        _prefix = self.api_prefix
+        _wss = "/proxy/network/wss" if self.config.unifi_os else "/wss"
+        app.router.add_get("/", self._handle_root)
+        app.router.add_post(
+            "/api/auth/login" if self.config.unifi_os else "/api/login",
+            self._handle_login,
+        )
+        app.router.add_get(f"{_prefix}/self", self._handle_self)
+        app.router.add_get(f"{_prefix}/self/sites", self._handle_sites)
+        app.router.add_get(f"{_prefix}/s/{{site}}/rest/wlanconf", self._handle_wlans)
+        app.router.add_route("*", f"{_prefix}/s/{{site}}/stat/voucher", self._handle_vouchers)
+        app.router.add_post(f"{_prefix}/s/{{site}}/cmd/hotspot", self._handle_hotspot)
+        app.router.add_get(f"{_wss}/s/{{site}}/events", self._handle_events)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(
+            self._runner,
+            host,
+            port,
+            ssl_context=self._create_ssl_context(),
+        )
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        for _websockets in self._websockets.values():
+            for _websocket in list(_websockets):
+                await _websocket.close()
+
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+        if self._certificate_dir is not None:
+            self._certificate_dir.cleanup()
+            self._certificate_dir = None
+
+    async def __aenter__(self) -> ControllerSimulator:
+        """Start simulator."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        """Stop simulator."""
+        await self.stop()
+
+    def _create_ssl_context(self) -> ssl.SSLContext:
+        """Create TLS context with a self-signed certificate."""
+        self._certificate_dir = tempfile.TemporaryDirectory()
+        _cert = os.path.join(self._certificate_dir.name, "cert.pem")
+        _key = os.path.join(self._certificate_dir.name, "key.pem")
+        try:
+            _write_certificate_cryptography(_cert, _key)
+        except ImportError:
+            if (_openssl := shutil.which("openssl")) is None:
+                raise RuntimeError("Either cryptography or openssl is required") from None
+            subprocess.run(
+                [
+                    _openssl, "req", "-x509", "-nodes", "-newkey", "rsa:2048",
+                    "-days", "1", "-subj", "/CN=localhost",
+                    "-keyout", _key, "-out", _cert,
+                ],
+                check=True,
+                capture_output=True,
+            )
+
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(_cert, _key)
+        return context
+
+    @web.middleware
+    async def _middleware(
+        self,
+        request: web.Request,
+        handler,
+    ) -> web.StreamResponse:
+        """Add latency, inject errors and check the session."""
+        _resource = request.match_info.route.resource
+        self.stats.requests[
+            f"{request.method} {_resource.canonical if _resource else request.path}"
+        ] += 1
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+
+        if self.config.error_rate and self._random.random() < self.config.error_rate:
+            self.stats.errors += 1
+            return web.Response(status=self.config.error_status, text="Injected error")
+
+        if request.path != "/" and not request.path.endswith("login") and not self._is_authorized(request):
+            self.stats.rejected += 1
+            return _json_response(
+                _error("api.err.LoginRequired"),
+                status=401,
+            )
+
+        return await handler(request)
+
+    def _is_authorized(
+        self,
+        request: web.Request,
+    ) -> bool:
+        """Return True if the request has a valid session."""
+        _token = request.cookies.get("TOKEN") or request.cookies.get("unifises")
+        if _token not in self._sessions:
+            return False
+
+        if (_expires := self._sessions[_token]) is not None and time.time() >= _expires:
+            del self._sessions[_token]
+            return False
+
+        return True
+
+    def expire_sessions(self) -> None:
+        """Reject all current sessions, e.g. after a controller restart."""
+        self._sessions.clear()
+
+    async def _handle_root(
+        self,
+        request: web.Request,
+    ) -> web.Response:
+        """Answer UniFi OS detection."""
+        if self.config.unifi_os:
+            return web.Response(text="UniFi OS")
+        raise web.HTTPFound("/manage")
+
+    async def _handle_login(
+        self,
+        request: web.Request,
+    ) -> web.Response:
+        """Log in and set the session cookie."""
+        _auth = await request.json()
+        if (
+            _auth.get("username") != self.config.username
+            or _auth.get("password") != self.config.password
+        ):
+            return _json_response(_error("api.err.Invalid"), status=400)
+
+        self.stats.logins += 1
+        _expires = None
+        if self.config.session_lifetime is not None:
+            _expires = time.time() + self.config.session_lifetime
+
+        _token = secrets.token_hex(16)
+        if self.config.unifi_os:
+            # UniFi OS sends a JSON web token with exp claim
+            _payload = base64.urlsafe_b64encode(
+                json.dumps({"exp": int(_expires or time.time() + 86400)}).encode()
+            ).decode().rstrip("=")
+            _token = f"e30.{_payload}.{_token}"
+            _cookie = f"TOKEN={_token}; path=/; samesite=none; secure; httponly"
+        else:
+            _cookie = f"unifises={_token}; Path=/; Secure; HttpOnly"
+        self._sessions[_token] = _expires
+
+        response = _json_response(_ok([]))
+        response.headers["Set-Cookie"] = _cookie
+        response.headers["x-csrf-token"] = secrets.token_hex(8)
+        return response
+
+    async def _handle_self(
+        self,
+        request: web.Request,
+    ) -> web.Response:
+        """Return the logged in user."""
+        return _json_response(_ok([{"name": self.config.username}]))
+
+    async def _handle_sites(
+        self,
+        request: web.Request,
+    ) -> web.Response:
+        """Return all sites."""
+        return _json_response(
+            _ok(
+                [
+                    {
+                        "_id": f"{_site[:8]:0>8}{0:016x}",
+                        "name": _site,
+                        "desc": _site.capitalize(),
+                        "attr_hidden_id": _site,
+                        "attr_no_delete": _site == "default",
+                        "role": self.config.role,
+                    }
+                    for _site in self.config.sites
+                ]
+            )
+        )
+
+    async def _handle_wlans(
+        self,
+        request: web.Request,
+    ) -> web.Response:
+        """Return the WLANs of a site."""
+        if (_site := request.match_info["site"]) not in self.vouchers:
+            return _json_response(_error("api.err.NoSiteContext"), status=400)
+
+        return _json_response(
+            _ok(
+                [
+                    {
+                        "_id": f"{_i:024x}",
+                        "site_id": _site,
+                        "name": _name,
+                        "enabled": True,
+                        "is_guest": True,
+                    }
+                    for _i, _name in enumerate(self.config.guest_wlans)
+                ]
+            )
+        )
+
+    async def _handle_vouchers(
+        self,
+        request: web.Request,
+    ) -> web.Response:
+        """Return all vouchers of a site or the batch of one create time."""
+        if (_vouchers := self.vouchers.get(request.match_info["site"])) is None:
+            return _json_response(_error("api.err.NoSiteContext"), status=400)
+
+        if request.method == "POST" and request.can_read_body:
+            _create_time = (await request.json()).get("create_time")
+            return _json_response(
+                _ok(
+                    [
+                        _voucher
+                        for _voucher in _vouchers.values()
+                        if _voucher["create_time"] == _create_time
+                    ]
+                )
+            )
+
+        return _json_response(_ok(list(_vouchers.values())))
+
+    async def _handle_hotspot(
+        self,
+        request: web.Request,
+    ) -> web.Response:
+        """Create or delete vouchers."""
+        _site = request.match_info["site"]
+        if (_vouchers := self.vouchers.get(_site)) is None:
+            return _json_response(_error("api.err.NoSiteContext"), status=400)
+
+        _cmd = await request.json()
+        if _cmd.get("cmd") == "create-voucher":
+            # Every batch has its own create time
+            _create_time = max(int(time.time()), self._last_create_time + 1)
+            self._last_create_time = _create_time
+            _created = []
+            for _ in range(int(_cmd.get("n", 1))):
+                _voucher = {
+                    "_id": secrets.token_hex(12),
+                    "site_id": _site,
+                    "note": _cmd.get("note", ""),
+                    "code": f"{self._random.randrange(10**10):010d}",
+                    "quota": int(_cmd.get("quota", 0)),
+                    "duration": float(_cmd["expire_number"]) * int(_cmd.get("expire_unit", 1)),
+                    "qos_overwrite": any(_key in _cmd for _key in ("up", "down", "bytes")),
+                    "qos_usage_quota": int(_cmd.get("bytes", 0)),
+                    "qos_rate_max_up": int(_cmd.get("up", 0)),
+                    "qos_rate_max_down": int(_cmd.get("down", 0)),
+                    "used": 0,
+                    "create_time": _create_time,
+                    "admin_name": self.config.username,
+                    "status": "VALID_ONE" if int(_cmd.get("quota", 0)) == 1 else "VALID_MULTI",
+                    "status_expires": 0,
+                }
+                _vouchers[_voucher["_id"]] = _voucher
+                _created.append(_voucher)
+            self._publish(_site, "voucher:add", _created)
+            return _json_response(_ok([{"create_time": _create_time}]))
+
+        if _cmd.get("cmd") == "delete-voucher":
+            if (_voucher := _vouchers.pop(_cmd.get("_id"), None)) is not None:
+                self._publish(_site, "voucher:delete", [{"_id": _voucher["_id"]}])
+            return _json_response(_ok([]))
+
+        return _json_response(_error("api.err.InvalidArgs"), status=400)
+
+    def use_voucher(
+        self,
+        site: str,
+        obj_id: str,
+    ) -> None:
+        """Redeem a voucher by a guest, as the captive portal would."""
+        _voucher = self.vouchers[site][obj_id]
+        _now = int(time.time())
+        _voucher["used"] += 1
+        _voucher.setdefault("start_time", _now)
+        _voucher.setdefault("end_time", _now + int(_voucher["duration"]) * 60)
+        if _voucher["quota"] and _voucher["used"] >= _voucher["quota"]:
+            _voucher["status"] = "USED"
+        self._publish(
+            site,
+            "events",
+            [{"key": "EVT_HS_VoucherUsed", "voucher_code": _voucher["code"], "time": _now * 1000}],
+        )
+
+    async def _handle_events(
+        self,
+        request: web.Request,
+    ) -> web.WebSocketResponse:
+        """Stream events of a site."""
+        _site = request.match_info["site"]
+        websocket = web.WebSocketResponse(heartbeat=15)
+        await websocket.prepare(request)
+        self._websockets.setdefault(_site, set()).add(websocket)
+        try:
+            async for message in websocket:
+                if message.type is WSMsgType.ERROR:
+                    break
+        finally:
+            self._websockets[_site].discard(websocket)
+        return websocket
+
+    def _publish(
+        self,
+        site: str,
+        message: str,
+        data: list[dict[str, any]],
+    ) -> None:
+        """Send message to all event streams of a site."""
+        _text = json.dumps({"meta": {"rc": "ok", "message": message}, "data": data})
+        for _websocket in self._websockets.get(site, ()):
+            task = asyncio.get_running_loop().create_task(_websocket.send_str(_text))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+
+def _ok(data: list[dict[str, any]]) -> dict[str, any]:
+    """Return successful API response."""
+    return {"meta": {"rc": "ok"}, "data": data}
+
+
+def _error(msg: str) -> dict[str, any]:
+    """Return API error response."""
+    return {"meta": {"rc": "error", "msg": msg}, "data": []}
+
+
+def _json_response(
+    data: dict[str, any],
+    status: int = 200,
+) -> web.Response:
+    """Return JSON response as sent by the controller."""
+    return web.Response(
+        body=json.dumps(data).encode(),
+        status=status,
+        content_type="application/json",
+    )
+
+
+def _write_certificate_cryptography(
+    cert_path: str,
+    key_path: str,
+) -> None:
+    """Write self-signed certificate for localhost with cryptography."""
+    import datetime
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import (
+        hashes,
+        serialization,
+    )
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    _key = ec.generate_private_key(ec.SECP256R1())
+    _name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    _now = datetime.datetime.now(datetime.UTC)
+    _cert = (
+        x509.CertificateBuilder()
+        .subject_name(_name)
+        .issuer_name(_name)
+        .public_key(_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(_now - datetime.timedelta(minutes=1))
+        .not_valid_after(_now + datetime.timedelta(days=1))
+        .sign(_key, hashes.SHA256())
+    )
+    with open(cert_path, "wb") as _file:
+        _file.write(_cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as _file:
+        _file.write(
+            _key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption(),
+            )
+        )
+
+
+async def serve(
+    config: SimulatorConfig,
+    host: str,
+    port: int,
+) -> None:
+    """Serve until cancelled."""
+    simulator = ControllerSimulator(config)
+    await simulator.start(host, port)
+    print(  # noqa: T201
+        f"UniFi Network simulator on https://{host}:{simulator.port}, "
+        f"user {config.username!r}, password {config.password!r}, "
+        f"sites {', '.join(config.sites)}"
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+
+def main() -> None:
+    """Run the simulator from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8443, help="Port to listen on")
+    parser.add_argument("--vouchers", type=int, default=100, help="HA generated vouchers per site")
+    parser.add_argument("--foreign-vouchers", type=int, default=0, help="Other vouchers per site")
+    parser.add_argument("--sites", nargs="+", default=["default"], help="Site names")
+    parser.add_argument("--classic", action="store_true", help="Simulate a controller without UniFi OS")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests failing")
+    parser.add_argument("--error-status", type=int, default=503, help="HTTP status of injected errors")
+    parser.add_argument("--session-lifetime", type=float, default=None, help="Seconds until sessions expire")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for codes and injected errors")
+    args = parser.parse_args()
+
+    config = SimulatorConfig(
+        vouchers=args.vouchers,
+        foreign_vouchers=args.foreign_vouchers,
+        sites=tuple(args.sites),
+        unifi_os=not args.classic,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        session_lifetime=args.session_lifetime,
+        seed=args.seed,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(config, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Import time benchmark for UniFi Hotspot Manager.
+
+Measures with `python -X importtime` in a fresh interpreter per run how long
+the integration and its platforms take to import, which is paid at every
+start of Home Assistant, and how long Pillow takes, which is deferred until
+the first QR code with logo is rendered. Run from the repository root
+with the test requirements installed:
+
+    python -m benchmarks.import_time
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_REPEAT = 5
+
+# Imported before the integration, so their cost is not accounted to it
+PRELOAD_MODULES = (
+    "aiounifi",
+    "homeassistant.components.button",
+    "homeassistant.components.diagnostics",
+    "homeassistant.components.image",
+    "homeassistant.components.number",
+    "homeassistant.components.sensor",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+INTEGRATION_MODULES = (
+    "custom_components.unifi_voucher",
+    "custom_components.unifi_voucher.button",
+    "custom_components.unifi_voucher.image",
+    "custom_components.unifi_voucher.number",
+    "custom_components.unifi_voucher.sensor",
+    "custom_components.unifi_voucher.diagnostics",
+)
+# segno is imported by aiounifi anyway, Pillow is deferred to the first QR code with logo
+IMAGING_PRELOAD_MODULES = (
+    "segno",
+    "segno.helpers",
+)
+IMAGING_MODULES = (
+    "PIL.Image",
+)
+
+
+def import_time(
+    modules: tuple[str, ...],
+    preload: tuple[str, ...] = (),
+) -> tuple[float, set[str]]:
+    """Import modules in a fresh interpreter, return milliseconds and loaded top-level packages."""
+    _code = "import sys; "
+    _code += "".join(f"import {_module}; " for _module in preload)
+    _code += "print(' '.join(sys.modules)); "
+    _code += "".join(f"import {_module}; " for _module in modules)
+    _code += "print(' '.join(sys.modules))"
+    _process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _code],
+        capture_output=True,
+        check=True,
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+        text=True,
+    )
+    _preloaded, _loaded = (set(_line.split()) for _line in _process.stdout.splitlines())
+
+    # Sum up the cumulative time of the top-level imports after the preload,
+    # nested imports are indented below the importing module
+    _cumulative = 0
+    for _line in _process.stderr.splitlines():
+        if not _line.startswith("import time:"):
+            continue
+        _self, _total, _name = _line.removeprefix("import time:").split("|")
+        if _name.startswith("   ") or _name.strip() in _preloaded:
+            continue
+        if _total.strip().isdigit():
+            _cumulative += int(_total)
+
+    return _cumulative / 1000, {_module.partition(".")[0] for _module in _loaded - _preloaded}
+
+
+def measure(
+    name: str,
+    modules: tuple[str, ...],
+    preload: tuple[str, ...] = (),
+    repeat: int = DEFAULT_REPEAT,
+) -> dict[str, any]:
+    """Return import time of modules in the result format of the benchmark suite."""
+    _times = []
+    _loaded = set()
+    for _ in range(repeat):
+        _time, _loaded = import_time(modules, preload)
+        _times.append(_time)
+
+    return {
+        "benchmark": name,
+        "vouchers": None,
+        "repeat": repeat,
+        "wall_ms": {
+            "min": round(min(_times), 3),
+            "median": round(statistics.median(_times), 3),
+            "max": round(max(_times), 3),
+        },
+        "alloc_peak_kb": None,
+        "alloc_retained_kb": None,
+        "loop_block_max_ms": None,
+        "loop_block_total_ms": None,
+        "imaging_loaded": "PIL" in _loaded,
+    }
+
+
+def run(
+    repeat: int = DEFAULT_REPEAT,
+) -> list[dict[str, any]]:
+    """Run the import benchmarks."""
+    return [
+        measure("import_integration", INTEGRATION_MODULES, PRELOAD_MODULES, repeat),
+        measure("import_imaging", IMAGING_MODULES, IMAGING_PRELOAD_MODULES, repeat),
+    ]
+
+
+def main() -> None:
+    """Print the benchmark results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="Interpreter runs per benchmark",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print results as JSON",
+    )
+    args = parser.parse_args()
+
+    _results = run(args.repeat)
+    if args.json:
+        print(json.dumps(_results, indent=2))  # noqa: T201
+        return
+
+    print(f"{'benchmark':<22} {'median ms':>10} {'imaging loaded':>15}")  # noqa: T201
+    for _result in _results:
+        print(  # noqa: T201
+            f"{_result['benchmark']:<22} "
+            f"{_result['wall_ms']['median']:>10} "
+            f"{_result['imaging_loaded']!s:>15}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+"""Benchmark suite for UniFi Hotspot Manager.
+
+Runs the voucher fetch, list service, sensor attributes, QR code image and
+create/delete paths against the controller simulator and reports wall time,
+allocations and event loop blocking per benchmark. The import time of the
+integration and of the imaging stack is measured in fresh interpreters. Run from the repository
+root with the test requirements installed:
+
+    python -m benchmarks.integration --output results.json
+    python -m benchmarks.integration --compare results.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from collections.abc import (
+    Awaitable,
+    Callable,
+)
+from importlib.metadata import version
+
+from homeassistant.components.image import ImageEntityDescription
+from homeassistant.components.sensor import SensorEntityDescription
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_PORT,
+    CONF_USERNAME,
+    CONF_VERIFY_SSL,
+)
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_test_home_assistant,
+)
+
+from benchmarks import import_time
+from benchmarks.controller_simulator import (
+    ControllerSimulator,
+    SimulatorConfig,
+)
+from custom_components.unifi_voucher.const import (
+    DOMAIN,
+    ATTR_QR_CODE,
+    ATTR_VOUCHER,
+    CONF_SITE_ID,
+    CONF_WLAN_NAME,
+    CONF_QRCODE_LOGO_PATH,
+    CONF_QRCODE_FORMAT,
+    DEFAULT_QRCODE_FORMAT,
+)
+from custom_components.unifi_voucher.coordinator import UnifiVoucherCoordinator
+from custom_components.unifi_voucher.image import UnifiVoucherImage
+from custom_components.unifi_voucher.qrcode import UnifiVoucherQrCodeCache
+from custom_components.unifi_voucher.sensor import UnifiVoucherSensor
+from custom_components.unifi_voucher.services import (
+    async_setup_services,
+    async_unload_services,
+)
+
+DEFAULT_COUNTS = (1000, 10000, 100000)
+DEFAULT_REPEAT = 5
+# Share of vouchers on the site not created by HA
+FOREIGN_VOUCHER_RATIO = 0.5
+
+
+class LoopBlockMonitor:
+    """Measure how long the event loop is blocked.
+
+    A task sleeps for interval and adds up how much later than scheduled it
+    wakes up, i.e. the time other code held the event loop.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.001,
+    ) -> None:
+        """Initialize the monitor."""
+        self.interval = interval
+        self.max_block = 0.0
+        self.total_block = 0.0
+        self._task: asyncio.Task | None = None
+
+    async def _run(self) -> None:
+        """Measure wake-up delays until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            _start = loop.time()
+            await asyncio.sleep(self.interval)
+            if (_block := loop.time() - _start - self.interval) > 0:
+                self.max_block = max(self.max_block, _block)
+                self.total_block += _block
+
+    async def __aenter__(self) -> LoopBlockMonitor:
+        """Start measuring."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        # Let the monitor take its first timestamp
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        """Stop measuring."""
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+
+
+async def measure(
+    name: str,
+    func: Callable[[], Awaitable],
+    repeat: int = DEFAULT_REPEAT,
+    vouchers: int | None = None,
+    setup: Callable[[], Awaitable] | None = None,
+) -> dict[str, any]:
+    """Run func repeatedly and return wall time, allocations and loop blocking.
+
+    Allocations are measured in a separate run, as tracing slows down the
+    timed runs.
+    """
+    _wall = []
+    _max_block = []
+    _total_block = []
+    for _ in range(repeat):
+        if setup is not None:
+            await setup()
+        gc.collect()
+        async with LoopBlockMonitor() as monitor:
+            _start = time.perf_counter()
+            await func()
+            _wall.append(time.perf_counter() - _start)
+        _max_block.append(monitor.max_block)
+        _total_block.append(monitor.total_block)
+
+    if setup is not None:
+        await setup()
+    gc.collect()
+    tracemalloc.start()
+    _before, _ = tracemalloc.get_traced_memory()
+    await func()
+    _after, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "benchmark": name,
+        "vouchers": vouchers,
+        "repeat": repeat,
+        "wall_ms": {
+            "min": round(min(_wall) * 1000, 3),
+            "median": round(statistics.median(_wall) * 1000, 3),
+            "max": round(max(_wall) * 1000, 3),
+        },
+        "alloc_peak_kb": round((_peak - _before) / 1024, 1),
+        "alloc_retained_kb": round((_after - _before) / 1024, 1),
+        "loop_block_max_ms": round(max(_max_block) * 1000, 3),
+        "loop_block_total_ms": round(statistics.median(_total_block) * 1000, 3),
+    }
+
+
+def _create_config_entry(
+    port: int,
+    logo_path: str = "",
+    qrcode_format: str = DEFAULT_QRCODE_FORMAT,
+) -> MockConfigEntry:
+    """Create config entry for the simulator."""
+    simulator_config = SimulatorConfig()
+    return MockConfigEntry(
+        domain=DOMAIN,
+        title="Benchmark",
+        data={
+            CONF_HOST: "127.0.0.1",
+            CONF_USERNAME: simulator_config.username,
+            CONF_PASSWORD: simulator_config.password,
+            CONF_PORT: port,
+            CONF_SITE_ID: "default",
+            CONF_VERIFY_SSL: False,
+        },
+        options={
+            CONF_WLAN_NAME: "Guest",
+            CONF_QRCODE_LOGO_PATH: logo_path,
+            CONF_QRCODE_FORMAT: qrcode_format,
+        },
+    )
+
+
+def _create_logo(
+    path: str,
+) -> None:
+    """Write a logo image for the QR code."""
+    from PIL import Image
+
+    Image.new("RGBA", (256, 256), (0, 111, 255, 255)).save(path)
+
+
+async def _run_count(
+    hass,
+    count: int,
+    repeat: int,
+) -> list[dict[str, any]]:
+    """Run the benchmarks depending on the number of vouchers."""
+    _results = []
+    simulator_config = SimulatorConfig(
+        vouchers=count,
+        foreign_vouchers=int(count * FOREIGN_VOUCHER_RATIO),
+        seed=0,
+    )
+    async with ControllerSimulator(simulator_config) as simulator:
+        entry = _create_config_entry(simulator.port)
+        entry.add_to_hass(hass)
+        coordinator = UnifiVoucherCoordinator(hass, entry)
+        entry.runtime_data = coordinator
+        await coordinator.initialize()
+
+        async def _reset_snapshot() -> None:
+            """Forget the snapshot, so the next fetch builds it from scratch."""
+            coordinator.vouchers = {}
+            coordinator.index.rebuild({})
+            coordinator._fingerprints = {}
+            coordinator._reconcile_time = None
+
+        async def _fetch() -> None:
+            # Bypass the freshness window of the fetch
+            await coordinator.async_fetch_vouchers(force=True)
+
+        _results.append(
+            await measure("fetch_initial", _fetch, repeat, count, setup=_reset_snapshot)
+        )
+        _results.append(await measure("fetch_unchanged", _fetch, repeat, count))
+
+        async_setup_services(hass, coordinator)
+
+        async def _list() -> None:
+            await hass.services.async_call(
+                DOMAIN, "list", {}, blocking=True, return_response=True
+            )
+
+        async def _list_by_status() -> None:
+            await hass.services.async_call(
+                DOMAIN, "list", {"status": "VALID_ONE"}, blocking=True, return_response=True
+            )
+
+        _results.append(await measure("service_list", _list, repeat, count))
+        _results.append(await measure("service_list_status", _list_by_status, repeat, count))
+
+        sensor = UnifiVoucherSensor(
+            coordinator=coordinator,
+            entity_description=SensorEntityDescription(key=ATTR_VOUCHER),
+        )
+
+        async def _sensor_attributes() -> None:
+            sensor._update_extra_state_attributes()
+
+        _results.append(
+            await measure("sensor_attributes", _sensor_attributes, repeat, count)
+        )
+
+        async def _create_delete() -> None:
+            await coordinator.async_create_voucher(number=1, note="benchmark")
+            await coordinator.async_delete_voucher()
+
+        _results.append(await measure("create_delete", _create_delete, repeat, count))
+
+        async_unload_services(hass)
+        await coordinator.client.async_close()
+
+    return _results
+
+
+async def _run_image(
+    hass,
+    repeat: int,
+) -> list[dict[str, any]]:
+    """Run the QR code benchmarks, with and without logo and in every output format."""
+    _results = []
+    with tempfile.TemporaryDirectory() as _dir:
+        _logo_path = os.path.join(_dir, "logo.png")
+        _create_logo(_logo_path)
+        for _name, _path, _format in (
+            ("image", "", "png"),
+            ("image_svg", "", "svg"),
+            ("image_logo", _logo_path, "png"),
+            ("image_logo_png_optimized", _logo_path, "png_optimized"),
+            ("image_logo_svg", _logo_path, "svg"),
+            ("image_logo_webp", _logo_path, "webp"),
+        ):
+            entry = _create_config_entry(0, _path, _format)
+            entry.add_to_hass(hass)
+            coordinator = UnifiVoucherCoordinator(hass, entry)
+            image = UnifiVoucherImage(
+                coordinator=coordinator,
+                entity_description=ImageEntityDescription(key=ATTR_QR_CODE),
+            )
+            image.hass = hass
+
+            async def _clear_cache() -> None:
+                UnifiVoucherQrCodeCache.get(hass).clear()
+
+            async def _clear_images() -> None:
+                UnifiVoucherQrCodeCache.get(hass).clear(logos=False)
+
+            _results.append(
+                await measure(_name, image.async_image, repeat, setup=_clear_cache)
+            )
+            if _name == "image_logo":
+                # Logo is decoded already, e.g. after the WLAN name changed
+                _results.append(
+                    await measure(f"{_name}_decoded", image.async_image, repeat, setup=_clear_images)
+                )
+            _results.append(await measure(f"{_name}_cached", image.async_image, repeat))
+            await coordinator.client.async_close()
+
+    return _results
+
+
+async def run(
+    counts: tuple[int, ...] = DEFAULT_COUNTS,
+    repeat: int = DEFAULT_REPEAT,
+) -> dict[str, any]:
+    """Run all benchmarks and return the results."""
+    _results = []
+    async with async_test_home_assistant() as hass:
+        for _count in counts:
+            _results.extend(await _run_count(hass, _count, repeat))
+        _results.extend(await _run_image(hass, repeat))
+    _results.extend(import_time.run(repeat))
+
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "homeassistant": version("homeassistant"),
+            "aiounifi": version("aiounifi"),
+            "integration": _integration_version(),
+        },
+        "results": _results,
+    }
+
+
+def _integration_version() -> str:
+    """Return the version of the integration from the manifest."""
+    with open(
+        os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "custom_components",
+            DOMAIN,
+            "manifest.json",
+        ),
+        encoding="utf-8",
+    ) as _file:
+        return json.load(_file)["version"]
+
+
+def _key(result: dict[str, any]) -> tuple[str, int | None]:
+    """Return key to match results of two runs."""
+    return (result["benchmark"], result["vouchers"])
+
+
+def compare(
+    previous: dict[str, any],
+    current: dict[str, any],
+) -> list[dict[str, any]]:
+    """Return the relative change of the median wall time per benchmark."""
+    _previous = {_key(_result): _result for _result in previous["results"]}
+    _changes = []
+    for _result in current["results"]:
+        if (_before := _previous.get(_key(_result))) is None:
+            continue
+
+        _old = _before["wall_ms"]["median"]
+        _new = _result["wall_ms"]["median"]
+        _changes.append(
+            {
+                "benchmark": _result["benchmark"],
+                "vouchers": _result["vouchers"],
+                "previous_ms": _old,
+                "current_ms": _new,
+                "change": round((_new - _old) / _old, 3) if _old else None,
+            }
+        )
+    return _changes
+
+
+def main() -> None:
+    """Print or store the benchmark results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--counts",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_COUNTS),
+        help="Number of HA generated vouchers per run",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=DEFAULT_REPEAT,
+        help="Timed runs per benchmark",
+    )
+    parser.add_argument(
+        "--output",
+        help="Store results as JSON file",
+    )
+    parser.add_argument(
+        "--compare",
+        help="Compare with results of a previous run",
+    )
+    args = parser.parse_args()
+
+    _results = asyncio.run(run(tuple(args.counts), args.repeat))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as _file:
+            json.dump(_results, _file, indent=2)
+
+    print(  # noqa: T201
+        f"{'benchmark':<22} {'vouchers':>9} {'median ms':>10} {'peak KiB':>10} {'block ms':>9}"
+    )
+    for _result in _results["results"]:
+        # Import benchmarks have no allocations and loop blocking
+        print(  # noqa: T201
+            f"{_result['benchmark']:<22} "
+            f"{_result['vouchers'] or '':>9} "
+            f"{_result['wall_ms']['median']:>10} "
+            f"{_result['alloc_peak_kb'] if _result['alloc_peak_kb'] is not None else '':>10} "
+            f"{_result['loop_block_max_ms'] if _result['loop_block_max_ms'] is not None else '':>9}"
+        )
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as _file:
+            _changes = compare(json.load(_file), _results)
+        print()  # noqa: T201
+        for _change in _changes:
+            print(  # noqa: T201
+                f"{_change['benchmark']:<22} "
+                f"{_change['vouchers'] or '':>9} "
+                f"{_change['previous_ms']:>10} -> {_change['current_ms']:>10} "
+                f"({_change['change']:+.1%})"
+                if _change["change"] is not None
+                else f"{_change['benchmark']:<22} n/a"
+            )
+
+
+if __name__ == "__main__":
+    main()
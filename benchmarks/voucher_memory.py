@@ -0,0 +1,138 @@
+"""Memory benchmark for the voucher snapshot of UniFi Hotspot Manager.
+
+Compares the bytes per voucher of the former dict representation with
+VoucherRecord. Run from the repository root with the test requirements
+installed:
+
+    python -m benchmarks.voucher_memory
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import tracemalloc
+
+from aiounifi.models.voucher import Voucher
+
+from custom_components.unifi_voucher.const import DEFAULT_IDENTIFIER_STRING
+from custom_components.unifi_voucher.models import VoucherRecord
+
+DEFAULT_COUNTS = (1000, 10000, 100000)
+
+
+def make_raw_vouchers(count: int) -> list[dict[str, any]]:
+    """Create raw voucher payloads as returned by the controller."""
+    _raw = []
+    for _i in range(count):
+        _x = {
+            "_id": f"{_i:024x}",
+            "site_id": "5f0c0a8b4543a5559017060f",
+            "note": DEFAULT_IDENTIFIER_STRING if _i % 4 else f"{DEFAULT_IDENTIFIER_STRING}: Guest {_i}",
+            "code": f"{_i:010d}",
+            "quota": 1,
+            "duration": 1440.0,
+            "qos_overwrite": False,
+            "used": _i % 2,
+            "create_time": 1700000000.0 + _i,
+            "admin_name": "homeassistant",
+            "status": "VALID_ONE" if _i % 2 else "USED_MULTIPLE",
+            "status_expires": 0,
+        }
+        if _i % 2:
+            _x["start_time"] = 1700000000.0 + _i
+            _x["end_time"] = 1700086400.0 + _i
+        _raw.append(_x)
+    return _raw
+
+
+def as_legacy_dict(voucher: Voucher) -> dict[str, any]:
+    """Build the dict representation used before VoucherRecord."""
+    return {
+        "id": voucher.id,
+        "note": voucher.note,
+        "code": voucher.code,
+        "quota": voucher.quota,
+        "duration": voucher.duration,
+        "qos_overwrite": voucher.qos_overwrite,
+        "qos_usage_quota": voucher.qos_usage_quota,
+        "qos_rate_max_up": voucher.qos_rate_max_up,
+        "qos_rate_max_down": voucher.qos_rate_max_down,
+        "used": voucher.used,
+        "create_time": voucher.create_time,
+        "start_time": voucher.start_time,
+        "end_time": voucher.end_time,
+        "status": voucher.status,
+        "status_expires": voucher.status_expires,
+    }
+
+
+def measure(
+    raw: list[dict[str, any]],
+    factory: callable,
+) -> int:
+    """Return the bytes allocated by the snapshot built with factory."""
+    gc.collect()
+    tracemalloc.start()
+    _snapshot = {
+        _raw["_id"]: factory(Voucher(_raw))
+        for _raw in raw
+    }
+    _size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del _snapshot
+    return _size
+
+
+def run(
+    counts: tuple[int, ...] = DEFAULT_COUNTS,
+) -> list[dict[str, any]]:
+    """Run the benchmark and return one result per voucher count."""
+    _results = []
+    for _count in counts:
+        _raw = make_raw_vouchers(_count)
+        _dict_bytes = measure(_raw, as_legacy_dict)
+        _record_bytes = measure(_raw, VoucherRecord.from_voucher)
+        _results.append(
+            {
+                "vouchers": _count,
+                "dict_bytes_per_voucher": round(_dict_bytes / _count),
+                "record_bytes_per_voucher": round(_record_bytes / _count),
+            }
+        )
+    return _results
+
+
+def main() -> None:
+    """Print the benchmark results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--counts",
+        type=int,
+        nargs="+",
+        default=list(DEFAULT_COUNTS),
+        help="Number of vouchers per run",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="Print results as JSON",
+    )
+    args = parser.parse_args()
+
+    _results = run(tuple(args.counts))
+    if args.json:
+        print(json.dumps(_results, indent=2))  # noqa: T201
+        return
+
+    print(f"{'vouchers':>10} {'dict B/voucher':>16} {'record B/voucher':>18}")  # noqa: T201
+    for _result in _results:
+        print(  # noqa: T201
+            f"{_result['vouchers']:>10} "
+            f"{_result['dict_bytes_per_voucher']:>16} "
+            f"{_result['record_bytes_per_voucher']:>18}"
+        )
+
+
+if __name__ == "__main__":
+    main()
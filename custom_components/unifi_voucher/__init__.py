@@ -31,25 +31,44 @@ CONFIG_SCHEMA = cv.empty_config_schema(DOMAIN)
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up platform from a ConfigEntry."""
+    coordinator = UnifiVoucherCoordinator(
+        hass=hass,
+        config_entry=config_entry,
+    )
     try:
-        coordinator = UnifiVoucherCoordinator(
-            hass=hass,
-            config_entry=config_entry,
-        )
-        await coordinator.initialize()
-        await coordinator.async_config_entry_first_refresh()
+        # Restore last good vouchers immediately and revalidate them in background
+        if await coordinator.async_restore_snapshot():
+            coordinator.async_set_updated_data(coordinator.vouchers)
+            config_entry.async_create_background_task(
+                hass,
+                coordinator.async_revalidate(),
+                f"{DOMAIN}_revalidate_{config_entry.entry_id}",
+            )
+        else:
+            await coordinator.initialize()
+            await coordinator.async_config_entry_first_refresh()
 
     except (
         UnifiVoucherApiAuthenticationError,
         UnifiVoucherApiAccessError,
     ) as err:
+        await coordinator.client.async_close()
         raise ConfigEntryAuthFailed from err
 
     except Exception as err:
+        await coordinator.client.async_close()
         raise ConfigEntryNotReady from err
 
     config_entry.runtime_data = coordinator
     await hass.config_entries.async_forward_entry_setups(config_entry, PLATFORMS)
+    config_entry.async_on_unload(
+        coordinator.async_start_polling()
+    )
+    coordinator.async_update_push()
+    coordinator.async_update_voucher_qrcodes()
+    config_entry.async_on_unload(
+        coordinator.async_stop_push
+    )
     config_entry.async_on_unload(
         config_entry.add_update_listener(async_reload_entry)
     )
@@ -69,9 +88,23 @@ async def async_unload_entry(hass: HomeAssistant, config_entry: ConfigEntry) ->
     # Un-register services
     async_unload_services(hass)
 
+    # Release shared controller session
+    if unload_ok:
+        await config_entry.runtime_data.client.async_close()
+
     return unload_ok
 
 
+async def async_remove_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
+    """Remove a config entry."""
+    await UnifiVoucherCoordinator.async_remove_snapshot(hass, config_entry)
+
+
 async def async_reload_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
-    """Reload config entry."""
-    await hass.config_entries.async_reload(config_entry.entry_id)
+    """Reload config entry if connection settings changed, otherwise apply options."""
+    coordinator = config_entry.runtime_data
+    if coordinator.has_connection_changed():
+        await hass.config_entries.async_reload(config_entry.entry_id)
+        return
+
+    coordinator.async_apply_options()
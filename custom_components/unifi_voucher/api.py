@@ -2,8 +2,36 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import hashlib
+import json
+import random
+import time
 
-from aiohttp import CookieJar
+from bisect import bisect_left
+from collections import deque
+from email.utils import parsedate_to_datetime
+from http.cookies import (
+    CookieError,
+    SimpleCookie,
+)
+
+from collections.abc import (
+    Callable,
+    Coroutine,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import Self
+
+from aiohttp import (
+    ClientError,
+    CookieJar,
+    WSMsgType,
+    WSServerHandshakeError,
+)
 
 import aiounifi
 from aiounifi.models.configuration import Configuration
@@ -11,6 +39,10 @@ from aiounifi.models.api import (
     ApiRequest,
     TypedApiResponse,
 )
+from aiounifi.models.wlan import (
+    Wlan,
+    WlanListRequest,
+)
 
 from homeassistant.core import (
     callback,
@@ -20,9 +52,142 @@ from homeassistant.helpers import aiohttp_client
 
 from .const import (
     LOGGER,
+    DOMAIN,
+    DEFAULT_SITE_ID,
+    POLL_ALIGNMENT_WINDOW,
+    POLL_MAX_CONCURRENCY,
+    REQUEST_TIMEOUT,
+    SESSION_KEEPALIVE_INTERVAL,
+    SESSION_RENEW_MARGIN,
 )
 
 RETRY_TIMER = 15
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BACKOFF_MAX = 600
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+# Upper bounds in seconds of the latency histogram buckets
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS_RECENT_SAMPLES = 100
+METRICS_OPERATION_PATHS = {
+    "/stat/voucher": "list",
+    "/rest/wlanconf": "wlans",
+}
+METRICS_OPERATION_COMMANDS = {
+    "create-voucher": "create",
+    "delete-voucher": "delete",
+}
+
+# Errors which indicate that the controller is not reachable
+CONNECTION_ERRORS = (
+    TimeoutError,
+    aiounifi.BadGateway,
+    aiounifi.ServiceUnavailable,
+    aiounifi.RequestError,
+    aiounifi.ResponseError,
+)
+# Errors which indicate that the session or the credentials are rejected
+AUTHENTICATION_ERRORS = (
+    aiounifi.LoginRequired,
+    aiounifi.Unauthorized,
+    aiounifi.Forbidden,
+)
+
+
+@dataclass
+class UnifiVoucherListRequest(ApiRequest):
+    """Request object for voucher list."""
+
+    @classmethod
+    def create(
+        cls,
+        create_time: int | None = None,
+    ) -> Self:
+        """Create voucher list request.
+
+        :param create_time: only vouchers created at this timestamp (one batch)
+        """
+        if create_time is None:
+            return cls(
+                method="get",
+                path="/stat/voucher",
+            )
+
+        return cls(
+            method="post",
+            path="/stat/voucher",
+            data={
+                "create_time": create_time,
+            },
+        )
+
+
+@dataclass
+class UnifiVoucherSelfRequest(ApiRequest):
+    """Request object for the logged in user, used to keep the session alive."""
+
+    @classmethod
+    def create(cls) -> Self:
+        """Create self request."""
+        return cls(
+            method="get",
+            path="/self",
+        )
+
+    def full_path(self, site: str, is_unifi_os: bool) -> str:
+        """Url is not bound to a site."""
+        if is_unifi_os:
+            return f"/proxy/network/api{self.path}"
+        return f"/api{self.path}"
+
+
+@dataclass
+class UnifiVoucherSiteRequest(ApiRequest):
+    """Request object bound to a site of the shared controller session."""
+
+    site: str = DEFAULT_SITE_ID
+    # Digest of the previous response, an identical response is not decoded
+    previous_fingerprint: bytes | None = None
+    fingerprint: bytes | None = None
+    unchanged: bool = False
+    size: int | None = None
+
+    @classmethod
+    def create(
+        cls,
+        api_request: ApiRequest,
+        site: str,
+        fingerprint: bytes | None = None,
+    ) -> Self:
+        """Create request for the given site."""
+        return cls(
+            method=api_request.method,
+            path=api_request.path,
+            data=api_request.data,
+            site=site,
+            previous_fingerprint=fingerprint,
+        )
+
+    def full_path(self, site: str, is_unifi_os: bool) -> str:
+        """Create url to work with the bound site."""
+        return super().full_path(self.site, is_unifi_os)
+
+    def decode(self, raw: bytes) -> TypedApiResponse:
+        """Decode response, unless it is identical to the previous one."""
+        self.size = len(raw)
+        _fingerprint = hashlib.blake2b(raw, digest_size=16).digest()
+        if _fingerprint == self.previous_fingerprint:
+            self.fingerprint = _fingerprint
+            self.unchanged = True
+            return {}
+
+        data = super().decode(raw)
+        self.fingerprint = _fingerprint
+        return data
+
 
 class UnifiVoucherApiError(Exception):
     """Exception to indicate a general API error."""
@@ -32,6 +197,10 @@ class UnifiVoucherApiConnectionError(UnifiVoucherApiError):
     """Exception to indicate a connection error."""
 
 
+class UnifiVoucherApiCircuitOpenError(UnifiVoucherApiConnectionError):
+    """Exception to indicate that requests are rejected while the controller is down."""
+
+
 class UnifiVoucherApiAccessError(UnifiVoucherApiError):
     """Exception to indicate an access error."""
 
@@ -40,8 +209,266 @@ class UnifiVoucherApiAuthenticationError(UnifiVoucherApiError):
     """Exception to indicate an authentication error."""
 
 
-class UnifiVoucherApiClient:
-    """API Client."""
+class UnifiVoucherCircuitBreaker:
+    """Circuit breaker for the requests to one controller.
+
+    After failure_threshold consecutive connection errors the circuit opens and
+    requests fail fast. After an exponential backoff with jitter one trial
+    request is let through (half-open), which closes or reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        backoff_base: float = RETRY_TIMER,
+        backoff_max: float = BREAKER_BACKOFF_MAX,
+    ) -> None:
+        """Initialize the circuit breaker."""
+        self.failure_threshold = failure_threshold
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self._trial = False
+
+    def backoff(self) -> float:
+        """Return exponential backoff with jitter for the current number of trips."""
+        _delay = min(
+            self.backoff_max,
+            self.backoff_base * 2 ** max(self.trips - 1, 0),
+        )
+        # Equal jitter, so clients recovering at the same time spread out
+        return random.uniform(_delay / 2, _delay)
+
+    @property
+    def retry_in(self) -> float:
+        """Return seconds until the next request should be tried."""
+        if self.state == BREAKER_OPEN:
+            return max(self.retry_at - time.monotonic(), 0)
+
+        return self.backoff()
+
+    def before_request(self) -> None:
+        """Raise if the circuit does not allow a request now."""
+        if self.state == BREAKER_CLOSED:
+            return
+
+        if self.state == BREAKER_OPEN:
+            if time.monotonic() < self.retry_at:
+                raise UnifiVoucherApiCircuitOpenError
+
+            LOGGER.debug("Circuit half-open, trying UniFi Network again")
+            self.state = BREAKER_HALF_OPEN
+
+        # Only one trial request while half-open
+        if self._trial:
+            raise UnifiVoucherApiCircuitOpenError
+        self._trial = True
+
+    def record_success(self) -> None:
+        """Close the circuit after the controller responded."""
+        if self.state != BREAKER_CLOSED:
+            LOGGER.info("UniFi Network is reachable again, circuit closed")
+
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._trial = False
+
+    def record_failure(self) -> None:
+        """Count connection error and open the circuit if required."""
+        if self.state not in (BREAKER_CLOSED, BREAKER_HALF_OPEN):
+            # Requests started before the circuit opened must not extend the backoff
+            return
+
+        self.failures += 1
+        self._trial = False
+        if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trips += 1
+            self.state = BREAKER_OPEN
+            _delay = self.backoff()
+            self.retry_at = time.monotonic() + _delay
+            LOGGER.warning(
+                "UniFi Network not reachable, circuit open for %.0f seconds",
+                _delay,
+            )
+
+    async def __aenter__(self) -> Self:
+        """Enter request guarded by the circuit breaker."""
+        self.before_request()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> bool:
+        """Record the result of the request."""
+        if exc_type is None:
+            self.record_success()
+        elif issubclass(exc_type, CONNECTION_ERRORS):
+            self.record_failure()
+        elif issubclass(exc_type, asyncio.CancelledError):
+            # No result, let the next request try
+            self._trial = False
+        else:
+            # The controller responded, e.g. with an authentication error
+            self.record_success()
+        return False
+
+    def as_dict(self) -> dict[str, any]:
+        """Return state for diagnostics."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": (
+                round(self.retry_in, 1)
+                if self.state == BREAKER_OPEN
+                else None
+            ),
+        }
+
+
+@dataclass(slots=True)
+class UnifiVoucherOperationMetrics:
+    """Latency histogram, errors and payload sizes of one API operation."""
+
+    count: int = 0
+    total: float = 0.0
+    last: float | None = None
+    max: float = 0.0
+    buckets: list[int] = field(
+        default_factory=lambda: [0] * (len(METRICS_LATENCY_BUCKETS) + 1)
+    )
+    recent: deque[float] = field(
+        default_factory=lambda: deque(maxlen=METRICS_RECENT_SAMPLES)
+    )
+    errors: dict[str, int] = field(default_factory=dict)
+    payload_bytes: int = 0
+    payload_last: int | None = None
+    payload_max: int = 0
+
+    def percentile(
+        self,
+        percent: float,
+    ) -> float | None:
+        """Return percentile of the recent latencies in seconds."""
+        if not self.recent:
+            return None
+
+        _samples = sorted(self.recent)
+        return _samples[min(int(len(_samples) * percent / 100), len(_samples) - 1)]
+
+    def as_dict(self) -> dict[str, any]:
+        """Return metrics with latencies in milliseconds."""
+        return {
+            "count": self.count,
+            "errors": dict(self.errors),
+            "latency_ms": {
+                "last": _to_ms(self.last),
+                "mean": _to_ms(self.total / self.count if self.count else None),
+                "median": _to_ms(self.percentile(50)),
+                "p95": _to_ms(self.percentile(95)),
+                "max": _to_ms(self.max),
+            },
+            "histogram": {
+                (f"le_{round(_bound * 1000)}" if _bound is not None else "inf"): _count
+                for _bound, _count in zip(
+                    (*METRICS_LATENCY_BUCKETS, None),
+                    self.buckets,
+                )
+            },
+            "payload_bytes": {
+                "total": self.payload_bytes,
+                "last": self.payload_last,
+                "max": self.payload_max,
+            },
+        }
+
+
+class UnifiVoucherApiMetrics:
+    """Per-operation metrics of the requests made by an API client."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self.operations: dict[str, UnifiVoucherOperationMetrics] = {}
+        self._listeners: list[Callable[[], None]] = []
+
+    def record(
+        self,
+        operation: str,
+        duration: float | None,
+        error: Exception | None = None,
+        size: int | None = None,
+    ) -> None:
+        """Record one request of operation and notify listeners.
+
+        Duration is None if the request was not made, e.g. the circuit is
+        open, then only the error is counted.
+        """
+        _x = self.operations.setdefault(operation, UnifiVoucherOperationMetrics())
+        if duration is not None:
+            _x.count += 1
+            _x.total += duration
+            _x.last = duration
+            _x.max = max(_x.max, duration)
+            _x.buckets[bisect_left(METRICS_LATENCY_BUCKETS, duration)] += 1
+            _x.recent.append(duration)
+        if error is not None:
+            _name = type(error).__name__
+            _x.errors[_name] = _x.errors.get(_name, 0) + 1
+        if size is not None:
+            _x.payload_bytes += size
+            _x.payload_last = size
+            _x.payload_max = max(_x.payload_max, size)
+
+        for _listener in list(self._listeners):
+            _listener()
+
+    def get(
+        self,
+        operation: str,
+    ) -> UnifiVoucherOperationMetrics | None:
+        """Return metrics of operation, None if not yet requested."""
+        return self.operations.get(operation)
+
+    @property
+    def errors(self) -> dict[str, int]:
+        """Return error counters by exception class of all operations."""
+        _errors = {}
+        for _operation in self.operations.values():
+            for _name, _count in _operation.errors.items():
+                _errors[_name] = _errors.get(_name, 0) + _count
+        return _errors
+
+    @callback
+    def async_add_listener(
+        self,
+        update_callback: Callable[[], None],
+    ) -> Callable[[], None]:
+        """Listen for recorded requests, return callback to remove the listener."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the listener."""
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    def as_dict(self) -> dict[str, any]:
+        """Return metrics of all operations for diagnostics."""
+        return {
+            "errors": self.errors,
+            "operations": {
+                _operation: _metrics.as_dict()
+                for _operation, _metrics in self.operations.items()
+            },
+        }
+
+
+class UnifiVoucherApiConnection:
+    """Authenticated session to a UniFi Network controller."""
 
     def __init__(
         self,
@@ -50,35 +477,406 @@ class UnifiVoucherApiClient:
         username: str,
         password: str,
         port: int,
-        site_id: str,
         verify_ssl: bool,
+        shared: bool = False,
     ) -> None:
-        """Initialize the system."""
+        """Initialize the connection."""
         self.hass = hass
         self.host = host
+        self.references = 0
+        self._shared = shared
 
+        self._owns_session = False
         if verify_ssl:
-            session = aiohttp_client.async_get_clientsession(
+            self.session = aiohttp_client.async_get_clientsession(
                 hass,
             )
         else:
-            session = aiohttp_client.async_create_clientsession(
+            # Shared sessions are closed by the connection manager
+            self.session = aiohttp_client.async_create_clientsession(
                 hass,
                 verify_ssl=False,
+                auto_cleanup=not shared,
                 cookie_jar=CookieJar(unsafe=True),
             )
+            self._owns_session = shared
         self.controller = aiounifi.Controller(
             Configuration(
-                session,
+                self.session,
                 host=host,
                 username=username,
                 password=password,
                 port=port,
-                site=site_id,
+                site=DEFAULT_SITE_ID,
                 ssl_context=verify_ssl,
             )
         )
+        self._login_lock = asyncio.Lock()
+        self.logged_in = False
+        self.logins = 0
+        self.session_expires: float | None = None
+        self._session_cookie: str | None = None
+        self._last_activity = 0.0
+        self._keepalive_timer: asyncio.TimerHandle | None = None
+        self.breaker = UnifiVoucherCircuitBreaker()
+
+        self._refreshes: dict[str, tuple[float, Callable[[], Coroutine]]] = {}
+        self._refresh_timer: asyncio.TimerHandle | None = None
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self._refresh_semaphore = asyncio.Semaphore(POLL_MAX_CONCURRENCY)
+
+    async def login(
+        self,
+        force: bool = False,
+        logins: int | None = None,
+    ) -> bool:
+        """Log in once for all users of the connection, return True if logged in now.
+
+        A valid session is reused until the controller rejects it or it
+        expires within SESSION_RENEW_MARGIN seconds. A forced login is
+        skipped, if the connection logged in again since it counted logins,
+        e.g. for a concurrent request rejected with the same session.
+        """
+        async with self._login_lock:
+            if force and logins is not None and logins != self.logins:
+                return False
+
+            if self.session_valid and not force:
+                return False
+
+            self.logged_in = False
+            await self.controller.login()
+            self.logins += 1
+            self.logged_in = True
+            self.mark_active()
+            LOGGER.debug(
+                "Logged in to UniFi Network at %s, session expires %s",
+                self.host,
+                self.session_expires,
+            )
+
+        if self._shared:
+            self._async_schedule_keepalive()
+        return True
+
+    @property
+    def session_valid(self) -> bool:
+        """Return True if logged in and the session does not expire soon."""
+        if not self.logged_in:
+            return False
+
+        if self.session_expires is None:
+            return True
+
+        return self.session_expires - time.time() > SESSION_RENEW_MARGIN
+
+    def invalidate_session(self) -> None:
+        """Force a login with the next request, e.g. after it was rejected."""
+        self.logged_in = False
+
+    def mark_active(self) -> None:
+        """Note a successful request and track session cookie changes."""
+        self._last_activity = time.monotonic()
+
+        # aiounifi logs in again on its own if a request is rejected
+        _cookie = self.controller.connectivity.headers.get("Cookie")
+        if _cookie != self._session_cookie:
+            self._session_cookie = _cookie
+            self.session_expires = _get_session_expiry(_cookie)
+            self.logged_in = True
+
+    @callback
+    def _async_schedule_keepalive(self) -> None:
+        """Schedule the next keep-alive check."""
+        if self._keepalive_timer:
+            self._keepalive_timer.cancel()
+
+        self._keepalive_timer = self.hass.loop.call_later(
+            SESSION_KEEPALIVE_INTERVAL,
+            self._async_keepalive,
+        )
+
+    @callback
+    def _async_keepalive(self) -> None:
+        """Start keep-alive in the background."""
+        self._keepalive_timer = None
+        self.hass.async_create_background_task(
+            self._async_run_keepalive(),
+            f"unifi_voucher_keepalive_{self.host}",
+        )
+
+    async def _async_run_keepalive(self) -> None:
+        """Renew expiring session or touch an idle one."""
+        try:
+            if self.logged_in and not self.session_valid:
+                async with self.breaker, asyncio.timeout(REQUEST_TIMEOUT):
+                    await self.login()
+            elif (
+                self.logged_in
+                and time.monotonic() - self._last_activity >= SESSION_KEEPALIVE_INTERVAL
+            ):
+                async with self.breaker, asyncio.timeout(REQUEST_TIMEOUT):
+                    await self.controller.request(UnifiVoucherSelfRequest.create())
+                self.mark_active()
+        except (
+            UnifiVoucherApiError,
+            aiounifi.AiounifiException,
+            TimeoutError,
+        ) as err:
+            LOGGER.debug("Keep-alive of UniFi Network at %s failed: %s", self.host, err)
+            if isinstance(err, aiounifi.LoginRequired | aiounifi.Unauthorized):
+                self.invalidate_session()
+        finally:
+            if self.references > 0:
+                self._async_schedule_keepalive()
+
+    def update_password(
+        self,
+        password: str,
+    ) -> None:
+        """Update password, e.g. after a reauthentication."""
+        if self.controller.connectivity.config.password != password:
+            self.controller.connectivity.config.password = password
+            self.logged_in = False
+
+    @callback
+    def async_schedule_refresh(
+        self,
+        key: str,
+        interval: float,
+        refresh: Callable[[], Coroutine],
+    ) -> None:
+        """Schedule refresh of one site in interval seconds."""
+        self._refreshes[key] = (self.hass.loop.time() + interval, refresh)
+        self._async_schedule_refresh_timer()
+
+    @callback
+    def async_cancel_refresh(
+        self,
+        key: str,
+    ) -> None:
+        """Cancel scheduled refresh of one site."""
+        self._refreshes.pop(key, None)
+        self._async_schedule_refresh_timer()
+
+    @callback
+    def _async_schedule_refresh_timer(self) -> None:
+        """Schedule one wake-up for the refreshes due next.
+
+        The wake-up is delayed to the last refresh due within
+        POLL_ALIGNMENT_WINDOW of the next one, so no refresh runs early.
+        """
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
+        if self._refreshes:
+            _next = min(_due for _due, _refresh in self._refreshes.values())
+            self._refresh_timer = self.hass.loop.call_at(
+                max(
+                    _due
+                    for _due, _refresh in self._refreshes.values()
+                    if _due <= _next + POLL_ALIGNMENT_WINDOW
+                ),
+                self._async_run_refreshes,
+            )
+
+    @callback
+    def _async_run_refreshes(self) -> None:
+        """Run all refreshes due at once."""
+        self._refresh_timer = None
+        _now = self.hass.loop.time()
+        for _key, (_due, _refresh) in list(self._refreshes.items()):
+            if _due > _now:
+                continue
+
+            del self._refreshes[_key]
+            _task = self.hass.async_create_background_task(
+                self._async_run_refresh(_refresh),
+                f"unifi_voucher_refresh_{_key}",
+            )
+            self._refresh_tasks.add(_task)
+            _task.add_done_callback(self._refresh_tasks.discard)
+        self._async_schedule_refresh_timer()
+
+    async def _async_run_refresh(
+        self,
+        refresh: Callable[[], Coroutine],
+    ) -> None:
+        """Run refresh with bounded concurrency."""
+        async with self._refresh_semaphore:
+            await refresh()
+
+    async def async_close(self) -> None:
+        """Close session, if owned by the connection."""
+        if self._refresh_timer:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
+        for _task in self._refresh_tasks:
+            _task.cancel()
+        self._refresh_tasks.clear()
+
+        if self._keepalive_timer:
+            self._keepalive_timer.cancel()
+            self._keepalive_timer = None
+
+        if self._owns_session:
+            await self.session.close()
+
+
+class UnifiVoucherConnectionManager:
+    """Share one connection per host, port, username and SSL verification across config entries."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+    ) -> None:
+        """Initialize the manager."""
+        self.hass = hass
+        self.connections: dict[tuple[str, int, str, bool], UnifiVoucherApiConnection] = {}
+
+    @classmethod
+    def get(
+        cls,
+        hass: HomeAssistant,
+    ) -> UnifiVoucherConnectionManager:
+        """Get the connection manager of the integration."""
+        _data = hass.data.setdefault(DOMAIN, {})
+        if (manager := _data.get("connection_manager")) is None:
+            manager = _data["connection_manager"] = cls(hass)
+        return manager
+
+    def acquire(
+        self,
+        host: str,
+        username: str,
+        password: str,
+        port: int,
+        verify_ssl: bool,
+    ) -> UnifiVoucherApiConnection:
+        """Get shared connection and increase its reference count.
+
+        The password of an existing connection is kept, it is only changed by
+        update_password after the credentials have been verified.
+        """
+        _key = (host, port, username, verify_ssl)
+        if (connection := self.connections.get(_key)) is None:
+            connection = self.connections[_key] = UnifiVoucherApiConnection(
+                self.hass,
+                host=host,
+                username=username,
+                password=password,
+                port=port,
+                verify_ssl=verify_ssl,
+                shared=True,
+            )
+
+        connection.references += 1
+        return connection
+
+    def update_password(
+        self,
+        host: str,
+        username: str,
+        password: str,
+        port: int,
+        verify_ssl: bool,
+    ) -> None:
+        """Update password of a shared connection, e.g. after a reauthentication."""
+        if (connection := self.connections.get((host, port, username, verify_ssl))) is not None:
+            connection.update_password(password)
+
+    async def async_release(
+        self,
+        connection: UnifiVoucherApiConnection,
+    ) -> None:
+        """Decrease reference count and close the connection if unused."""
+        if connection not in self.connections.values():
+            return
+
+        connection.references -= 1
+        if connection.references > 0:
+            return
+
+        for _key, _connection in list(self.connections.items()):
+            if _connection is connection:
+                del self.connections[_key]
+        await connection.async_close()
+
+
+class UnifiVoucherApiClient:
+    """API Client."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        host: str,
+        username: str,
+        password: str,
+        port: int,
+        site_id: str,
+        verify_ssl: bool,
+        connection: UnifiVoucherApiConnection | None = None,
+    ) -> None:
+        """Initialize the system."""
+        self.hass = hass
+        self.host = host
+        self.site_id = site_id
+
+        if connection is None:
+            connection = UnifiVoucherApiConnection(
+                hass,
+                host=host,
+                username=username,
+                password=password,
+                port=port,
+                verify_ssl=verify_ssl,
+            )
+        self.connection = connection
+        self.controller = connection.controller
         self.available = True
+        self.metrics = UnifiVoucherApiMetrics()
+
+    async def login(
+        self,
+        force: bool = False,
+        logins: int | None = None,
+    ) -> None:
+        """Log in to the controller, if the connection is not yet logged in.
+
+        Logins are recorded as an operation of their own, failed ones too.
+        """
+        _start = time.perf_counter()
+        try:
+            async with asyncio.timeout(REQUEST_TIMEOUT):
+                _logged_in = await self.connection.login(force, logins)
+        except (
+            aiounifi.AiounifiException,
+            TimeoutError,
+        ) as err:
+            self._record_error("login", _start, _map_exception(err))
+            raise
+
+        if _logged_in:
+            self.metrics.record("login", time.perf_counter() - _start)
+
+    def _record_error(
+        self,
+        operation: str,
+        start: float | None,
+        error: Exception,
+    ) -> None:
+        """Record failed operation, with its duration if the request was made."""
+        self.metrics.record(
+            operation,
+            time.perf_counter() - start if start is not None else None,
+            error=error,
+        )
+
+    async def async_close(self) -> None:
+        """Release the connection."""
+        await UnifiVoucherConnectionManager.get(self.hass).async_release(self.connection)
 
     @callback
     def reconnect(self) -> None:
@@ -88,26 +886,30 @@ class UnifiVoucherApiClient:
 
     async def async_reconnect(self) -> None:
         """Try to reconnect UniFi Network session."""
+        breaker = self.connection.breaker
         try:
-            async with asyncio.timeout(5):
-                await self.controller.login()
+            async with breaker, asyncio.timeout(5):
+                await self.login(force=True)
         except (
             TimeoutError,
-            aiounifi.BadGateway,
-            aiounifi.ServiceUnavailable,
+            UnifiVoucherApiCircuitOpenError,
             aiounifi.AiounifiException,
         ):
-            self.hass.loop.call_later(RETRY_TIMER, self.reconnect)
+            self.hass.loop.call_later(breaker.retry_in, self.reconnect)
 
     async def get_sites(
         self,
     ) -> dict[str, any]:
         """Check the given API user."""
         _sites = {}
+        _start = None
         try:
-            async with asyncio.timeout(10):
-                await self.controller.login()
+            async with self.connection.breaker, asyncio.timeout(REQUEST_TIMEOUT):
+                await self.login()
+                _start = time.perf_counter()
                 await self.controller.sites.update()
+                self.connection.mark_active()
+                self.metrics.record("sites", time.perf_counter() - _start)
                 for _unique_id, _site in self.controller.sites.items():
                     # User must have admin or hotspot permissions
                     if _site.role in ("admin", "hotspot"):
@@ -121,6 +923,9 @@ class UnifiVoucherApiClient:
                     )
                     raise UnifiVoucherApiAccessError
                 return _sites
+        except UnifiVoucherApiError as err:
+            self._record_error("sites", _start, err)
+            raise
         except (
             aiounifi.LoginRequired,
             aiounifi.Unauthorized,
@@ -131,20 +936,21 @@ class UnifiVoucherApiClient:
                 self.host,
                 err,
             )
-            raise UnifiVoucherApiAuthenticationError from err
-        except (
-            TimeoutError,
-            aiounifi.BadGateway,
-            aiounifi.ServiceUnavailable,
-            aiounifi.RequestError,
-            aiounifi.ResponseError,
-        ) as err:
+            _error = UnifiVoucherApiAuthenticationError()
+            # Failed logins are recorded by login
+            if _start is not None:
+                self._record_error("sites", _start, _error)
+            raise _error from err
+        except CONNECTION_ERRORS as err:
             LOGGER.error(
                 "Error connecting to the UniFi Network at %s: %s",
                 self.host,
                 err,
             )
-            raise UnifiVoucherApiConnectionError from err
+            _error = UnifiVoucherApiConnectionError()
+            if _start is not None:
+                self._record_error("sites", _start, _error)
+            raise _error from err
         except (
             aiounifi.AiounifiException,
             Exception,
@@ -153,7 +959,10 @@ class UnifiVoucherApiClient:
                 "Unknown UniFi Network communication error occurred: %s",
                 err,
             )
-            raise UnifiVoucherApiError from err
+            _error = UnifiVoucherApiError()
+            if _start is not None:
+                self._record_error("sites", _start, _error)
+            raise _error from err
         return False
 
     async def get_guest_wlans(
@@ -161,11 +970,17 @@ class UnifiVoucherApiClient:
     ) -> list[str] | None:
         """Check the given API user."""
         _wlans = []
+        _start = None
         try:
-            async with asyncio.timeout(10):
-                await self.controller.login()
-                await self.controller.wlans.update()
-                for _wlan in self.controller.wlans.values():
+            async with self.connection.breaker, asyncio.timeout(REQUEST_TIMEOUT):
+                await self.login()
+                _start = time.perf_counter()
+                response = await self.controller.request(
+                    UnifiVoucherSiteRequest.create(WlanListRequest.create(), self.site_id)
+                )
+                self.connection.mark_active()
+                self.metrics.record("wlans", time.perf_counter() - _start)
+                for _wlan in map(Wlan, response.get("data", [])):
                     # Is flagged as guest WLAN
                     if _wlan.is_guest:
                         _wlans.append(_wlan.name)
@@ -174,6 +989,9 @@ class UnifiVoucherApiClient:
                 if len(_wlans) == 0:
                     return None
                 return _wlans
+        except UnifiVoucherApiError as err:
+            self._record_error("wlans", _start, err)
+            raise
         except (
             aiounifi.LoginRequired,
             aiounifi.Unauthorized,
@@ -184,20 +1002,21 @@ class UnifiVoucherApiClient:
                 self.host,
                 err,
             )
-            raise UnifiVoucherApiAuthenticationError from err
-        except (
-            TimeoutError,
-            aiounifi.BadGateway,
-            aiounifi.ServiceUnavailable,
-            aiounifi.RequestError,
-            aiounifi.ResponseError,
-        ) as err:
+            _error = UnifiVoucherApiAuthenticationError()
+            # Failed logins are recorded by login
+            if _start is not None:
+                self._record_error("wlans", _start, _error)
+            raise _error from err
+        except CONNECTION_ERRORS as err:
             LOGGER.error(
                 "Error connecting to the UniFi Network at %s: %s",
                 self.host,
                 err,
             )
-            raise UnifiVoucherApiConnectionError from err
+            _error = UnifiVoucherApiConnectionError()
+            if _start is not None:
+                self._record_error("wlans", _start, _error)
+            raise _error from err
         except (
             aiounifi.AiounifiException,
             Exception,
@@ -206,12 +1025,278 @@ class UnifiVoucherApiClient:
                 "Unknown UniFi Network communication error occurred: %s",
                 err,
             )
-            raise UnifiVoucherApiError from err
+            _error = UnifiVoucherApiError()
+            if _start is not None:
+                self._record_error("wlans", _start, _error)
+            raise _error from err
         return False
 
     async def request(
         self,
         api_request: ApiRequest,
     ) -> TypedApiResponse:
-        """Make a request to the API, retry login on failure."""
-        return await self.controller.request(api_request)
+        """Make a request to the API for the site of the client.
+
+        A request rejected by the controller is made once more after a new
+        login, as the session may have expired or the controller restarted.
+        """
+        if not isinstance(api_request, UnifiVoucherSiteRequest):
+            api_request = UnifiVoucherSiteRequest.create(api_request, self.site_id)
+
+        _operation = _get_operation(api_request)
+        _logins = self.connection.logins
+        try:
+            return await self._async_request(api_request, _operation)
+        except AUTHENTICATION_ERRORS as err:
+            if (_error := await self._async_check_login(_logins)) is not None:
+                raise _error from err
+
+        try:
+            return await self._async_request(api_request, _operation)
+        except AUTHENTICATION_ERRORS as err:
+            # Rejected with a new session, the credentials are valid though
+            raise UnifiVoucherApiConnectionError from err
+
+    async def _async_request(
+        self,
+        api_request: UnifiVoucherSiteRequest,
+        operation: str,
+    ) -> TypedApiResponse:
+        """Make one request, the aiounifi error is raised if the controller rejects it."""
+        _start = None
+        try:
+            async with self.connection.breaker:
+                # Renews the session only if rejected before or about to expire
+                await self.login()
+                # Without the login, it is recorded as an operation of its own
+                _start = time.perf_counter()
+                # A hung request must fail, so the circuit breaker can count it
+                async with asyncio.timeout(REQUEST_TIMEOUT):
+                    response = await self.controller.request(api_request)
+        except UnifiVoucherApiCircuitOpenError as err:
+            self._record_error(operation, None, err)
+            raise
+        except (
+            aiounifi.AiounifiException,
+            TimeoutError,
+        ) as err:
+            _error = _map_exception(err)
+            if _start is None:
+                # Login failed, with the stored credentials if rejected
+                raise _error from err
+
+            self._record_error(operation, _start, _error)
+            if isinstance(err, AUTHENTICATION_ERRORS):
+                raise
+            raise _error from err
+
+        self.connection.mark_active()
+        self.metrics.record(
+            operation,
+            time.perf_counter() - _start,
+            size=api_request.size,
+        )
+        return response
+
+    async def _async_check_login(
+        self,
+        logins: int,
+    ) -> UnifiVoucherApiError | None:
+        """Log in again after a rejected request, return the error if the login failed.
+
+        Only a failed login proves the credentials wrong, otherwise the
+        session was rejected, e.g. because it expired. Concurrent requests
+        rejected with the same session share one login, logins is the
+        number of logins of the connection before the request.
+        """
+        try:
+            await self.login(force=True, logins=logins)
+        except (
+            aiounifi.AiounifiException,
+            TimeoutError,
+        ) as err:
+            return _map_exception(err)
+
+        return None
+
+    async def websocket(
+        self,
+        callback: Callable[[dict[str, any]], None],
+        connected: Callable[[], None] | None = None,
+    ) -> None:
+        """Run the event stream of the site and pass decoded messages to callback.
+
+        Returns when the controller closes the stream. aiounifi only streams
+        the site of its configuration, so the stream is opened per site.
+        """
+        try:
+            async with self.connection.breaker:
+                await self.login()
+        except UnifiVoucherApiCircuitOpenError as err:
+            self._record_error("websocket", None, err)
+            raise
+        except (
+            aiounifi.AiounifiException,
+            TimeoutError,
+        ) as err:
+            if isinstance(err, AUTHENTICATION_ERRORS):
+                self.connection.invalidate_session()
+            raise _map_exception(err) from err
+
+        connectivity = self.controller.connectivity
+        _url = f"wss://{self.host}:{connectivity.config.port}"
+        _url += "/proxy/network" if connectivity.is_unifi_os else ""
+        _url += f"/wss/s/{self.site_id}/events"
+        _start = time.perf_counter()
+        _connected = False
+        try:
+            async with self.connection.session.ws_connect(
+                _url,
+                headers=connectivity.headers,
+                ssl=connectivity.config.ssl_context,
+                heartbeat=15,
+            ) as websocket:
+                _connected = True
+                self.connection.mark_active()
+                # Latency of the handshake, errors of the stream later
+                self.metrics.record("websocket", time.perf_counter() - _start)
+                if connected is not None:
+                    connected()
+
+                async for message in websocket:
+                    if message.type is WSMsgType.TEXT:
+                        try:
+                            _data = json.loads(message.data)
+                        except ValueError:
+                            LOGGER.debug("Invalid websocket message: %s", message.data)
+                            continue
+                        callback(_data)
+                    elif message.type is WSMsgType.ERROR:
+                        raise UnifiVoucherApiConnectionError(message.data)
+        except UnifiVoucherApiConnectionError as err:
+            self._record_error("websocket", None, err)
+            raise
+        except WSServerHandshakeError as err:
+            if err.status == 401:
+                self.connection.invalidate_session()
+            _error = UnifiVoucherApiConnectionError()
+            self._record_error("websocket", _start, _error)
+            raise _error from err
+        except (
+            ClientError,
+            TimeoutError,
+        ) as err:
+            _error = UnifiVoucherApiConnectionError()
+            self._record_error("websocket", None if _connected else _start, _error)
+            raise _error from err
+
+    async def list_vouchers(
+        self,
+        create_time: int | None = None,
+    ) -> list[dict[str, any]]:
+        """Get raw vouchers of the site or only of the batch created at create_time."""
+        response = await self.request(
+            UnifiVoucherListRequest.create(
+                create_time=create_time,
+            )
+        )
+        return response.get("data", [])
+
+    async def list_vouchers_if_changed(
+        self,
+        fingerprint: bytes | None,
+        create_time: int | None = None,
+    ) -> tuple[bytes | None, list[dict[str, any]] | None]:
+        """Get fingerprint and raw vouchers, None if the response matches fingerprint."""
+        _request = UnifiVoucherSiteRequest.create(
+            UnifiVoucherListRequest.create(
+                create_time=create_time,
+            ),
+            self.site_id,
+            fingerprint=fingerprint,
+        )
+        response = await self.request(_request)
+        if _request.unchanged:
+            return _request.fingerprint, None
+
+        return _request.fingerprint, response.get("data", [])
+
+
+def _map_exception(
+    err: Exception,
+) -> UnifiVoucherApiError:
+    """Return exception of the integration for an aiounifi exception."""
+    if isinstance(err, AUTHENTICATION_ERRORS):
+        return UnifiVoucherApiAuthenticationError()
+
+    if isinstance(err, CONNECTION_ERRORS):
+        return UnifiVoucherApiConnectionError()
+
+    return UnifiVoucherApiError()
+
+
+def _get_operation(
+    api_request: ApiRequest,
+) -> str:
+    """Return name of the operation of the request for the metrics."""
+    if isinstance(api_request.data, dict) and (
+        _operation := METRICS_OPERATION_COMMANDS.get(api_request.data.get("cmd"))
+    ):
+        return _operation
+
+    return METRICS_OPERATION_PATHS.get(api_request.path, api_request.path)
+
+
+def _to_ms(
+    seconds: float | None,
+) -> float | None:
+    """Return seconds as rounded milliseconds."""
+    if seconds is None:
+        return None
+
+    return round(seconds * 1000, 1)
+
+
+def _get_session_expiry(
+    cookie_header: str | None,
+) -> float | None:
+    """Return timestamp when the session cookie expires, None if unknown."""
+    if not cookie_header:
+        return None
+
+    try:
+        cookie = SimpleCookie(cookie_header)
+    except CookieError:
+        return None
+
+    _expiry = []
+    for morsel in cookie.values():
+        try:
+            if morsel["max-age"]:
+                _expiry.append(time.time() + int(morsel["max-age"]))
+            elif morsel["expires"]:
+                _expiry.append(parsedate_to_datetime(morsel["expires"]).timestamp())
+            elif (_exp := _get_jwt_expiry(morsel.value)) is not None:
+                # UniFi OS session token
+                _expiry.append(_exp)
+        except (TypeError, ValueError):
+            continue
+
+    return min(_expiry, default=None)
+
+
+def _get_jwt_expiry(
+    value: str,
+) -> float | None:
+    """Return exp claim of a JSON web token, None if value is no token."""
+    _parts = value.split(".")
+    if len(_parts) != 3:
+        return None
+
+    try:
+        _payload = base64.urlsafe_b64decode(_parts[1] + "=" * (-len(_parts[1]) % 4))
+        _exp = json.loads(_payload).get("exp")
+    except (ValueError, AttributeError):
+        return None
+
+    return float(_exp) if isinstance(_exp, int | float) else None
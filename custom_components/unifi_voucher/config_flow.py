@@ -39,7 +39,9 @@ from .const import (
     DEFAULT_PASSWORD,
     DEFAULT_PORT,
     DEFAULT_VERIFY_SSL,
+    DEFAULT_QRCODE_FORMAT,
     DEFAULT_VOUCHER,
+    QRCODE_FORMATS,
     CONF_SITE_ID,
     CONF_WLAN_NAME,
     CONF_VOUCHER_NUMBER,
@@ -50,9 +52,14 @@ from .const import (
     CONF_VOUCHER_RATE_MAX_DOWN,
     CONF_CREATE_IF_NONE_EXISTS,
     CONF_QRCODE_LOGO_PATH,
+    CONF_PUSH_UPDATES,
+    CONF_QRCODE_VOUCHER_URL,
+    CONF_QRCODE_VOUCHERS,
+    CONF_QRCODE_FORMAT,
 )
 from .api import (
     UnifiVoucherApiClient,
+    UnifiVoucherConnectionManager,
     UnifiVoucherApiAuthenticationError,
     UnifiVoucherApiAccessError,
     UnifiVoucherApiConnectionError,
@@ -209,6 +216,14 @@ class UnifiVoucherConfigFlow(ConfigFlow, domain=DOMAIN):
                 )
 
             if config_entry:
+                # Entries sharing the session of the controller use the verified password
+                UnifiVoucherConnectionManager.get(self.hass).update_password(
+                    host=self.data[CONF_HOST],
+                    username=self.data[CONF_USERNAME],
+                    password=self.data[CONF_PASSWORD],
+                    port=self.data[CONF_PORT],
+                    verify_ssl=self.data[CONF_VERIFY_SSL],
+                )
                 self.hass.config_entries.async_update_entry(
                     config_entry, data=self.data
                 )
@@ -275,6 +290,11 @@ class UnifiVoucherConfigFlow(ConfigFlow, domain=DOMAIN):
             if qrcode_logo_path and not os.path.isfile(qrcode_logo_path):
                 errors["base"] = "path_invalid"
 
+            qrcode_voucher_url = user_input.get(CONF_QRCODE_VOUCHER_URL, "").strip()
+
+            if qrcode_voucher_url and "{code}" not in qrcode_voucher_url:
+                errors["base"] = "voucher_url_invalid"
+
             if not errors:
                 # Input is valid, set data.
                 self.options.update(
@@ -288,6 +308,10 @@ class UnifiVoucherConfigFlow(ConfigFlow, domain=DOMAIN):
                         CONF_VOUCHER_RATE_MAX_DOWN: _set_option(user_input, CONF_VOUCHER_RATE_MAX_DOWN),
                         CONF_CREATE_IF_NONE_EXISTS: user_input.get(CONF_CREATE_IF_NONE_EXISTS, False),
                         CONF_QRCODE_LOGO_PATH: qrcode_logo_path,
+                        CONF_PUSH_UPDATES: user_input.get(CONF_PUSH_UPDATES, False),
+                        CONF_QRCODE_VOUCHER_URL: qrcode_voucher_url,
+                        CONF_QRCODE_VOUCHERS: user_input.get(CONF_QRCODE_VOUCHERS, False),
+                        CONF_QRCODE_FORMAT: user_input.get(CONF_QRCODE_FORMAT, DEFAULT_QRCODE_FORMAT),
                     }
                 )
                 # User is done, create the config entry.
@@ -421,6 +445,10 @@ class UnifiVoucherConfigFlow(ConfigFlow, domain=DOMAIN):
                         CONF_CREATE_IF_NONE_EXISTS,
                         default=(user_input or {}).get(CONF_CREATE_IF_NONE_EXISTS, False),
                     ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_PUSH_UPDATES,
+                        default=(user_input or {}).get(CONF_PUSH_UPDATES, False),
+                    ): selector.BooleanSelector(),
                     vol.Optional(
                         CONF_QRCODE_LOGO_PATH,
                         description={
@@ -431,6 +459,31 @@ class UnifiVoucherConfigFlow(ConfigFlow, domain=DOMAIN):
                             type=selector.TextSelectorType.TEXT
                         ),
                     ),
+                    vol.Optional(
+                        CONF_QRCODE_VOUCHER_URL,
+                        description={
+                            "suggested_value": (user_input or {}).get(CONF_QRCODE_VOUCHER_URL, ""),
+                        },
+                    ): selector.TextSelector(
+                        selector.TextSelectorConfig(
+                            type=selector.TextSelectorType.URL
+                        ),
+                    ),
+                    vol.Optional(
+                        CONF_QRCODE_VOUCHERS,
+                        default=(user_input or {}).get(CONF_QRCODE_VOUCHERS, False),
+                    ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_QRCODE_FORMAT,
+                        default=(user_input or {}).get(CONF_QRCODE_FORMAT, DEFAULT_QRCODE_FORMAT),
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=list(QRCODE_FORMATS),
+                            mode=selector.SelectSelectorMode.DROPDOWN,
+                            translation_key=CONF_QRCODE_FORMAT,
+                            multiple=False,
+                        )
+                    ),
                 }
             ),
             errors=errors,
@@ -518,6 +571,11 @@ class UnifiVoucherOptionsFlowHandler(OptionsFlow):
             if qrcode_logo_path and not os.path.isfile(qrcode_logo_path):
                 errors["base"] = "path_invalid"
 
+            qrcode_voucher_url = user_input.get(CONF_QRCODE_VOUCHER_URL, "").strip()
+
+            if qrcode_voucher_url and "{code}" not in qrcode_voucher_url:
+                errors["base"] = "voucher_url_invalid"
+
             if not errors:
                 # Input is valid, set data.
                 self.options.update(
@@ -531,6 +589,10 @@ class UnifiVoucherOptionsFlowHandler(OptionsFlow):
                         CONF_VOUCHER_RATE_MAX_DOWN: _set_option(user_input, CONF_VOUCHER_RATE_MAX_DOWN),
                         CONF_CREATE_IF_NONE_EXISTS: user_input.get(CONF_CREATE_IF_NONE_EXISTS, False),
                         CONF_QRCODE_LOGO_PATH: qrcode_logo_path,
+                        CONF_PUSH_UPDATES: user_input.get(CONF_PUSH_UPDATES, False),
+                        CONF_QRCODE_VOUCHER_URL: qrcode_voucher_url,
+                        CONF_QRCODE_VOUCHERS: user_input.get(CONF_QRCODE_VOUCHERS, False),
+                        CONF_QRCODE_FORMAT: user_input.get(CONF_QRCODE_FORMAT, DEFAULT_QRCODE_FORMAT),
                     }
                 )
                 # User is done, update the config entry.
@@ -644,6 +706,10 @@ class UnifiVoucherOptionsFlowHandler(OptionsFlow):
                         CONF_CREATE_IF_NONE_EXISTS,
                         default=(user_input or self.options or {}).get(CONF_CREATE_IF_NONE_EXISTS, False),
                     ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_PUSH_UPDATES,
+                        default=(user_input or self.options or {}).get(CONF_PUSH_UPDATES, False),
+                    ): selector.BooleanSelector(),
                     vol.Optional(
                         CONF_QRCODE_LOGO_PATH,
                         description={
@@ -654,6 +720,31 @@ class UnifiVoucherOptionsFlowHandler(OptionsFlow):
                             type=selector.TextSelectorType.TEXT
                         ),
                     ),
+                    vol.Optional(
+                        CONF_QRCODE_VOUCHER_URL,
+                        description={
+                            "suggested_value": (user_input or self.options or {}).get(CONF_QRCODE_VOUCHER_URL, ""),
+                        },
+                    ): selector.TextSelector(
+                        selector.TextSelectorConfig(
+                            type=selector.TextSelectorType.URL
+                        ),
+                    ),
+                    vol.Optional(
+                        CONF_QRCODE_VOUCHERS,
+                        default=(user_input or self.options or {}).get(CONF_QRCODE_VOUCHERS, False),
+                    ): selector.BooleanSelector(),
+                    vol.Optional(
+                        CONF_QRCODE_FORMAT,
+                        default=(user_input or self.options or {}).get(CONF_QRCODE_FORMAT, DEFAULT_QRCODE_FORMAT),
+                    ): selector.SelectSelector(
+                        selector.SelectSelectorConfig(
+                            options=list(QRCODE_FORMATS),
+                            mode=selector.SelectSelectorMode.DROPDOWN,
+                            translation_key=CONF_QRCODE_FORMAT,
+                            multiple=False,
+                        )
+                    ),
                 }
             ),
             errors=errors,
@@ -18,6 +18,55 @@ PLATFORMS = [
 ]
 
 UPDATE_INTERVAL = 300
+UPDATE_INTERVAL_MIN = 30
+UPDATE_INTERVAL_MAX = 1800
+UPDATE_DEADLINE_GRACE = 5
+FETCH_FRESHNESS = 2
+FETCH_RECONCILE_INTERVAL = 1800
+# Batches requested by an incremental fetch: the ones with vouchers in use or
+# with deadlines and the latest created ones, at most as many requests as take
+# about as long as one full list of 1000 vouchers with the controller simulator
+FETCH_INCREMENTAL_RECENT_BATCHES = 4
+FETCH_INCREMENTAL_MAX_BATCHES = 8
+POLL_ALIGNMENT_WINDOW = 10
+POLL_MAX_CONCURRENCY = 4
+# Seconds until a login or request is given up and counted as connection error
+REQUEST_TIMEOUT = 10
+SESSION_RENEW_MARGIN = 300
+SESSION_KEEPALIVE_INTERVAL = 600
+PUSH_REFRESH_DELAY = 2
+# Event stream messages with voucher objects and event key prefixes of hotspot and guest authorization events
+PUSH_VOUCHER_MESSAGES = ("voucher:add", "voucher:sync", "voucher:update")
+PUSH_VOUCHER_DELETE_MESSAGE = "voucher:delete"
+PUSH_EVENT_PREFIXES = ("EVT_HS_", "EVT_WG_")
+METRICS_UPDATE_DELAY = 1
+
+QRCODE_CACHE_SIZE = 32
+# Newest vouchers whose QR codes are rendered in background, they share the cache with all other QR codes
+QRCODE_PRERENDER_VOUCHERS = 16
+QRCODE_LOGO_CACHE_SIZE = 4
+# Larger jobs are rendered in batches in a process pool, which is shut down when idle
+QRCODE_PROCESS_POOL_MIN = 10
+QRCODE_BATCH_SIZE = 50
+QRCODE_MAX_CONCURRENCY = 2
+QRCODE_POOL_IDLE_TIMEOUT = 300
+# Output formats of QR codes with their content type
+QRCODE_FORMATS = {
+    "png": "image/png",
+    "png_optimized": "image/png",
+    "svg": "image/svg+xml",
+    "webp": "image/webp",
+}
+
+EVENT_PRINT_PROGRESS = f"{DOMAIN}_print_progress"
+EVENT_PROFILE_DONE = f"{DOMAIN}_profile_done"
+
+# Captures of the profiler
+PROFILE_CYCLE = "cycle"
+PROFILE_SERVICE_CALL = "service_call"
+
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
 
 CONF_SITE_ID = "site_id"
 CONF_WLAN_NAME = "wlan_name"
@@ -29,12 +78,19 @@ CONF_VOUCHER_RATE_MAX_UP = "voucher_rate_max_up"
 CONF_VOUCHER_RATE_MAX_DOWN = "voucher_rate_max_down"
 CONF_CREATE_IF_NONE_EXISTS = "create_if_none_exists"
 CONF_QRCODE_LOGO_PATH = "qrcode_logo_path"
+CONF_PUSH_UPDATES = "push_updates"
+CONF_QRCODE_VOUCHER_URL = "qrcode_voucher_url"
+CONF_QRCODE_VOUCHERS = "qrcode_vouchers"
+CONF_QRCODE_FORMAT = "qrcode_format"
 
 ATTR_EXTRA_STATE_ATTRIBUTES = "extra_state_attributes"
 ATTR_LAST_PULL = "last_pull"
+ATTR_STALE = "stale"
 ATTR_AVAILABLE = "available"
 ATTR_VOUCHER = "voucher"
 ATTR_QR_CODE = "qr_code"
+ATTR_VOUCHER_QR_CODE = "voucher_qr_code"
+ATTR_API_ERRORS = "api_errors"
 
 DEFAULT_IDENTIFIER_STRING = "HA-generated"
 DEFAULT_SITE_ID = "default"
@@ -43,6 +99,7 @@ DEFAULT_USERNAME = ""
 DEFAULT_PASSWORD = ""
 DEFAULT_PORT = 443
 DEFAULT_VERIFY_SSL = False
+DEFAULT_QRCODE_FORMAT = "png"
 DEFAULT_VOUCHER = {
     CONF_VOUCHER_NUMBER: {
         "default": 1,
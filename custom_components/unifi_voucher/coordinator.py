@@ -2,11 +2,29 @@
 from __future__ import annotations
 
 import asyncio
+import time
+import uuid
 
-from datetime import timedelta
+from collections.abc import (
+    Callable,
+    Iterable,
+)
+from contextlib import (
+    AbstractAsyncContextManager,
+    nullcontext,
+)
+
+from datetime import (
+    datetime,
+    timedelta,
+)
+from typing import TYPE_CHECKING
 from awesomeversion import AwesomeVersion
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import (
+    HomeAssistant,
+    callback,
+)
 from homeassistant.const import (
     __version__ as HAVERSION,
     CONF_HOST,
@@ -18,15 +36,17 @@ from homeassistant.const import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.exceptions import (
     ConfigEntryAuthFailed,
+    HomeAssistantError,
 )
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
 import homeassistant.util.dt as dt_util
 
-from aiounifi.interfaces.vouchers import Vouchers
 from aiounifi.models.voucher import (
+    Voucher,
     VoucherCreateRequest,
     VoucherDeleteRequest,
 )
@@ -35,6 +55,22 @@ from .const import (
     DOMAIN,
     LOGGER,
     UPDATE_INTERVAL,
+    UPDATE_INTERVAL_MIN,
+    UPDATE_INTERVAL_MAX,
+    UPDATE_DEADLINE_GRACE,
+    FETCH_FRESHNESS,
+    FETCH_RECONCILE_INTERVAL,
+    FETCH_INCREMENTAL_RECENT_BATCHES,
+    FETCH_INCREMENTAL_MAX_BATCHES,
+    PUSH_REFRESH_DELAY,
+    PUSH_VOUCHER_MESSAGES,
+    PUSH_VOUCHER_DELETE_MESSAGE,
+    PUSH_EVENT_PREFIXES,
+    EVENT_PRINT_PROGRESS,
+    EVENT_PROFILE_DONE,
+    PROFILE_CYCLE,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY,
     CONF_SITE_ID,
     CONF_WLAN_NAME,
     CONF_VOUCHER_NUMBER,
@@ -45,15 +81,42 @@ from .const import (
     CONF_VOUCHER_RATE_MAX_DOWN,
     CONF_CREATE_IF_NONE_EXISTS,
     CONF_QRCODE_LOGO_PATH,
+    CONF_PUSH_UPDATES,
+    CONF_QRCODE_VOUCHER_URL,
+    CONF_QRCODE_VOUCHERS,
+    CONF_QRCODE_FORMAT,
+    QRCODE_PRERENDER_VOUCHERS,
     DEFAULT_IDENTIFIER_STRING,
+    DEFAULT_QRCODE_FORMAT,
     DEFAULT_VOUCHER,
 )
+from .models import (
+    UnifiVoucherChangeSet,
+    VoucherIndex,
+    VoucherRecord,
+)
 from .api import (
     UnifiVoucherApiClient,
+    UnifiVoucherConnectionManager,
     UnifiVoucherApiAuthenticationError,
     UnifiVoucherApiAccessError,
     UnifiVoucherApiError,
 )
+from .qrcode import (
+    QrCodeRequest,
+    UnifiVoucherQrCodeCache,
+    UnifiVoucherQrCodeRenderer,
+)
+from .sheet import (
+    SHEET_DIRECTORY,
+    SheetVoucher,
+    UnifiVoucherSheet,
+    get_page,
+    get_page_count,
+)
+
+if TYPE_CHECKING:
+    from .profiler import UnifiVoucherProfiler
 
 
 # https://developers.home-assistant.io/docs/integration_fetching_data#coordinated-single-api-poll-for-data-for-all-entities
@@ -75,17 +138,22 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
                 logger=LOGGER,
                 name=DOMAIN,
                 config_entry=config_entry,
-                update_interval=update_interval,
+                update_interval=None,
+                always_update=False,
             )
         else:
             super().__init__(
                 hass=hass,
                 logger=LOGGER,
                 name=DOMAIN,
-                update_interval=update_interval,
+                update_interval=None,
+                always_update=False,
             )
         self.hass = hass
         self.config_entry = config_entry
+        # Refreshes are scheduled by the shared connection, so all sites of a controller poll together
+        self.refresh_interval = update_interval
+        self._polling = False
         self.client = UnifiVoucherApiClient(
             hass,
             host=config_entry.data.get(CONF_HOST),
@@ -94,11 +162,39 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
             port=int(config_entry.data.get(CONF_PORT)),
             site_id=config_entry.data.get(CONF_SITE_ID),
             verify_ssl=config_entry.data.get(CONF_VERIFY_SSL),
+            # Share authenticated session with all config entries of the same controller
+            connection=UnifiVoucherConnectionManager.get(hass).acquire(
+                host=config_entry.data.get(CONF_HOST),
+                username=config_entry.data.get(CONF_USERNAME),
+                password=config_entry.data.get(CONF_PASSWORD),
+                port=int(config_entry.data.get(CONF_PORT)),
+                verify_ssl=config_entry.data.get(CONF_VERIFY_SSL),
+            ),
         )
-        self.vouchers = {}
+        self.vouchers: dict[str, VoucherRecord] = {}
         self.latest_voucher_id = None
+        self.index = VoucherIndex()
+        self.last_changes = UnifiVoucherChangeSet()
         self._last_pull = None
         self._available = False
+        self._idle_interval = UPDATE_INTERVAL
+        self._fetch_task: asyncio.Task | None = None
+        self._fetch_time: float | None = None
+        self._reconcile_time: float | None = None
+        # Fingerprints of the responses the snapshot is built from, by batch create time (None for full list)
+        self._fingerprints: dict[int | None, bytes] = {}
+        self.fingerprint_hits = 0
+        self.fingerprint_misses = 0
+        self._store = self._get_store(hass, config_entry)
+        self._entry_data = dict(config_entry.data)
+        self.push_connected = False
+        self._push_task: asyncio.Task | None = None
+        self._push_refresh: asyncio.TimerHandle | None = None
+        self._pending_options = {}
+        self.stale = False
+        self.profiler: UnifiVoucherProfiler | None = None
+        self._qrcode_task: asyncio.Task | None = None
+        self._qrcode_pending = False
 
         self._loop = asyncio.get_event_loop()
         self._scheduled_update_listeners: asyncio.TimerHandle | None = None
@@ -108,16 +204,105 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
         """Return Self."""
         return self
 
+    @staticmethod
+    def _get_store(
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+    ) -> Store:
+        """Get storage of the voucher snapshot."""
+        return Store(
+            hass,
+            STORAGE_VERSION,
+            f"{DOMAIN}.{config_entry.entry_id}",
+        )
+
+    @classmethod
+    async def async_remove_snapshot(
+        cls,
+        hass: HomeAssistant,
+        config_entry: ConfigEntry,
+    ) -> None:
+        """Remove stored voucher snapshot."""
+        await cls._get_store(hass, config_entry).async_remove()
+
+    async def async_restore_snapshot(
+        self,
+    ) -> bool:
+        """Restore last good voucher snapshot from storage."""
+        try:
+            if (data := await self._store.async_load()) is None:
+                return False
+
+            _last_pull = (
+                dt_util.parse_datetime(data["last_pull"])
+                if data.get("last_pull") is not None
+                else None
+            )
+            _vouchers = {
+                _v["id"]: VoucherRecord.from_storage_dict(
+                    _v,
+                    # Naive local time like the times of the records
+                    datetime.fromtimestamp(_last_pull.timestamp()) if _last_pull else None,
+                )
+                for _v in data.get("vouchers", [])
+            }
+        except Exception as exception:
+            LOGGER.warning("Could not restore voucher snapshot: %s", exception)
+            return False
+
+        self.index.rebuild(_vouchers)
+        self.vouchers = _vouchers
+        self.latest_voucher_id = data.get("latest_voucher_id", self.index.latest_id)
+        if _last_pull is not None:
+            self._last_pull = _last_pull
+        self._available = True
+        self.stale = True
+        return True
+
+    @callback
+    def _snapshot_data(
+        self,
+    ) -> dict[str, any]:
+        """Return voucher snapshot for storage."""
+        return {
+            "latest_voucher_id": self.latest_voucher_id,
+            "last_pull": self._last_pull.isoformat() if self._last_pull else None,
+            "vouchers": [
+                voucher.as_storage_dict()
+                for voucher in self.vouchers.values()
+            ],
+        }
+
+    async def async_revalidate(
+        self,
+    ) -> None:
+        """Log in and refresh the restored voucher snapshot."""
+        try:
+            await self.initialize()
+        except Exception as exception:
+            LOGGER.warning(
+                "Could not connect to UniFi Network, keep restored vouchers: %s",
+                exception,
+            )
+            self.client.reconnect()
+            return
+
+        await self.async_refresh()
+
     async def _async_update_data(self):
         """Update data via library."""
-        self._available = False
+        # Restored vouchers remain available until the first successful update
+        self._available = self.stale
         try:
             # Update vouchers.
-            await self.async_fetch_vouchers()
+            changes = await self.async_fetch_vouchers()
+            self._available = True
 
             LOGGER.debug("_async_update_data")
-            LOGGER.debug(self.vouchers)
+            LOGGER.debug(changes)
 
+            # Returning the unchanged snapshot object lets the coordinator
+            # skip the listener dispatch (see always_update=False)
             return self.vouchers
         except (
             UnifiVoucherApiAuthenticationError,
@@ -137,6 +322,343 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
             lambda: self.async_update_listeners(),
         )
 
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners, measured while profiling."""
+        if self.profiler is None:
+            super().async_update_listeners()
+            return
+
+        with self.profiler.dispatch():
+            super().async_update_listeners()
+
+    def profile(
+        self,
+        kind: str,
+    ) -> AbstractAsyncContextManager:
+        """Return context to profile a coordinator cycle or service call, if profiling."""
+        if self.profiler is None:
+            return nullcontext()
+
+        return self.profiler.async_capture(kind)
+
+    @callback
+    def async_start_profile(
+        self,
+        count: int,
+        trace_memory: bool = False,
+        timeout: float = 900,
+    ) -> asyncio.Task[dict[str, any]]:
+        """Profile the next coordinator cycles and service calls in background.
+
+        The summary is fired as EVENT_PROFILE_DONE when the captures are
+        complete or after timeout, it is also the result of the returned task.
+        """
+        if self.profiler is not None:
+            raise HomeAssistantError("Profiling is already running")
+
+        # cProfile, pstats and tracemalloc are only loaded when profiling
+        from .profiler import UnifiVoucherProfiler
+
+        profiler = self.profiler = UnifiVoucherProfiler(
+            self.hass,
+            self.client.metrics,
+            count=count,
+            trace_memory=trace_memory,
+        )
+        profiler.start()
+        return self.config_entry.async_create_background_task(
+            self.hass,
+            self._async_run_profile(profiler, timeout),
+            f"{DOMAIN}_profile_{self.config_entry.entry_id}",
+        )
+
+    async def _async_run_profile(
+        self,
+        profiler: UnifiVoucherProfiler,
+        timeout: float,
+    ) -> dict[str, any]:
+        """Wait for the captures, write the profile, report and return it."""
+        try:
+            await profiler.async_wait(timeout)
+        finally:
+            self.profiler = None
+            _summary = await profiler.async_finish(self.config_entry.entry_id)
+
+        LOGGER.info("Profile of UniFi Hotspot Manager written to %s", _summary["file"])
+        _summary = {
+            "entry_id": self.config_entry.entry_id,
+            **_summary,
+        }
+        self.hass.bus.async_fire(EVENT_PROFILE_DONE, _summary)
+        return _summary
+
+    async def async_print_vouchers(
+        self,
+        vouchers: list[VoucherRecord],
+        kind: str = "pdf",
+        qrcodes: bool = True,
+        logo: bool = True,
+    ) -> dict[str, any]:
+        """Write printable sheet of vouchers page by page, return files."""
+        _entry_id = self.config_entry.entry_id
+        _pages = get_page_count(len(vouchers))
+        sheet = UnifiVoucherSheet(
+            # Unique per call, concurrent calls never write the same file
+            path=self.hass.config.path(
+                SHEET_DIRECTORY,
+                f"{DOMAIN}.{_entry_id}.{time.strftime('%Y%m%d-%H%M%S')}.{uuid.uuid4().hex[:8]}",
+            ),
+            kind=kind,
+            title=self.get_wlan_name() or self.get_entry_title(),
+            pages=_pages,
+            logo_path=self.get_qrcode_logo_path() if logo else None,
+        )
+        await self.hass.async_add_executor_job(
+            sheet.open,
+            UnifiVoucherQrCodeCache.get(self.hass),
+        )
+
+        try:
+            for _page in range(1, _pages + 1):
+                _vouchers = get_page(vouchers, _page)
+                _qrcodes = (
+                    # The sheet is composed with Pillow, which does not read SVG
+                    await self.async_get_voucher_qrcodes([voucher.id for voucher in _vouchers], kind="png")
+                    if qrcodes
+                    else {}
+                )
+                _file = await self.hass.async_add_executor_job(
+                    sheet.write_page,
+                    _page,
+                    [
+                        SheetVoucher.from_record(voucher, _qrcodes.get(voucher.id))
+                        for voucher in _vouchers
+                    ],
+                )
+                self.hass.bus.async_fire(
+                    EVENT_PRINT_PROGRESS,
+                    {
+                        "entry_id": _entry_id,
+                        "file": _file,
+                        "page": _page,
+                        "pages": _pages,
+                    },
+                )
+            await self.hass.async_add_executor_job(sheet.close)
+        except (Exception, asyncio.CancelledError):
+            # Do not leave incomplete sheets behind
+            await self.hass.async_add_executor_job(sheet.remove)
+            raise
+
+        LOGGER.info("Voucher sheet of UniFi Hotspot Manager written to %s", sheet.files)
+        return {
+            "files": sheet.files,
+            "pages": _pages,
+            "vouchers": len(vouchers),
+        }
+
+    @callback
+    def async_start_polling(
+        self,
+    ) -> Callable[[], None]:
+        """Start polling with the shared connection, return function to stop it."""
+        self._polling = True
+        self._schedule_poll()
+
+        @callback
+        def _async_stop_polling() -> None:
+            self._polling = False
+            self.client.connection.async_cancel_refresh(self.config_entry.entry_id)
+
+        return _async_stop_polling
+
+    @callback
+    def _schedule_poll(
+        self,
+    ) -> None:
+        """Schedule next refresh with the shared connection."""
+        if not self._polling:
+            return
+
+        self.client.connection.async_schedule_refresh(
+            self.config_entry.entry_id,
+            self.refresh_interval.total_seconds(),
+            self._async_poll,
+        )
+
+    async def _async_poll(
+        self,
+    ) -> None:
+        """Refresh vouchers and schedule next refresh."""
+        try:
+            await self.async_refresh()
+        finally:
+            self._schedule_poll()
+
+    @callback
+    def async_update_push(
+        self,
+    ) -> None:
+        """Start or stop push updates as configured in the options."""
+        if not self.get_entry_option(CONF_PUSH_UPDATES, False):
+            self.async_stop_push()
+            return
+
+        if self._push_task is None:
+            self._push_task = self.config_entry.async_create_background_task(
+                self.hass,
+                self._async_run_push(),
+                f"{DOMAIN}_push_{self.config_entry.entry_id}",
+            )
+
+    @callback
+    def async_stop_push(
+        self,
+    ) -> None:
+        """Stop push updates."""
+        if self._push_task is not None:
+            self._push_task.cancel()
+            self._push_task = None
+
+        if self._push_refresh is not None:
+            self._push_refresh.cancel()
+            self._push_refresh = None
+
+        self._async_set_push_connected(False)
+
+    async def _async_run_push(
+        self,
+    ) -> None:
+        """Keep the event stream of the site connected."""
+        try:
+            while True:
+                try:
+                    await self.client.websocket(
+                        self._async_handle_push_message,
+                        connected=lambda: self._async_set_push_connected(True),
+                    )
+                except UnifiVoucherApiError as exception:
+                    LOGGER.debug("UniFi Network event stream disconnected: %s", exception)
+                finally:
+                    self._async_set_push_connected(False)
+
+                # Reconnect with the backoff of the shared connection
+                await asyncio.sleep(self.client.connection.breaker.retry_in)
+        finally:
+            # Allow async_update_push to start the stream again
+            if self._push_task is asyncio.current_task():
+                self._push_task = None
+
+    @callback
+    def _async_set_push_connected(
+        self,
+        connected: bool,
+    ) -> None:
+        """Switch between push updates with reconciliation poll and polling."""
+        if connected == self.push_connected:
+            return
+
+        self.push_connected = connected
+        LOGGER.debug("Push updates %s", "connected" if connected else "disconnected")
+        if connected:
+            # Catch up with the changes missed while disconnected
+            self._async_schedule_push_refresh()
+        else:
+            self.refresh_interval = timedelta(seconds=UPDATE_INTERVAL)
+            self._schedule_poll()
+
+    @callback
+    def _async_handle_push_message(
+        self,
+        message: dict[str, any],
+    ) -> None:
+        """Apply voucher messages to the snapshot, refresh on hotspot and guest events.
+
+        A malformed message is skipped and the snapshot is refreshed, the
+        event stream stays connected.
+        """
+        try:
+            _type = message.get("meta", {}).get("message")
+            _data = message.get("data") or []
+            if _type in PUSH_VOUCHER_MESSAGES:
+                self._handle_changes(
+                    self._merge_vouchers(_data)
+                )
+            elif _type == PUSH_VOUCHER_DELETE_MESSAGE:
+                for _raw in _data:
+                    self._handle_changes(
+                        self._remove_voucher(_raw.get("_id"))
+                    )
+            elif _type == "events" and any(
+                str(_event.get("key", "")).startswith(PUSH_EVENT_PREFIXES)
+                for _event in _data
+            ):
+                self._async_schedule_push_refresh()
+        except (
+            AttributeError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ) as exception:
+            LOGGER.warning("Skip malformed UniFi Network message: %r", exception)
+            self._async_schedule_push_refresh()
+
+    @callback
+    def _async_schedule_push_refresh(
+        self,
+    ) -> None:
+        """Refresh vouchers shortly after a burst of events."""
+        if self._push_refresh is not None:
+            self._push_refresh.cancel()
+
+        self._push_refresh = self.hass.loop.call_later(
+            PUSH_REFRESH_DELAY,
+            self._async_push_refresh,
+        )
+
+    @callback
+    def _async_push_refresh(
+        self,
+    ) -> None:
+        """Start refresh triggered by events."""
+        self._push_refresh = None
+        self.config_entry.async_create_background_task(
+            self.hass,
+            self.async_update_vouchers(force=True),
+            f"{DOMAIN}_push_refresh_{self.config_entry.entry_id}",
+        )
+
+    def _plan_update_interval(
+        self,
+        changes: UnifiVoucherChangeSet,
+        poll: bool = False,
+    ) -> timedelta:
+        """Plan the interval until the next refresh.
+
+        The next refresh is scheduled for the next voucher deadline (end time
+        or status expiry). Without pending vouchers, the interval is doubled
+        after every poll without changes up to the ceiling. With push
+        updates, polling only reconciles the snapshot at the ceiling.
+        """
+        if changes:
+            self._idle_interval = UPDATE_INTERVAL
+        elif poll:
+            self._idle_interval = min(self._idle_interval * 2, UPDATE_INTERVAL_MAX)
+
+        _interval = UPDATE_INTERVAL_MAX if self.push_connected else self._idle_interval
+        # Vouchers in use, their quota can be used up at any time
+        if not self.push_connected and self.index.in_use:
+            _interval = min(_interval, UPDATE_INTERVAL)
+
+        _now = time.time()
+        if (_deadline := self.index.next_deadline(_now)) is not None:
+            _interval = min(_interval, _deadline - _now + UPDATE_DEADLINE_GRACE)
+
+        _interval = max(UPDATE_INTERVAL_MIN, min(_interval, UPDATE_INTERVAL_MAX))
+        LOGGER.debug("Next refresh in %s seconds", _interval)
+        return timedelta(seconds=_interval)
+
     def get_entry_id(
         self,
     ) -> str:
@@ -167,61 +689,344 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
         self,
     ) -> str:
         """Get guest WLAN name."""
-        return self.config_entry.options.get(CONF_WLAN_NAME, "")
+        return self.get_entry_option(CONF_WLAN_NAME, "")
 
     def get_qrcode_logo_path(
         self,
     ) -> str:
         """Get QR code logo path."""
-        return self.config_entry.options.get(CONF_QRCODE_LOGO_PATH, "")
+        return self.get_entry_option(CONF_QRCODE_LOGO_PATH, "")
+
+    def get_qrcode_format(
+        self,
+    ) -> str:
+        """Get QR code output format."""
+        return self.get_entry_option(CONF_QRCODE_FORMAT, DEFAULT_QRCODE_FORMAT)
+
+    def get_voucher_qrcode_request(
+        self,
+        voucher: VoucherRecord,
+        kind: str | None = None,
+    ) -> QrCodeRequest:
+        """Get QR code parameters of a voucher, the code within the URL if given."""
+        if _url := self.get_entry_option(CONF_QRCODE_VOUCHER_URL, ""):
+            _content = _url.replace("{code}", voucher.code)
+        else:
+            _content = voucher.code
+        return QrCodeRequest(
+            content=_content,
+            kind=kind or self.get_qrcode_format(),
+            logo_path=self.get_qrcode_logo_path(),
+        )
+
+    async def async_get_voucher_qrcodes(
+        self,
+        voucher_ids: Iterable[str] | None = None,
+        kind: str | None = None,
+    ) -> dict[str, bytes]:
+        """Get QR codes of the vouchers (default all), render the missing ones.
+
+        QR codes are looked up in the shared cache by the digest of their
+        parameters. Only QR codes in the configured format are added to it,
+        others are rendered on each call.
+        """
+        _store = kind is None or kind == self.get_qrcode_format()
+        if voucher_ids is None:
+            voucher_ids = self.index.ids_by_create_time()
+        _logo_stat = await self.hass.async_add_executor_job(
+            QrCodeRequest("", logo_path=self.get_qrcode_logo_path()).logo_stat
+        )
+
+        cache = UnifiVoucherQrCodeCache.get(self.hass)
+        _qrcodes = {}
+        _missing = []
+        for _id in voucher_ids:
+            if (voucher := self.vouchers.get(_id)) is None:
+                continue
+            _request = self.get_voucher_qrcode_request(voucher, kind)
+            _digest = _request.digest(_logo_stat)
+            if (_image := cache.lookup(_digest)) is not None:
+                _qrcodes[_id] = _image
+            else:
+                _missing.append((_id, _request, _digest))
+
+        if _missing:
+            _images = await UnifiVoucherQrCodeRenderer.get(self.hass).async_render(
+                [_request for _id, _request, _digest in _missing]
+            )
+            for (_id, _request, _digest), _image in zip(_missing, _images):
+                _qrcodes[_id] = _image
+                if _store:
+                    cache.store(_digest, _image)
+
+        return _qrcodes
+
+    @callback
+    def async_update_voucher_qrcodes(
+        self,
+    ) -> None:
+        """Render QR codes of the newest vouchers in background, if enabled."""
+        if not self.get_entry_option(CONF_QRCODE_VOUCHERS, False):
+            return
+
+        if self._qrcode_task is not None:
+            # Render again with the latest snapshot when done
+            self._qrcode_pending = True
+            return
+
+        self._qrcode_task = self.config_entry.async_create_background_task(
+            self.hass,
+            self._async_render_voucher_qrcodes(),
+            f"{DOMAIN}_qrcodes_{self.config_entry.entry_id}",
+        )
+
+    async def _async_render_voucher_qrcodes(
+        self,
+    ) -> None:
+        """Render QR codes of the newest vouchers until the snapshot is unchanged.
+
+        Only as many as the shared cache keeps besides other QR codes.
+        """
+        try:
+            while True:
+                self._qrcode_pending = False
+                try:
+                    await self.async_get_voucher_qrcodes(
+                        self.index.latest_ids(QRCODE_PRERENDER_VOUCHERS)
+                    )
+                except Exception as exception:
+                    LOGGER.exception(exception)
+                if not self._qrcode_pending:
+                    return
+        finally:
+            self._qrcode_task = None
 
     def get_entry_option(
         self,
         conf_key: str,
+        default: any = None,
     ) -> any:
         """Get config entry option with default value as fallback."""
-        _default_value = DEFAULT_VOUCHER.get(conf_key, {}).get("default")
-        return self.config_entry.options.get(conf_key, _default_value)
+        # Option set by an entity, but not yet saved to the config entry
+        if conf_key in self._pending_options:
+            return self._pending_options[conf_key]
+
+        if default is None:
+            default = DEFAULT_VOUCHER.get(conf_key, {}).get("default")
+        return self.config_entry.options.get(conf_key, default)
 
     async def async_set_entry_option(
         self,
         key: str,
         value: any,
     ) -> None:
-        """Set config entry option and update config entry after 3 second."""
-        _options = dict(self.config_entry.options)
-        _options.update(
-            {
-                key: value
-            }
-        )
+        """Set config entry option immediately and update config entry after 3 second."""
+        self._pending_options[key] = value
+        self.async_update_listeners()
+
         if self._scheduled_update_entry:
             self._scheduled_update_entry.cancel()
 
         self._scheduled_update_entry = self.hass.loop.call_later(
             3,
             lambda: self.hass.config_entries.async_update_entry(
-                self.config_entry, options=_options
+                self.config_entry,
+                options={
+                    **self.config_entry.options,
+                    **self._pending_options,
+                },
             ),
         )
 
+    def has_connection_changed(
+        self,
+    ) -> bool:
+        """Return True if connection settings of the config entry have been changed."""
+        return self._entry_data != dict(self.config_entry.data)
+
+    @callback
+    def async_apply_options(
+        self,
+    ) -> None:
+        """Apply changed options to the running coordinator and entities."""
+        self._pending_options.clear()
+        self.async_update_push()
+        self.async_update_voucher_qrcodes()
+        self.async_update_listeners()
+
     async def initialize(self) -> None:
         """Set up a UniFi Network instance."""
-        await self.client.controller.login()
+        await self.client.login()
 
     async def async_fetch_vouchers(
         self,
+        force: bool = False,
+    ) -> UnifiVoucherChangeSet:
+        """Fetch data for all vouchers and return the changes against the previous snapshot.
+
+        Concurrent callers join the fetch in flight and get an empty change
+        set, only the caller which started the fetch handles its changes. A
+        fetch completed within the last FETCH_FRESHNESS seconds satisfies
+        callers without a request, unless force is set (e.g. after a command
+        changed the vouchers).
+        """
+        if (task := self._fetch_task) is not None:
+            await asyncio.shield(task)
+            if not force:
+                return UnifiVoucherChangeSet()
+            # Joined fetch might have been started before the command, join or start a new one
+            if (task := self._fetch_task) is not None:
+                await asyncio.shield(task)
+                return UnifiVoucherChangeSet()
+        elif (
+            not force
+            and self._fetch_time is not None
+            and time.monotonic() - self._fetch_time < FETCH_FRESHNESS
+        ):
+            return UnifiVoucherChangeSet()
+
+        task = self._fetch_task = self.hass.async_create_task(
+            self._async_profile_fetch(),
+        )
+        task.add_done_callback(self._async_fetch_done)
+        changes = await asyncio.shield(task)
+
+        # If no voucher found, create a new one
+        if self.latest_voucher_id is None and self.config_entry.options.get(CONF_CREATE_IF_NONE_EXISTS, False):
+            LOGGER.info("No voucher found, create a new one")
+            await self.async_create_voucher()
+
+        return changes
+
+    @callback
+    def _async_fetch_done(
+        self,
+        task: asyncio.Task,
     ) -> None:
-        """Fetch data for all vouchers."""
-        _vouchers = {}
-        _latest_voucher_id = None
+        """Release fetch in flight."""
+        self._fetch_task = None
+        if not task.cancelled() and task.exception() is None:
+            self._fetch_time = time.monotonic()
+
+    async def _async_profile_fetch(
+        self,
+    ) -> UnifiVoucherChangeSet:
+        """Fetch vouchers as one coordinator cycle, profiled if profiling."""
+        async with self.profile(PROFILE_CYCLE):
+            return await self._async_fetch_vouchers()
 
-        vouchers = Vouchers(self.client.controller)
-        await vouchers.update()
+    async def _async_fetch_vouchers(
+        self,
+    ) -> UnifiVoucherChangeSet:
+        """Fetch data for all vouchers from the controller.
+
+        All vouchers of the site are listed only every FETCH_RECONCILE_INTERVAL
+        seconds. In between, only the batches with vouchers in use or with
+        deadlines and the FETCH_INCREMENTAL_RECENT_BATCHES latest created
+        batches are requested, as the controller filters the voucher list by
+        create time, if these are at most FETCH_INCREMENTAL_MAX_BATCHES
+        requests. Vouchers of the other batches are kept, changes of them are
+        found with the next full list. Batches created by HA are merged when
+        created, other new vouchers are found with the next full list, or with
+        every poll while the snapshot is empty.
+
+        Responses identical to the ones the snapshot is built from are not
+        decoded, the snapshot is kept as it is.
+        """
+        _create_times = sorted(
+            {
+                int(self.vouchers[_id].create_time.timestamp())
+                for _id in self.index.active_ids()
+            }.union(self.index.create_timestamps()[-FETCH_INCREMENTAL_RECENT_BATCHES:])
+        )
+        if (
+            self._reconcile_time is None
+            or time.monotonic() - self._reconcile_time >= FETCH_RECONCILE_INTERVAL
+            # Nothing to request incrementally, a new voucher could only be found by a full list
+            or not _create_times
+            or len(_create_times) > FETCH_INCREMENTAL_MAX_BATCHES
+        ):
+            _create_times = [None]
+            self._reconcile_time = time.monotonic()
+        else:
+            LOGGER.debug("Fetch %s known voucher batches", len(_create_times))
+
+        _fingerprints = {}
+        _raw = []
+        _unchanged_batches = set()
+        for _create_time, (_fingerprint, _batch) in zip(
+            _create_times,
+            await asyncio.gather(
+                *(
+                    self.client.list_vouchers_if_changed(
+                        self._fingerprints.get(_create_time),
+                        create_time=_create_time,
+                    )
+                    for _create_time in _create_times
+                )
+            ),
+        ):
+            if _fingerprint is not None:
+                _fingerprints[_create_time] = _fingerprint
+            if _batch is None:
+                _unchanged_batches.add(_create_time)
+            else:
+                _raw.extend(_batch)
 
         self._last_pull = dt_util.now()
         self._available = True
-        for voucher in vouchers.values():
+        if self.stale:
+            # Restored vouchers are up to date now, update HA states even without changes
+            self.stale = False
+            self.hass.async_create_task(
+                self._async_update_listeners()
+            )
+
+        _previous = self.vouchers
+        if len(_unchanged_batches) == len(_create_times):
+            if _create_times:
+                self.fingerprint_hits += 1
+            # Skip parsing, indexing and listener dispatch
+            changes = self._apply_vouchers(_previous, UnifiVoucherChangeSet(), poll=True)
+            self._fingerprints = _fingerprints
+            return changes
+
+        self.fingerprint_misses += 1
+        _vouchers = self._build_records(_raw)
+        if None not in (_fetched := set(_create_times) - _unchanged_batches):
+            # Unchanged batches and batches not requested are still represented by the snapshot
+            _vouchers.update(
+                {
+                    _i: _v
+                    for _i, _v in _previous.items()
+                    if int(_v.create_time.timestamp()) not in _fetched
+                }
+            )
+        changes = self._apply_vouchers(
+            _vouchers,
+            UnifiVoucherChangeSet(
+                added=_vouchers.keys() - _previous.keys(),
+                removed=_previous.keys() - _vouchers.keys(),
+                changed={
+                    _i
+                    for _i in _vouchers.keys() & _previous.keys()
+                    if _vouchers[_i] != _previous[_i]
+                },
+            ),
+            poll=True,
+        )
+        self._fingerprints = _fingerprints
+        return changes
+
+    def _build_records(
+        self,
+        raw_vouchers: list[dict[str, any]],
+    ) -> dict[str, VoucherRecord]:
+        """Build voucher records of all HA generated and not fully used vouchers."""
+        _fetch_time = datetime.now()
+        _vouchers = {}
+        for raw in raw_vouchers:
+            voucher = Voucher(raw)
             # No HA generated voucher
             if not voucher.note.startswith(DEFAULT_IDENTIFIER_STRING):
                 continue
@@ -229,39 +1034,149 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
             if voucher.quota > 0 and voucher.quota <= voucher.used:
                 continue
 
-            _voucher = {
-                "id": voucher.id,
-                "note": voucher.note,
-                "code": voucher.code,
-                "quota": voucher.quota,
-                "duration": voucher.duration,
-                "qos_overwrite": voucher.qos_overwrite,
-                "qos_usage_quota": voucher.qos_usage_quota,
-                "qos_rate_max_up": voucher.qos_rate_max_up,
-                "qos_rate_max_down": voucher.qos_rate_max_down,
-                "used": voucher.used,
-                "create_time": voucher.create_time,
-                "start_time": voucher.start_time,
-                "end_time": voucher.end_time,
-                "status": voucher.status,
-                "status_expires": voucher.status_expires,
-            }
-            _vouchers[voucher.id] = _voucher
+            _vouchers[voucher.id] = VoucherRecord.from_voucher(voucher, _fetch_time)
 
-        for _i, _v in _vouchers.items():
-            if (
-                _latest_voucher_id is None or
-                _vouchers.get(_latest_voucher_id, {}).get("create_time") < _v.get("create_time")
-            ):
-                _latest_voucher_id = _i
+        return _vouchers
 
-        self.vouchers = _vouchers
-        self.latest_voucher_id = _latest_voucher_id
+    def _apply_vouchers(
+        self,
+        vouchers: dict[str, VoucherRecord],
+        changes: UnifiVoucherChangeSet,
+        poll: bool = False,
+    ) -> UnifiVoucherChangeSet:
+        """Apply new voucher snapshot, update indexes and plan next refresh."""
+        # Keep the previous snapshot object, if nothing has been changed
+        if changes:
+            self.index.update(self.vouchers, vouchers, changes)
+            self.vouchers = vouchers
 
-        # If no voucher found, create a new one
-        if _latest_voucher_id is None and self.config_entry.options.get(CONF_CREATE_IF_NONE_EXISTS, False):
-            LOGGER.info("No voucher found, create a new one")
-            await self.async_create_voucher()
+        return self._apply_changes(changes, poll)
+
+    def _apply_changes(
+        self,
+        changes: UnifiVoucherChangeSet,
+        poll: bool = False,
+    ) -> UnifiVoucherChangeSet:
+        """Store the changed snapshot, its indexes are up to date, and plan next refresh.
+
+        Poll is set if the vouchers have been fetched by a poll, merges,
+        removals and push messages only update a part of the snapshot.
+        """
+        self.last_changes = changes
+
+        if changes:
+            self.latest_voucher_id = self.index.latest_id
+            self._store.async_delay_save(self._snapshot_data, STORAGE_SAVE_DELAY)
+            # Snapshot does not match the fingerprinted responses anymore
+            self._fingerprints = {}
+            self.async_update_voucher_qrcodes()
+
+        # Plan next refresh for the next voucher deadline
+        self.refresh_interval = self._plan_update_interval(changes, poll)
+        self._schedule_poll()
+        return changes
+
+    async def _async_merge_vouchers(
+        self,
+        create_time: int,
+    ) -> UnifiVoucherChangeSet:
+        """Fetch vouchers of one batch and merge them into the snapshot."""
+        return self._merge_vouchers(
+            await self.client.list_vouchers(
+                create_time=create_time,
+            )
+        )
+
+    def _merge_vouchers(
+        self,
+        raw_vouchers: list[dict[str, any]],
+    ) -> UnifiVoucherChangeSet:
+        """Merge raw vouchers into the snapshot, drop the ones used up.
+
+        The snapshot and its indexes are updated in place.
+        """
+        _records = self._build_records(raw_vouchers)
+        changes = UnifiVoucherChangeSet()
+        for raw in raw_vouchers:
+            _i = raw.get("_id")
+            _previous = self.vouchers.get(_i)
+            if (_v := _records.get(_i)) is None:
+                if _previous is not None:
+                    self.index.remove(_previous)
+                    del self.vouchers[_i]
+                    changes.removed.add(_i)
+                continue
+
+            if _previous is None:
+                changes.added.add(_i)
+            elif _previous != _v:
+                changes.changed.add(_i)
+                self.index.remove(_previous)
+            else:
+                # Unchanged apart from the jitter of the status expiry
+                self.vouchers[_i] = _v
+                continue
+
+            self.vouchers[_i] = _v
+            self.index.add(_v)
+
+        return self._apply_changes(changes)
+
+    def _remove_voucher(
+        self,
+        obj_id: str,
+    ) -> UnifiVoucherChangeSet:
+        """Remove voucher from the snapshot and its indexes in place."""
+        changes = UnifiVoucherChangeSet()
+        if (_previous := self.vouchers.pop(obj_id, None)) is not None:
+            self.index.remove(_previous)
+            changes.removed.add(obj_id)
+
+        return self._apply_changes(changes)
+
+    def _handle_changes(
+        self,
+        changes: UnifiVoucherChangeSet,
+    ) -> None:
+        """Update HA states, if vouchers have been added, removed or changed."""
+        # Only update HA states if vouchers have been added, removed or changed.
+        if changes:
+            self.data = self.vouchers
+            self.hass.async_create_task(
+                self._async_update_listeners()
+            )
+
+    def get_voucher_by_code(
+        self,
+        code: str,
+    ) -> VoucherRecord | None:
+        """Get voucher by code."""
+        if (_id := self.index.id_by_code(code)) is not None:
+            return self.vouchers.get(_id)
+
+        return None
+
+    def get_vouchers_by_status(
+        self,
+        status: str,
+    ) -> list[VoucherRecord]:
+        """Get vouchers by status."""
+        return [
+            self.vouchers[_id]
+            for _id in self.index.ids_by_status(status)
+            if _id in self.vouchers
+        ]
+
+    def get_vouchers_by_note(
+        self,
+        note: str,
+    ) -> list[VoucherRecord]:
+        """Get vouchers by note (without default identifier)."""
+        return [
+            self.vouchers[_id]
+            for _id in self.index.ids_by_note_tag(note)
+            if _id in self.vouchers
+        ]
 
     async def async_create_voucher(
         self,
@@ -298,7 +1213,7 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
             else:
                 note = DEFAULT_IDENTIFIER_STRING
 
-            await self.client.controller.request(
+            response = await self.client.request(
                 VoucherCreateRequest.create(
                     number=number,
                     quota=quota,
@@ -310,7 +1225,17 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
                     note=note,
                 )
             )
-            await self.async_update_vouchers()
+            # Controller returns the create time of the new batch, fetch only this batch
+            _data = response.get("data") or [{}]
+            if (_create_time := _data[0].get("create_time")) is None:
+                # New batch is unknown, list all vouchers
+                self._reconcile_time = None
+                await self.async_update_vouchers(force=True)
+                return
+
+            self._handle_changes(
+                await self._async_merge_vouchers(_create_time)
+            )
         except Exception as exception:
             LOGGER.exception(exception)
 
@@ -325,27 +1250,25 @@ class UnifiVoucherCoordinator(DataUpdateCoordinator):
                 if (obj_id := self.latest_voucher_id) is None:
                     raise ValueError
 
-            await self.client.controller.request(
+            await self.client.request(
                 VoucherDeleteRequest.create(
                     obj_id=obj_id,
                 )
             )
-            await self.async_update_vouchers()
+            self._handle_changes(
+                self._remove_voucher(obj_id)
+            )
         except Exception as exception:
             LOGGER.exception(exception)
 
     async def async_update_vouchers(
         self,
+        force: bool = False,
     ) -> None:
         """Update vouchers."""
         try:
-            await self.async_fetch_vouchers()
-
-            # Always update HA states after a command was executed.
-            # API calls that change the lawn mower's state update the local object when
-            # executing the command, so only the HA state needs further updates.
-            self.hass.async_create_task(
-                self._async_update_listeners()
+            self._handle_changes(
+                await self.async_fetch_vouchers(force=force)
             )
         except Exception as exception:
             LOGGER.exception(exception)
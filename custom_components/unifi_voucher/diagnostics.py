@@ -8,6 +8,11 @@ from homeassistant.const import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
+from .qrcode import (
+    UnifiVoucherQrCodeCache,
+    UnifiVoucherQrCodeRenderer,
+)
+
 TO_REDACT = {
     CONF_PASSWORD,
 }
@@ -20,8 +25,30 @@ async def async_get_config_entry_diagnostics(
     coordinator = config_entry.runtime_data
     diagnostics_data = {
         "config_entry_data": async_redact_data(config_entry.as_dict(), TO_REDACT),
-        "coordinator_vouchers": coordinator.vouchers,
+        "coordinator_vouchers": {
+            _id: voucher.as_dict()
+            for _id, voucher in coordinator.vouchers.items()
+        },
         "coordinator_latest_voucher_id": coordinator.latest_voucher_id,
+        "circuit_breaker": coordinator.client.connection.breaker.as_dict(),
+        "push_connected": coordinator.push_connected,
+        "fingerprint": {
+            "hits": coordinator.fingerprint_hits,
+            "misses": coordinator.fingerprint_misses,
+            "hit_ratio": (
+                round(coordinator.fingerprint_hits / _polls, 3)
+                if (_polls := coordinator.fingerprint_hits + coordinator.fingerprint_misses)
+                else None
+            ),
+        },
+        "api_metrics": coordinator.client.metrics.as_dict(),
+        "qrcode_cache": UnifiVoucherQrCodeCache.get(hass).as_dict(),
+        "qrcode_renderer": UnifiVoucherQrCodeRenderer.get(hass).as_dict(),
+        "session": {
+            "logged_in": coordinator.client.connection.logged_in,
+            "logins": coordinator.client.connection.logins,
+            "expires": coordinator.client.connection.session_expires,
+        },
     }
 
     return diagnostics_data
@@ -10,6 +10,7 @@ from .const import (
     DOMAIN,
     MANUFACTURER,
     ATTR_LAST_PULL,
+    ATTR_STALE,
 )
 from .coordinator import UnifiVoucherCoordinator
 
@@ -73,6 +74,7 @@ class UnifiVoucherEntity(CoordinatorEntity):
         _extra_state_attributes.update(
             {
                 ATTR_LAST_PULL: self.coordinator._last_pull,
+                ATTR_STALE: self.coordinator.stale,
             }
         )
         return _extra_state_attributes
@@ -1,15 +1,9 @@
 """UniFi Hotspot Manager image platform.
 
-Support for QR code for guest WLANs.
+Support for QR code for guest WLANs and for the latest voucher.
 """
 from __future__ import annotations
 
-import io
-import os
-import segno
-
-from PIL import Image
-
 from homeassistant.core import (
     HomeAssistant,
     callback,
@@ -30,9 +24,15 @@ from .const import (
     LOGGER,
     CONF_WLAN_NAME,
     ATTR_QR_CODE,
+    ATTR_VOUCHER_QR_CODE,
+    QRCODE_FORMATS,
 )
 from .coordinator import UnifiVoucherCoordinator
 from .entity import UnifiVoucherEntity
+from .qrcode import (
+    QrCodeRequest,
+    UnifiVoucherQrCodeCache,
+)
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -58,19 +58,77 @@ async def async_setup_entry(
                 entity_description=entity_description,
             )
             for entity_description in entity_descriptions
+        ]
+        + [
+            UnifiVoucherVoucherImage(
+                coordinator=coordinator,
+                entity_description=ImageEntityDescription(
+                    key=ATTR_VOUCHER_QR_CODE,
+                    translation_key=ATTR_VOUCHER_QR_CODE,
+                    icon="mdi:qrcode",
+                    device_class=None,
+                ),
+            ),
         ],
         update_before_add=True,
     )
 
 
-class UnifiVoucherImage(UnifiVoucherEntity, ImageEntity):
-    """Representation of a UniFi Hotspot Manager image."""
+class UnifiVoucherQrCodeImage(UnifiVoucherEntity, ImageEntity):
+    """Base of UniFi Hotspot Manager QR code images."""
 
-    _attr_content_type = "image/png"
     _attr_entity_registry_enabled_default = False
 
-    cached_image: bytes | None = None
+    # QR code parameters with the digest of them and of the logo file
+    _current_digest: tuple[QrCodeRequest, bytes] | None = None
+
+    def _get_qrcode_request(self) -> QrCodeRequest | None:
+        """Return QR code parameters of the image, None if there is no QR code."""
+        raise NotImplementedError
+
+    def _get_qrcode_digest(self) -> tuple[QrCodeRequest, bytes] | None:
+        """Return QR code parameters with their digest, runs in executor."""
+        if (_request := self._get_qrcode_request()) is None:
+            return None
+        return _request, _request.digest(_request.logo_stat())
+
+    async def _async_update_qrcode_digest(self) -> None:
+        """Update the image if the QR code changed with unchanged parameters, e.g. a replaced logo file."""
+        _current = await self.hass.async_add_executor_job(self._get_qrcode_digest)
+        if (
+            _current is not None
+            and self._current_digest is not None
+            and _current[0] == self._current_digest[0]
+            and _current[1] != self._current_digest[1]
+        ):
+            LOGGER.debug("QR code logo of %s changed", self.entity_id)
+
+            self._attr_image_last_updated = dt_util.utcnow()
+            self.async_write_ha_state()
+        self._current_digest = _current
+
+    async def async_added_to_hass(self) -> None:
+        """Compute the digest of the QR code when added."""
+        await super().async_added_to_hass()
+        await self._async_update_qrcode_digest()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator, check the digest of the QR code in background."""
+        super()._handle_coordinator_update()
+        self.coordinator.config_entry.async_create_background_task(
+            self.hass,
+            self._async_update_qrcode_digest(),
+            f"{self.entity_id} QR code digest",
+        )
+
+
+class UnifiVoucherImage(UnifiVoucherQrCodeImage):
+    """Representation of a UniFi Hotspot Manager image."""
+
     current_wlan_name: str | None = None
+    current_qrcode_logo_path: str | None = None
+    current_qrcode_format: str | None = None
 
     def __init__(
         self,
@@ -85,8 +143,12 @@ class UnifiVoucherImage(UnifiVoucherEntity, ImageEntity):
         )
         ImageEntity.__init__(self, coordinator.hass)
         self.entity_description = entity_description
-        self.current_wlan_name = coordinator.config_entry.options.get(CONF_WLAN_NAME, "")
+        self.current_wlan_name = coordinator.get_wlan_name()
+        self.current_qrcode_logo_path = coordinator.get_qrcode_logo_path()
+        self.current_qrcode_format = coordinator.get_qrcode_format()
+        self._attr_content_type = QRCODE_FORMATS[self.current_qrcode_format]
         self._attr_image_last_updated = dt_util.utcnow()
+        self._qrcode_cache = UnifiVoucherQrCodeCache.get(coordinator.hass)
 
     def _update_extra_state_attributes(self) -> None:
         """Update extra attributes."""
@@ -94,42 +156,25 @@ class UnifiVoucherImage(UnifiVoucherEntity, ImageEntity):
             CONF_WLAN_NAME: self.current_wlan_name,
         }
 
+    def _get_qrcode_request(self) -> QrCodeRequest:
+        """Return QR code parameters of the guest WLAN, runs in executor."""
+        # The imaging stack is loaded with the first QR code, not with the platform
+        from segno import helpers
+
+        qrcode_content = helpers.make_wifi_data(
+            ssid=self.current_wlan_name,
+            password=None,
+            security="nopass",
+        )
+        return QrCodeRequest(
+            content=qrcode_content,
+            kind=self.current_qrcode_format,
+            logo_path=self.current_qrcode_logo_path,
+        )
+
     def image(self) -> bytes | None:
         """Return bytes of image."""
-        if self.cached_image is None:
-            img_byte_arr = io.BytesIO()
-            qrcode_content = segno.helpers.make_wifi_data(
-                ssid=self.current_wlan_name,
-                password=None,
-                security="nopass",
-            )
-            img_qrcode = segno.make(qrcode_content, error='h')
-            img_qrcode.save(
-                out=img_byte_arr,
-                kind="png",
-                scale=5,
-            )
-            # QR code logo is given
-            if (_qrcode_logo_path := self.coordinator.get_qrcode_logo_path()) and os.path.isfile(_qrcode_logo_path):
-                img_byte_arr.seek(0)  # Important to let Pillow load the PNG
-                img_qrcode = Image.open(img_byte_arr)
-                img_qrcode = img_qrcode.convert("RGB")  # Ensure colors for the output
-                img_width, img_height = img_qrcode.size
-                logo_max_size = img_height // 3
-                img_logo = Image.open(_qrcode_logo_path, "r")
-                img_logo.thumbnail((logo_max_size, logo_max_size)) # Resize the logo to logo_max_size
-                img_qrcode.paste(
-                    img_logo, ((img_width - img_logo.size[0]) // 2, (img_height - img_logo.size[1]) // 2), img_logo
-                )
-                img_byte_arr = io.BytesIO()
-                img_qrcode.save(
-                    img_byte_arr,
-                    format="PNG",
-                    #optimize=True,
-                    #compress_level=9,
-                )
-            self.cached_image = img_byte_arr.getvalue()
-        return self.cached_image
+        return self._qrcode_cache.render(self._get_qrcode_request())
 
     @property
     def available(self) -> bool:
@@ -144,6 +189,88 @@ class UnifiVoucherImage(UnifiVoucherEntity, ImageEntity):
 
             self.current_wlan_name = _wlan_name
             self._attr_image_last_updated = dt_util.utcnow()
-            self.cached_image = None
+
+        if (_qrcode_logo_path := self.coordinator.get_qrcode_logo_path()) != self.current_qrcode_logo_path:
+            LOGGER.debug("QR code logo path changed to %s", _qrcode_logo_path)
+
+            self.current_qrcode_logo_path = _qrcode_logo_path
+            self._attr_image_last_updated = dt_util.utcnow()
+
+        if (_qrcode_format := self.coordinator.get_qrcode_format()) != self.current_qrcode_format:
+            LOGGER.debug("QR code format changed to %s", _qrcode_format)
+
+            self.current_qrcode_format = _qrcode_format
+            self._attr_content_type = QRCODE_FORMATS[_qrcode_format]
+            self._attr_image_last_updated = dt_util.utcnow()
+
+        super()._handle_coordinator_update()
+
+
+class UnifiVoucherVoucherImage(UnifiVoucherQrCodeImage):
+    """Representation of a UniFi Hotspot Manager QR code of the latest voucher."""
+
+    current_voucher_id: str | None = None
+    _current_request: QrCodeRequest | None = None
+
+    def __init__(
+        self,
+        coordinator: UnifiVoucherCoordinator,
+        entity_description: ImageEntityDescription,
+    ) -> None:
+        """Initialize the image class."""
+        super().__init__(
+            coordinator=coordinator,
+            entity_type="image",
+            entity_key=entity_description.key,
+        )
+        ImageEntity.__init__(self, coordinator.hass)
+        self.entity_description = entity_description
+        self.current_voucher_id = coordinator.latest_voucher_id
+        if (_voucher := coordinator.vouchers.get(self.current_voucher_id)) is not None:
+            self._current_request = coordinator.get_voucher_qrcode_request(_voucher)
+        self._attr_content_type = QRCODE_FORMATS[coordinator.get_qrcode_format()]
+        self._attr_image_last_updated = dt_util.utcnow()
+
+    def _update_extra_state_attributes(self) -> None:
+        """Update extra attributes."""
+        self._additional_extra_state_attributes = {
+            "id": self.current_voucher_id,
+        }
+
+    def _get_qrcode_request(self) -> QrCodeRequest | None:
+        """Return QR code parameters of the latest voucher."""
+        return self._current_request
+
+    async def async_image(self) -> bytes | None:
+        """Return bytes of image, rendered by the QR code pipeline of the coordinator."""
+        if self.current_voucher_id is None:
+            return None
+
+        _qrcodes = await self.coordinator.async_get_voucher_qrcodes([self.current_voucher_id])
+        return _qrcodes.get(self.current_voucher_id)
+
+    @property
+    def available(self) -> bool:
+        """Return True if entity is available."""
+        return (self.coordinator.latest_voucher_id in self.coordinator.vouchers)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        _voucher_id = self.coordinator.latest_voucher_id
+        _voucher = self.coordinator.vouchers.get(_voucher_id)
+        _request = (
+            self.coordinator.get_voucher_qrcode_request(_voucher)
+            if _voucher is not None
+            else None
+        )
+        # Content, format and logo path change with the voucher and the options
+        if _voucher_id != self.current_voucher_id or _request != self._current_request:
+            LOGGER.debug("Voucher QR code changed to voucher %s", _voucher_id)
+
+            self.current_voucher_id = _voucher_id
+            self._current_request = _request
+            self._attr_content_type = QRCODE_FORMATS[self.coordinator.get_qrcode_format()]
+            self._attr_image_last_updated = dt_util.utcnow()
 
         super()._handle_coordinator_update()
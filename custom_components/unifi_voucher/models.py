@@ -0,0 +1,428 @@
+"""Data models for UniFi Hotspot Manager."""
+from __future__ import annotations
+
+import heapq
+import sys
+
+from bisect import (
+    bisect_left,
+    insort,
+)
+from dataclasses import (
+    dataclass,
+    field,
+)
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from aiounifi.models.voucher import Voucher
+
+from .const import (
+    DEFAULT_IDENTIFIER_STRING,
+)
+
+
+@dataclass
+class UnifiVoucherChangeSet:
+    """Voucher IDs added, removed or changed by a refresh."""
+
+    added: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+    changed: set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        """Return True if at least one voucher has been changed."""
+        return bool(self.added or self.removed or self.changed)
+
+
+@dataclass(slots=True, frozen=True)
+class VoucherRecord:
+    """Compact representation of a HA generated voucher."""
+
+    id: str
+    note: str
+    code: str
+    quota: int
+    duration: timedelta
+    qos_overwrite: bool
+    qos_usage_quota: int
+    qos_rate_max_up: int
+    qos_rate_max_down: int
+    used: int
+    create_time: datetime
+    start_time: datetime | None
+    end_time: datetime | None
+    status: str
+    # The controller reports the seconds left at the time of the request,
+    # the absolute expiry jitters by a second between fetches
+    status_expires_at: datetime | None = field(compare=False)
+
+    @classmethod
+    def from_voucher(
+        cls,
+        voucher: Voucher,
+        fetch_time: datetime | None = None,
+    ) -> VoucherRecord:
+        """Create record from aiounifi voucher fetched at fetch_time (default now)."""
+        if (_status_expires := voucher.status_expires) is not None:
+            _status_expires = (fetch_time or datetime.now()) + _status_expires
+
+        return cls(
+            id=voucher.id,
+            # Notes and status values repeat across vouchers, share the strings
+            note=sys.intern(voucher.note),
+            code=voucher.code,
+            quota=voucher.quota,
+            duration=voucher.duration,
+            qos_overwrite=voucher.qos_overwrite,
+            qos_usage_quota=voucher.qos_usage_quota,
+            qos_rate_max_up=voucher.qos_rate_max_up,
+            qos_rate_max_down=voucher.qos_rate_max_down,
+            used=voucher.used,
+            create_time=voucher.create_time,
+            start_time=voucher.start_time,
+            end_time=voucher.end_time,
+            status=sys.intern(str(voucher.status)),
+            status_expires_at=_status_expires,
+        )
+
+    @classmethod
+    def from_storage_dict(
+        cls,
+        data: dict[str, any],
+        fetch_time: datetime | None = None,
+    ) -> VoucherRecord:
+        """Create record from dictionary of the snapshot storage.
+
+        Snapshots of older versions store the seconds left at fetch_time.
+        """
+        if "status_expires_at" in data:
+            _status_expires = _from_timestamp(data["status_expires_at"])
+        elif data.get("status_expires") is not None and fetch_time is not None:
+            _status_expires = fetch_time + timedelta(seconds=data["status_expires"])
+        else:
+            _status_expires = None
+
+        return cls(
+            id=data["id"],
+            note=sys.intern(data["note"]),
+            code=data["code"],
+            quota=data["quota"],
+            duration=timedelta(seconds=data["duration"]),
+            qos_overwrite=data["qos_overwrite"],
+            qos_usage_quota=data["qos_usage_quota"],
+            qos_rate_max_up=data["qos_rate_max_up"],
+            qos_rate_max_down=data["qos_rate_max_down"],
+            used=data["used"],
+            create_time=datetime.fromtimestamp(data["create_time"]),
+            start_time=_from_timestamp(data["start_time"]),
+            end_time=_from_timestamp(data["end_time"]),
+            status=sys.intern(data["status"]),
+            status_expires_at=_status_expires,
+        )
+
+    @property
+    def status_expires(self) -> timedelta | None:
+        """Return time left until the status expires, None if expired."""
+        if self.status_expires_at is None:
+            return None
+
+        if (_left := self.status_expires_at - datetime.now()) > timedelta(0):
+            return _left
+
+        return None
+
+    @property
+    def in_use(self) -> bool:
+        """Return True if the voucher is in use, its quota can be used up at any time."""
+        return self.start_time is not None or self.used > 0
+
+    @property
+    def deadlines(self) -> tuple[float, ...]:
+        """Return timestamps of end time and status expiry, the status changes at these."""
+        return tuple(
+            _deadline.timestamp()
+            for _deadline in (self.end_time, self.status_expires_at)
+            if _deadline is not None
+        )
+
+    @property
+    def note_tag(self) -> str | None:
+        """Return note without the default identifier."""
+        # If note longer than default identifier plus two characters ": "
+        if len(self.note) > (_index := (len(DEFAULT_IDENTIFIER_STRING) + 2)):
+            return self.note[_index:]
+
+        return None
+
+    def as_dict(
+        self,
+    ) -> dict[str, any]:
+        """Return all fields as dictionary."""
+        return {
+            "id": self.id,
+            "note": self.note,
+            "code": self.code,
+            "quota": self.quota,
+            "duration": self.duration,
+            "qos_overwrite": self.qos_overwrite,
+            "qos_usage_quota": self.qos_usage_quota,
+            "qos_rate_max_up": self.qos_rate_max_up,
+            "qos_rate_max_down": self.qos_rate_max_down,
+            "used": self.used,
+            "create_time": self.create_time,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "status": self.status,
+            "status_expires_at": self.status_expires_at,
+        }
+
+    def as_storage_dict(
+        self,
+    ) -> dict[str, any]:
+        """Return JSON serializable dictionary for the snapshot storage."""
+        return {
+            "id": self.id,
+            "note": self.note,
+            "code": self.code,
+            "quota": self.quota,
+            "duration": self.duration.total_seconds(),
+            "qos_overwrite": self.qos_overwrite,
+            "qos_usage_quota": self.qos_usage_quota,
+            "qos_rate_max_up": self.qos_rate_max_up,
+            "qos_rate_max_down": self.qos_rate_max_down,
+            "used": self.used,
+            "create_time": self.create_time.timestamp(),
+            "start_time": _to_timestamp(self.start_time),
+            "end_time": _to_timestamp(self.end_time),
+            "status": self.status,
+            "status_expires_at": _to_timestamp(self.status_expires_at),
+        }
+
+    def as_service_dict(
+        self,
+    ) -> dict[str, any]:
+        """Return dictionary for service responses."""
+        _x = {
+            "id": self.id,
+            "code": self.code,
+            "quota": self.quota,
+            "used": self.used,
+            "duration": int(self.duration.total_seconds() / 3600),
+            "status": self.status,
+            "create_time": self.create_time,
+        }
+        if self.start_time is not None:
+            _x["start_time"] = self.start_time
+
+        if self.end_time is not None:
+            _x["end_time"] = self.end_time
+
+        if (_status_expires := self.status_expires) is not None:
+            _x["status_expires"] = int(_status_expires.total_seconds() / 3600)
+
+        if self.qos_usage_quota > 0:
+            _x["usage_quota"] = self.qos_usage_quota
+
+        if self.qos_rate_max_up > 0:
+            _x["rate_max_up"] = self.qos_rate_max_up
+
+        if self.qos_rate_max_down > 0:
+            _x["rate_max_down"] = self.qos_rate_max_down
+
+        return _x
+
+
+class VoucherIndex:
+    """Secondary indexes on the voucher snapshot."""
+
+    def __init__(self) -> None:
+        """Initialize."""
+        self._create_times: list[tuple[datetime, str]] = []
+        self._by_code: dict[str, str] = {}
+        self._by_status: dict[str, set[str]] = {}
+        self._by_note_tag: dict[str, set[str]] = {}
+        self._in_use: set[str] = set()
+        self._deadlines: dict[str, tuple[float, ...]] = {}
+        # Deadlines by time, entries of removed or changed vouchers are dropped when reached
+        self._deadline_heap: list[tuple[float, str]] = []
+
+    def add(
+        self,
+        voucher: VoucherRecord,
+    ) -> None:
+        """Add voucher to all indexes."""
+        insort(self._create_times, (voucher.create_time, voucher.id))
+        self._by_code[voucher.code] = voucher.id
+        self._by_status.setdefault(voucher.status, set()).add(voucher.id)
+        if (_note_tag := voucher.note_tag) is not None:
+            self._by_note_tag.setdefault(_note_tag, set()).add(voucher.id)
+        if voucher.in_use:
+            self._in_use.add(voucher.id)
+        if _deadlines := voucher.deadlines:
+            self._deadlines[voucher.id] = _deadlines
+            for _deadline in _deadlines:
+                heapq.heappush(self._deadline_heap, (_deadline, voucher.id))
+            # Compact the heap if most of its entries are outdated
+            if len(self._deadline_heap) > 4 * len(self._deadlines) + 64:
+                self._rebuild_deadline_heap()
+
+    def remove(
+        self,
+        voucher: VoucherRecord,
+    ) -> None:
+        """Remove voucher from all indexes."""
+        _item = (voucher.create_time, voucher.id)
+        _i = bisect_left(self._create_times, _item)
+        if _i < len(self._create_times) and self._create_times[_i] == _item:
+            del self._create_times[_i]
+
+        if self._by_code.get(voucher.code) == voucher.id:
+            del self._by_code[voucher.code]
+
+        _discard(self._by_status, voucher.status, voucher.id)
+        if (_note_tag := voucher.note_tag) is not None:
+            _discard(self._by_note_tag, _note_tag, voucher.id)
+        self._in_use.discard(voucher.id)
+        self._deadlines.pop(voucher.id, None)
+
+    def update(
+        self,
+        previous: dict[str, VoucherRecord],
+        vouchers: dict[str, VoucherRecord],
+        changes: UnifiVoucherChangeSet,
+    ) -> None:
+        """Update indexes with the changes between two snapshots."""
+        for _id in changes.removed | changes.changed:
+            self.remove(previous[_id])
+        for _id in changes.added | changes.changed:
+            self.add(vouchers[_id])
+
+    def rebuild(
+        self,
+        vouchers: dict[str, VoucherRecord],
+    ) -> None:
+        """Rebuild all indexes from snapshot."""
+        self._create_times.clear()
+        self._by_code.clear()
+        self._by_status.clear()
+        self._by_note_tag.clear()
+        self._in_use.clear()
+        self._deadlines.clear()
+        self._deadline_heap.clear()
+        for voucher in vouchers.values():
+            self.add(voucher)
+
+    def _rebuild_deadline_heap(self) -> None:
+        """Rebuild the deadline heap from the deadlines of the indexed vouchers."""
+        self._deadline_heap = [
+            (_deadline, _id)
+            for _id, _deadlines in self._deadlines.items()
+            for _deadline in _deadlines
+        ]
+        heapq.heapify(self._deadline_heap)
+
+    def next_deadline(
+        self,
+        now: float,
+    ) -> float | None:
+        """Return timestamp of the next voucher deadline after now, None if there is none.
+
+        Deadlines reached are dropped.
+        """
+        while self._deadline_heap:
+            _deadline, _id = self._deadline_heap[0]
+            if _deadline > now and _deadline in self._deadlines.get(_id, ()):
+                return _deadline
+            heapq.heappop(self._deadline_heap)
+
+        return None
+
+    @property
+    def in_use(self) -> bool:
+        """Return True if at least one voucher is in use."""
+        return bool(self._in_use)
+
+    def active_ids(self) -> set[str]:
+        """Return IDs of vouchers in use or with deadlines."""
+        return self._in_use | self._deadlines.keys()
+
+    @property
+    def latest_id(self) -> str | None:
+        """Return ID of the latest created voucher."""
+        if self._create_times:
+            return self._create_times[-1][1]
+
+        return None
+
+    def create_timestamps(self) -> list[int]:
+        """Return distinct create timestamps, one per created batch, in ascending order."""
+        return sorted(
+            {int(_create_time.timestamp()) for _create_time, _id in self._create_times}
+        )
+
+    def ids_by_create_time(self) -> list[str]:
+        """Return voucher IDs ordered by create time."""
+        return [_id for _create_time, _id in self._create_times]
+
+    def latest_ids(
+        self,
+        count: int,
+    ) -> list[str]:
+        """Return IDs of the count latest created vouchers, ordered by create time."""
+        return [_id for _create_time, _id in self._create_times[-count:]]
+
+    def id_by_code(
+        self,
+        code: str,
+    ) -> str | None:
+        """Return voucher ID for code."""
+        return self._by_code.get(code)
+
+    def ids_by_status(
+        self,
+        status: str,
+    ) -> set[str]:
+        """Return voucher IDs with status."""
+        return set(self._by_status.get(status, ()))
+
+    def ids_by_note_tag(
+        self,
+        note_tag: str,
+    ) -> set[str]:
+        """Return voucher IDs with note (without default identifier)."""
+        return set(self._by_note_tag.get(note_tag, ()))
+
+
+def _discard(
+    index: dict[str, set[str]],
+    key: str,
+    obj_id: str,
+) -> None:
+    """Discard ID from index and drop empty keys."""
+    if (_ids := index.get(key)) is not None:
+        _ids.discard(obj_id)
+        if not _ids:
+            del index[key]
+
+
+def _from_timestamp(
+    timestamp: float | None,
+) -> datetime | None:
+    """Return datetime of timestamp or None."""
+    if timestamp is None:
+        return None
+
+    return datetime.fromtimestamp(timestamp)
+
+
+def _to_timestamp(
+    value: datetime | None,
+) -> float | None:
+    """Return timestamp of datetime or None."""
+    if value is None:
+        return None
+
+    return value.timestamp()
@@ -0,0 +1,301 @@
+"""Profiling of coordinator cycles and service calls for UniFi Hotspot Manager."""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import pstats
+import time
+import tracemalloc
+
+from collections.abc import (
+    AsyncIterator,
+    Iterator,
+)
+from contextlib import (
+    asynccontextmanager,
+    contextmanager,
+)
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+
+from .api import UnifiVoucherApiMetrics
+from .const import (
+    LOGGER,
+    DOMAIN,
+    PROFILE_CYCLE,
+    PROFILE_SERVICE_CALL,
+)
+
+PROFILE_TOP_FUNCTIONS = 15
+PROFILE_TOP_ALLOCATIONS = 10
+
+# Modules of the integration which build the voucher snapshot and service responses
+_BUILDING_MODULES = tuple(
+    str(Path(__file__).with_name(_module))
+    for _module in ("coordinator.py", "models.py", "services.py")
+)
+_AIOUNIFI_MODELS_DIR = str(Path("aiounifi", "models"))
+
+
+class UnifiVoucherProfiler:
+    """Profile the next coordinator cycles and service calls of a config entry.
+
+    The profiler is enabled while a cycle or service call is running. As the
+    event loop is shared, other work running while they wait for the
+    controller is captured as well.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        metrics: UnifiVoucherApiMetrics,
+        count: int,
+        trace_memory: bool = False,
+    ) -> None:
+        """Initialize."""
+        self.hass = hass
+        self.metrics = metrics
+        self.count = count
+        self.trace_memory = trace_memory
+
+        self.captured: dict[str, int] = {
+            PROFILE_CYCLE: 0,
+            PROFILE_SERVICE_CALL: 0,
+        }
+        self.wall_time = 0.0
+        self.login_time = 0.0
+        self.http_time = 0.0
+        self.dispatch_time = 0.0
+        self._profile = cProfile.Profile()
+        self._depth = 0
+        self._start = 0.0
+        self._request_totals = (0.0, 0.0)
+        self._started_tracing = False
+        self._done = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        """Return True if the requested number of captures is complete."""
+        return sum(self.captured.values()) >= self.count
+
+    def start(self) -> None:
+        """Start tracing memory allocations, if requested."""
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    async def async_wait(
+        self,
+        timeout: float,
+    ) -> None:
+        """Wait until all captures are complete or timeout."""
+        try:
+            async with asyncio.timeout(timeout):
+                await self._done.wait()
+        except TimeoutError:
+            LOGGER.debug("Profiling timed out after %s captures", sum(self.captured.values()))
+
+    def _enter(self) -> bool:
+        """Enable the profiler for the outermost capture, return False if not possible."""
+        if self._depth == 0:
+            try:
+                self._profile.enable()
+            except ValueError as err:
+                # Another profiler, e.g. of the profiler integration, is running
+                LOGGER.warning("Unable to profile UniFi Hotspot Manager: %s", err)
+                return False
+            self._start = time.perf_counter()
+            self._request_totals = self._get_request_totals()
+
+        self._depth += 1
+        return True
+
+    def _exit(self) -> bool:
+        """Disable the profiler after the outermost capture, return True if disabled."""
+        self._depth -= 1
+        if self._depth > 0:
+            return False
+
+        self._profile.disable()
+        self.wall_time += time.perf_counter() - self._start
+        _login, _requests = self._get_request_totals()
+        _login -= self._request_totals[0]
+        _requests -= self._request_totals[1]
+        self.login_time += _login
+        # Requests include the logins they trigger
+        self.http_time += max(_requests - _login, 0)
+        return True
+
+    def _get_request_totals(self) -> tuple[float, float]:
+        """Return total seconds of logins and of all other requests."""
+        _login = 0.0
+        _requests = 0.0
+        for _operation, _metrics in self.metrics.operations.items():
+            if _operation == "login":
+                _login += _metrics.total
+            else:
+                _requests += _metrics.total
+        return _login, _requests
+
+    @asynccontextmanager
+    async def async_capture(
+        self,
+        kind: str,
+    ) -> AsyncIterator[None]:
+        """Profile a coordinator cycle or service call."""
+        if self.done or not self._enter():
+            yield
+            return
+
+        try:
+            yield
+        finally:
+            if self._exit():
+                self.captured[kind] += 1
+                if self.done:
+                    self._done.set()
+
+    @contextmanager
+    def dispatch(self) -> Iterator[None]:
+        """Profile the dispatch of updated data to the listeners."""
+        if not self._enter():
+            yield
+            return
+
+        _start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.dispatch_time += time.perf_counter() - _start
+            self._exit()
+
+    async def async_finish(
+        self,
+        entry_id: str,
+    ) -> dict[str, any]:
+        """Stop profiling, write stats file and return summary."""
+        if self._depth > 0:
+            self._profile.disable()
+            self._depth = 0
+
+        _memory = None
+        if tracemalloc.is_tracing() and self.trace_memory:
+            _memory = (tracemalloc.get_traced_memory(), tracemalloc.take_snapshot())
+            if self._started_tracing:
+                tracemalloc.stop()
+
+        _path = self.hass.config.path(
+            f"{DOMAIN}.{entry_id}.{int(time.time())}.cprof"
+        )
+        return await self.hass.async_add_executor_job(
+            self._write_summary,
+            _path,
+            _memory,
+        )
+
+    def _write_summary(
+        self,
+        path: str,
+        memory: tuple[tuple[int, int], tracemalloc.Snapshot] | None,
+    ) -> dict[str, any]:
+        """Write stats file and summarize the profile, runs in executor."""
+        self._profile.dump_stats(path)
+        _summary = {
+            "file": path,
+            "cycles": self.captured[PROFILE_CYCLE],
+            "service_calls": self.captured[PROFILE_SERVICE_CALL],
+            "wall_time_ms": _to_ms(self.wall_time),
+            # Login and HTTP include waiting for the controller, the others are time spent in code
+            "breakdown_ms": {
+                "login": _to_ms(self.login_time),
+                "http": _to_ms(self.http_time),
+                "model_parsing": 0.0,
+                "dict_building": 0.0,
+                "listener_dispatch": _to_ms(self.dispatch_time),
+            },
+            "top_functions": [],
+        }
+        if sum(self.captured.values()) == 0 and self.dispatch_time == 0:
+            return _summary
+
+        stats = pstats.Stats(self._profile)
+        _parsing = 0.0
+        _building = 0.0
+        for func, (_cc, _nc, tt, _ct, callers) in stats.stats.items():
+            if (_section := _get_section(func)) is not None:
+                _times = [(_section, tt)]
+            elif func[0] == "~":
+                # Builtins are accounted to their callers
+                _times = [
+                    (_get_section(_caller), _caller_stats[2])
+                    for _caller, _caller_stats in callers.items()
+                ]
+            else:
+                continue
+
+            for _section, _time in _times:
+                if _section == "model_parsing":
+                    _parsing += _time
+                elif _section == "dict_building":
+                    _building += _time
+
+        _summary["breakdown_ms"]["model_parsing"] = _to_ms(_parsing)
+        _summary["breakdown_ms"]["dict_building"] = _to_ms(_building)
+        _summary["top_functions"] = [
+            {
+                "function": pstats.func_std_string(func),
+                "calls": _nc,
+                "own_ms": _to_ms(tt),
+                "cumulative_ms": _to_ms(ct),
+            }
+            for func, (_cc, _nc, tt, ct, _callers) in sorted(
+                stats.stats.items(),
+                key=lambda item: item[1][3],
+                reverse=True,
+            )[:PROFILE_TOP_FUNCTIONS]
+        ]
+
+        if memory is not None:
+            (_size, _peak), snapshot = memory
+            snapshot = snapshot.filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                )
+            )
+            _summary["memory"] = {
+                "traced_kb": round(_size / 1024, 1),
+                "peak_kb": round(_peak / 1024, 1),
+                "top_allocations": [
+                    {
+                        "location": str(_stat.traceback),
+                        "size_kb": round(_stat.size / 1024, 1),
+                        "count": _stat.count,
+                    }
+                    for _stat in snapshot.statistics("lineno")[:PROFILE_TOP_ALLOCATIONS]
+                ],
+            }
+
+        return _summary
+
+
+def _get_section(
+    func: tuple[str, int, str],
+) -> str | None:
+    """Return breakdown section of a profiled function."""
+    _filename = func[0]
+    if _AIOUNIFI_MODELS_DIR in _filename:
+        return "model_parsing"
+
+    if _filename in _BUILDING_MODULES:
+        return "dict_building"
+
+    return None
+
+
+def _to_ms(
+    seconds: float,
+) -> float:
+    """Return seconds as rounded milliseconds."""
+    return round(seconds * 1000, 1)
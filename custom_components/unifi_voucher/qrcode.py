@@ -0,0 +1,334 @@
+"""QR code rendering for UniFi Hotspot Manager."""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import multiprocessing
+import site
+import sys
+import threading
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import (
+    callback,
+    Event,
+    HomeAssistant,
+)
+
+from .const import (
+    LOGGER,
+    DOMAIN,
+    QRCODE_CACHE_SIZE,
+    QRCODE_LOGO_CACHE_SIZE,
+    QRCODE_PROCESS_POOL_MIN,
+    QRCODE_BATCH_SIZE,
+    QRCODE_MAX_CONCURRENCY,
+    QRCODE_POOL_IDLE_TIMEOUT,
+)
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Directory of the rendering module, added to the module path of the worker processes
+_WORKER_DIR = str(Path(__file__).with_name("worker"))
+_WORKER_MODULE = "unifi_voucher_qrcode_render"
+
+
+def _load_worker_module():
+    """Load the rendering module under its top-level name, as the worker processes do."""
+    if (module := sys.modules.get(_WORKER_MODULE)) is None:
+        _spec = importlib.util.spec_from_file_location(
+            _WORKER_MODULE,
+            Path(_WORKER_DIR, f"{_WORKER_MODULE}.py"),
+        )
+        module = importlib.util.module_from_spec(_spec)
+        sys.modules[_WORKER_MODULE] = module
+        _spec.loader.exec_module(module)
+    return module
+
+
+_worker_module = _load_worker_module()
+QrCodeRequest = _worker_module.QrCodeRequest
+load_logo = _worker_module.load_logo
+render_qrcode = _worker_module.render_qrcode
+render_qrcodes = _worker_module.render_qrcodes
+
+
+class UnifiVoucherQrCodeCache:
+    """Bounded LRU cache of rendered QR codes, shared by all config entries.
+
+    Rendering runs in the executor, so the cache is guarded by a lock.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = QRCODE_CACHE_SIZE,
+    ) -> None:
+        """Initialize the cache."""
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._images: OrderedDict[bytes, bytes] = OrderedDict()
+        self._logos: OrderedDict[tuple[str, int, int, int], Image.Image] = OrderedDict()
+        self.logo_hits = 0
+        self.logo_misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(
+        cls,
+        hass: HomeAssistant,
+    ) -> UnifiVoucherQrCodeCache:
+        """Get the QR code cache of the integration."""
+        _data = hass.data.setdefault(DOMAIN, {})
+        if (cache := _data.get("qrcode_cache")) is None:
+            cache = _data["qrcode_cache"] = cls()
+        return cache
+
+    def render(
+        self,
+        request: QrCodeRequest,
+    ) -> bytes:
+        """Return cached QR code or render it, runs in executor."""
+        _logo_stat = request.logo_stat()
+        _key = request.digest(_logo_stat)
+        if (image := self.lookup(_key)) is not None:
+            return image
+
+        image = render_qrcode(
+            request,
+            logo_loader=(
+                partial(self.get_logo, request.logo_path, _logo_stat)
+                if _logo_stat is not None
+                else None
+            ),
+        )
+        self.store(_key, image)
+        return image
+
+    def lookup(
+        self,
+        key: bytes,
+    ) -> bytes | None:
+        """Return cached QR code by digest of its request, None if not cached."""
+        with self._lock:
+            if (image := self._images.get(key)) is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+        return None
+
+    def store(
+        self,
+        key: bytes,
+        image: bytes,
+    ) -> None:
+        """Cache QR code by digest of its request, evict the least recently used ones."""
+        with self._lock:
+            self._images[key] = image
+            self._images.move_to_end(key)
+            while len(self._images) > self.maxsize:
+                self._images.popitem(last=False)
+                self.evictions += 1
+
+    def get_logo(
+        self,
+        path: str,
+        logo_stat: tuple[int, int],
+        max_size: int,
+    ) -> Image.Image:
+        """Return logo decoded and resized once per file version and size, runs in executor."""
+        _key = (path, *logo_stat, max_size)
+        with self._lock:
+            if (logo := self._logos.get(_key)) is not None:
+                self._logos.move_to_end(_key)
+                self.logo_hits += 1
+                return logo
+            self.logo_misses += 1
+
+        logo = load_logo(path, max_size)
+        with self._lock:
+            self._logos[_key] = logo
+            while len(self._logos) > QRCODE_LOGO_CACHE_SIZE:
+                self._logos.popitem(last=False)
+        return logo
+
+    def clear(
+        self,
+        logos: bool = True,
+    ) -> None:
+        """Remove all rendered QR codes and, unless logos is False, the decoded logos."""
+        with self._lock:
+            self._images.clear()
+            if logos:
+                self._logos.clear()
+
+    def as_dict(self) -> dict[str, any]:
+        """Return statistics for diagnostics."""
+        with self._lock:
+            _size = len(self._images)
+            _bytes = sum(len(_image) for _image in self._images.values())
+            _logos = len(self._logos)
+        _requests = self.hits + self.misses
+        return {
+            "size": _size,
+            "maxsize": self.maxsize,
+            "bytes": _bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / _requests, 3) if _requests else None,
+            "logos": _logos,
+            "logo_hits": self.logo_hits,
+            "logo_misses": self.logo_misses,
+        }
+
+
+class UnifiVoucherQrCodeRenderer:
+    """Render many QR codes in batches in a process pool, shared by all config entries.
+
+    At most QRCODE_MAX_CONCURRENCY batches are rendered at the same time, so
+    neither the event loop nor the executor of Home Assistant is blocked.
+    Few QR codes are rendered in the executor with the shared cache instead.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+    ) -> None:
+        """Initialize the renderer."""
+        self.hass = hass
+        self.cache = UnifiVoucherQrCodeCache.get(hass)
+        self.rendered = 0
+        self.batches = 0
+        self._pool: ProcessPoolExecutor | None = None
+        self._semaphore = asyncio.Semaphore(QRCODE_MAX_CONCURRENCY)
+        self._running = 0
+        self._idle_timer: asyncio.TimerHandle | None = None
+
+    @classmethod
+    def get(
+        cls,
+        hass: HomeAssistant,
+    ) -> UnifiVoucherQrCodeRenderer:
+        """Get the QR code renderer of the integration."""
+        _data = hass.data.setdefault(DOMAIN, {})
+        if (renderer := _data.get("qrcode_renderer")) is None:
+            renderer = _data["qrcode_renderer"] = cls(hass)
+            hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, renderer.async_stop)
+        return renderer
+
+    async def async_render(
+        self,
+        requests: list[QrCodeRequest],
+    ) -> list[bytes]:
+        """Render QR codes, in the order of the requests."""
+        if len(requests) < QRCODE_PROCESS_POOL_MIN:
+            return await self.hass.async_add_executor_job(
+                self._render_cached,
+                requests,
+            )
+
+        _results = await asyncio.gather(
+            *(
+                self._async_render_batch(requests[_i:_i + QRCODE_BATCH_SIZE])
+                for _i in range(0, len(requests), QRCODE_BATCH_SIZE)
+            )
+        )
+        return [_image for _batch in _results for _image in _batch]
+
+    def _render_cached(
+        self,
+        requests: list[QrCodeRequest],
+    ) -> list[bytes]:
+        """Render QR codes with the shared cache, runs in executor."""
+        return [self.cache.render(_request) for _request in requests]
+
+    async def _async_render_batch(
+        self,
+        requests: list[QrCodeRequest],
+    ) -> list[bytes]:
+        """Render one batch of QR codes in the process pool."""
+        async with self._semaphore:
+            self._running += 1
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            try:
+                _pool = self._get_pool()
+                _images = await self.hass.loop.run_in_executor(
+                    _pool,
+                    render_qrcodes,
+                    requests,
+                )
+            except BrokenProcessPool:
+                LOGGER.warning("QR code worker process failed, rendering in executor")
+                # Concurrent batches may have started a new pool already
+                if self._pool is _pool:
+                    self._pool = None
+                _pool.shutdown(wait=False, cancel_futures=True)
+                _images = await self.hass.async_add_executor_job(
+                    self._render_cached,
+                    requests,
+                )
+            finally:
+                self._running -= 1
+                if self._running == 0:
+                    self._idle_timer = self.hass.loop.call_later(
+                        QRCODE_POOL_IDLE_TIMEOUT,
+                        self.shutdown,
+                    )
+
+        self.batches += 1
+        self.rendered += len(_images)
+        return _images
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Return process pool, start it if required."""
+        if self._pool is None:
+            LOGGER.debug("Starting %s QR code worker processes", QRCODE_MAX_CONCURRENCY)
+            self._pool = ProcessPoolExecutor(
+                max_workers=QRCODE_MAX_CONCURRENCY,
+                # Forking the threaded Home Assistant process is not safe
+                mp_context=multiprocessing.get_context("spawn"),
+                # Workers import the rendering module only, not the integration
+                initializer=site.addsitedir,
+                initargs=(_WORKER_DIR,),
+            )
+        return self._pool
+
+    @callback
+    def async_stop(
+        self,
+        _event: Event,
+    ) -> None:
+        """Stop the worker processes with Home Assistant."""
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self.shutdown()
+
+    @callback
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        self._idle_timer = None
+        if self._pool is not None:
+            LOGGER.debug("Stopping idle QR code worker processes")
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def as_dict(self) -> dict[str, any]:
+        """Return statistics for diagnostics."""
+        return {
+            "pool_running": self._pool is not None,
+            "batches": self.batches,
+            "rendered": self.rendered,
+        }
@@ -1,9 +1,14 @@
 """UniFi Hotspot Manager sensor platform."""
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import timedelta
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import (
+    callback,
+    CALLBACK_TYPE,
+    HomeAssistant,
+)
 from homeassistant.const import (
     UnitOfInformation,
     UnitOfDataRate,
@@ -11,18 +16,34 @@ from homeassistant.const import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.components.sensor import (
+    SensorDeviceClass,
     SensorEntity,
     SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.helpers.entity import (
+    Entity,
+    EntityCategory,
 )
-from homeassistant.helpers.entity import Entity
+from homeassistant.helpers.event import async_call_later
 
 from .const import (
+    METRICS_UPDATE_DELAY,
     CONF_WLAN_NAME,
     ATTR_VOUCHER,
-    DEFAULT_IDENTIFIER_STRING,
+    ATTR_API_ERRORS,
 )
 from .coordinator import UnifiVoucherCoordinator
 from .entity import UnifiVoucherEntity
+from .models import VoucherRecord
+
+
+@dataclass(frozen=True, kw_only=True)
+class UnifiVoucherMetricSensorEntityDescription(SensorEntityDescription):
+    """Description of a UniFi Hotspot Manager API metric sensor."""
+
+    # API operation of the latency sensor, None for the error counter
+    operation: str | None = None
 
 
 async def async_setup_entry(
@@ -40,6 +61,31 @@ async def async_setup_entry(
             device_class=None,
         ),
     ]
+    metric_entity_descriptions = [
+        UnifiVoucherMetricSensorEntityDescription(
+            key=f"{_operation}_latency",
+            translation_key=f"{_operation}_latency",
+            icon="mdi:timer-outline",
+            device_class=SensorDeviceClass.DURATION,
+            state_class=SensorStateClass.MEASUREMENT,
+            native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+            suggested_display_precision=0,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+            operation=_operation,
+        )
+        for _operation in ("login", "list", "create", "delete")
+    ]
+    metric_entity_descriptions.append(
+        UnifiVoucherMetricSensorEntityDescription(
+            key=ATTR_API_ERRORS,
+            translation_key=ATTR_API_ERRORS,
+            icon="mdi:alert-circle-outline",
+            state_class=SensorStateClass.TOTAL_INCREASING,
+            entity_category=EntityCategory.DIAGNOSTIC,
+            entity_registry_enabled_default=False,
+        )
+    )
 
     async_add_entities(
         [
@@ -48,6 +94,12 @@ async def async_setup_entry(
                 entity_description=entity_description,
             )
             for entity_description in entity_descriptions
+        ] + [
+            UnifiVoucherMetricSensor(
+                coordinator=coordinator,
+                entity_description=entity_description,
+            )
+            for entity_description in metric_entity_descriptions
         ],
         update_before_add=True,
     )
@@ -85,7 +137,7 @@ class UnifiVoucherSensor(UnifiVoucherEntity, SensorEntity):
 
         return ", ".join(strings)
 
-    def _get_latest_voucher(self) -> dict[str, any] | None:
+    def _get_latest_voucher(self) -> VoucherRecord | None:
         """Get last voucher."""
         if (voucher_id := self.coordinator.latest_voucher_id) in self.coordinator.vouchers:
             return self.coordinator.vouchers[voucher_id]
@@ -99,34 +151,33 @@ class UnifiVoucherSensor(UnifiVoucherEntity, SensorEntity):
 
         _x = {
             CONF_WLAN_NAME: self.coordinator.get_wlan_name(),
-            "id": voucher.get("id"),
-            "quota": voucher.get("quota"),
-            "used": voucher.get("used"),
-            "duration": self._format_duration(voucher.get("duration")),
-            "status": voucher.get("status").lower(),
-            "create_time": voucher.get("create_time"),
+            "id": voucher.id,
+            "quota": voucher.quota,
+            "used": voucher.used,
+            "duration": self._format_duration(voucher.duration),
+            "status": voucher.status.lower(),
+            "create_time": voucher.create_time,
         }
-        # If note longer than default identifier plus two characters ": "
-        if len(voucher.get("note")) > (_index := (len(DEFAULT_IDENTIFIER_STRING) + 2)):
-            _x["note"] = voucher.get("note")[_index:]
+        if (_note := voucher.note_tag) is not None:
+            _x["note"] = _note
 
-        if voucher.get("start_time") is not None:
-            _x["start_time"] = voucher.get("start_time")
+        if voucher.start_time is not None:
+            _x["start_time"] = voucher.start_time
 
-        if voucher.get("end_time") is not None:
-            _x["end_time"] = voucher.get("end_time")
+        if voucher.end_time is not None:
+            _x["end_time"] = voucher.end_time
 
-        if voucher.get("status_expires") is not None:
-            _x["status_expires"] = self._format_duration(voucher.get("status_expires"))
+        if (_status_expires := voucher.status_expires) is not None:
+            _x["status_expires"] = self._format_duration(_status_expires)
 
-        if voucher.get("qos_usage_quota") > 0:
-            _x["usage_quota"] = str(voucher.get("qos_usage_quota")) + " " + UnitOfInformation.MEGABYTES
+        if voucher.qos_usage_quota > 0:
+            _x["usage_quota"] = str(voucher.qos_usage_quota) + " " + UnitOfInformation.MEGABYTES
 
-        if voucher.get("qos_rate_max_up") > 0:
-            _x["rate_max_up"] = str(voucher.get("qos_rate_max_up")) + " " + UnitOfDataRate.KILOBITS_PER_SECOND
+        if voucher.qos_rate_max_up > 0:
+            _x["rate_max_up"] = str(voucher.qos_rate_max_up) + " " + UnitOfDataRate.KILOBITS_PER_SECOND
 
-        if voucher.get("qos_rate_max_down") > 0:
-            _x["rate_max_down"] = str(voucher.get("qos_rate_max_down")) + " " + UnitOfDataRate.KILOBITS_PER_SECOND
+        if voucher.qos_rate_max_down > 0:
+            _x["rate_max_down"] = str(voucher.qos_rate_max_down) + " " + UnitOfDataRate.KILOBITS_PER_SECOND
 
         self._additional_extra_state_attributes = _x
 
@@ -141,4 +192,105 @@ class UnifiVoucherSensor(UnifiVoucherEntity, SensorEntity):
         if (voucher := self._get_latest_voucher()) is None:
             return None
 
-        return voucher.get("code")
+        return voucher.code
+
+
+class UnifiVoucherMetricSensor(UnifiVoucherEntity, SensorEntity):
+    """Representation of a UniFi Hotspot Manager API metric sensor.
+
+    The state is the 95th percentile of the recent latencies of the operation
+    or the number of failed requests. It is written when requests have been
+    made, at most once per METRICS_UPDATE_DELAY.
+    """
+
+    entity_description: UnifiVoucherMetricSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: UnifiVoucherCoordinator,
+        entity_description: UnifiVoucherMetricSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor class."""
+        super().__init__(
+            coordinator=coordinator,
+            entity_type="sensor",
+            entity_key=entity_description.key,
+        )
+        self.entity_description = entity_description
+        self._cancel_write: CALLBACK_TYPE | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Listen for recorded API requests."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.client.metrics.async_add_listener(self._handle_metrics_update)
+        )
+        self.async_on_remove(self._async_cancel_write)
+
+    @callback
+    def _handle_metrics_update(self) -> None:
+        """Schedule state write, requests of one refresh are written together."""
+        if self._cancel_write is None:
+            self._cancel_write = async_call_later(
+                self.hass,
+                METRICS_UPDATE_DELAY,
+                self._async_write_metrics,
+            )
+
+    @callback
+    def _async_write_metrics(self, _now: any) -> None:
+        """Write state with the recorded metrics."""
+        self._cancel_write = None
+        self._update_handler()
+        self.async_write_ha_state()
+
+    @callback
+    def _async_cancel_write(self) -> None:
+        """Cancel scheduled state write."""
+        if self._cancel_write is not None:
+            self._cancel_write()
+            self._cancel_write = None
+
+    @property
+    def available(self) -> bool:
+        """Return True, the metrics are most interesting while requests fail."""
+        return True
+
+    def _update_extra_state_attributes(self) -> None:
+        """Update extra attributes."""
+        metrics = self.coordinator.client.metrics
+        if self.entity_description.operation is None:
+            self._additional_extra_state_attributes = {
+                "errors": metrics.errors,
+            }
+            return
+
+        if (_metrics := metrics.get(self.entity_description.operation)) is None:
+            self._additional_extra_state_attributes = {}
+            return
+
+        _x = _metrics.as_dict()
+        self._additional_extra_state_attributes = {
+            "count": _x["count"],
+            "errors": _x["errors"],
+            "last": _x["latency_ms"]["last"],
+            "mean": _x["latency_ms"]["mean"],
+            "median": _x["latency_ms"]["median"],
+            "max": _x["latency_ms"]["max"],
+            "payload_bytes": _x["payload_bytes"]["last"],
+        }
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the native value of the sensor."""
+        metrics = self.coordinator.client.metrics
+        if self.entity_description.operation is None:
+            return sum(metrics.errors.values())
+
+        if (_metrics := metrics.get(self.entity_description.operation)) is None:
+            return None
+
+        if (_latency := _metrics.percentile(95)) is None:
+            return None
+
+        return round(_latency * 1000, 1)
@@ -1,6 +1,8 @@
 """UniFi Hotspot Manager integration."""
 from __future__ import annotations
 
+import asyncio
+
 import voluptuous as vol
 
 from homeassistant.core import (
@@ -17,6 +19,7 @@ from homeassistant.helpers.service import (
 from .const import (
     LOGGER,
     DOMAIN,
+    PROFILE_SERVICE_CALL,
     CONF_VOUCHER_NUMBER,
     CONF_VOUCHER_QUOTA,
     CONF_VOUCHER_DURATION,
@@ -26,11 +29,15 @@ from .const import (
     DEFAULT_VOUCHER,
 )
 from .coordinator import UnifiVoucherCoordinator
+from .models import VoucherRecord
+from .sheet import SHEET_FORMATS
 
 SERVICE_LIST = "list"
 SERVICE_CREATE = "create"
 SERVICE_DELETE = "delete"
 SERVICE_UPDATE = "update"
+SERVICE_PROFILE = "profile"
+SERVICE_PRINT = "print"
 
 @callback
 def async_setup_services(
@@ -42,73 +49,102 @@ def async_setup_services(
     @verify_domain_control(DOMAIN)
     async def async_list(service_call: ServiceCall) -> ServiceResponse:
         LOGGER.debug(service_call)
-        _vouchers = []
-        vouchers = coordinator.vouchers.values()
-        for voucher in vouchers:
-            _x = {
-                "id": voucher.get("id"),
-                "code": voucher.get("code"),
-                "quota": voucher.get("quota"),
-                "used": voucher.get("used"),
-                "duration": int(voucher.get("duration").total_seconds() / 3600),
-                "status": voucher.get("status"),
-                "create_time": voucher.get("create_time"),
-            }
-            if voucher.get("start_time") is not None:
-                _x["start_time"] = voucher.get("start_time")
-
-            if voucher.get("end_time") is not None:
-                _x["end_time"] = voucher.get("end_time")
-
-            if voucher.get("status_expires") is not None:
-                _x["status_expires"] = int(voucher["status_expires"].total_seconds() / 3600)
-
-            if voucher.get("qos_usage_quota") > 0:
-                _x["usage_quota"] = voucher.get("qos_usage_quota")
-
-            if voucher.get("qos_rate_max_up") > 0:
-                _x["rate_max_up"] = voucher.get("qos_rate_max_up")
+        async with coordinator.profile(PROFILE_SERVICE_CALL):
+            return _list_vouchers(service_call)
 
-            if voucher.get("qos_rate_max_down") > 0:
-                _x["rate_max_down"] = voucher.get("qos_rate_max_down")
-
-            _vouchers.append(_x)
+    def _list_vouchers(service_call: ServiceCall) -> ServiceResponse:
+        _vouchers = [
+            voucher.as_service_dict()
+            for voucher in _get_vouchers(service_call)
+        ]
 
         return {
             "count": len(_vouchers),
-            "vouchers": list(_vouchers),
+            "vouchers": _vouchers,
         }
 
+    def _get_vouchers(service_call: ServiceCall) -> list[VoucherRecord]:
+        _note = service_call.data.get("note")
+        _status = service_call.data.get("status")
+
+        if _note is not None:
+            vouchers = coordinator.get_vouchers_by_note(_note)
+            if _status is not None:
+                vouchers = [
+                    voucher
+                    for voucher in vouchers
+                    if voucher.status == _status
+                ]
+        elif _status is not None:
+            vouchers = coordinator.get_vouchers_by_status(_status)
+        else:
+            vouchers = list(coordinator.vouchers.values())
+
+        return vouchers
+
     @verify_domain_control(DOMAIN)
     async def async_create(service_call: ServiceCall) -> None:
         LOGGER.debug(service_call)
-        await coordinator.async_create_voucher(
-            number=service_call.data.get("number"),
-            quota=service_call.data.get("quota"),
-            duration=service_call.data.get("duration"),
-            usage_quota=service_call.data.get("usage_quota"),
-            rate_max_up=service_call.data.get("rate_max_up"),
-            rate_max_down=service_call.data.get("rate_max_down"),
-            note=service_call.data.get("note"),
-        )
+        async with coordinator.profile(PROFILE_SERVICE_CALL):
+            await coordinator.async_create_voucher(
+                number=service_call.data.get("number"),
+                quota=service_call.data.get("quota"),
+                duration=service_call.data.get("duration"),
+                usage_quota=service_call.data.get("usage_quota"),
+                rate_max_up=service_call.data.get("rate_max_up"),
+                rate_max_down=service_call.data.get("rate_max_down"),
+                note=service_call.data.get("note"),
+            )
 
     @verify_domain_control(DOMAIN)
     async def async_delete(service_call: ServiceCall) -> None:
         LOGGER.debug(service_call)
-        await coordinator.async_delete_voucher(
-            obj_id=service_call.data.get("id"),
-        )
+        async with coordinator.profile(PROFILE_SERVICE_CALL):
+            await coordinator.async_delete_voucher(
+                obj_id=service_call.data.get("id"),
+            )
 
     @verify_domain_control(DOMAIN)
     async def async_update(service_call: ServiceCall) -> None:
         LOGGER.debug(service_call)
-        await coordinator.async_update_vouchers()
+        async with coordinator.profile(PROFILE_SERVICE_CALL):
+            await coordinator.async_update_vouchers()
+
+    @verify_domain_control(DOMAIN)
+    async def async_profile(service_call: ServiceCall) -> ServiceResponse:
+        LOGGER.debug(service_call)
+        task = coordinator.async_start_profile(
+            count=service_call.data["count"],
+            trace_memory=service_call.data["trace_memory"],
+            timeout=service_call.data["timeout"],
+        )
+        if not service_call.return_response:
+            return None
+
+        # Profiling continues in background if the call is cancelled
+        return await asyncio.shield(task)
+
+    @verify_domain_control(DOMAIN)
+    async def async_print(service_call: ServiceCall) -> ServiceResponse:
+        LOGGER.debug(service_call)
+        async with coordinator.profile(PROFILE_SERVICE_CALL):
+            return await coordinator.async_print_vouchers(
+                vouchers=_get_vouchers(service_call),
+                kind=service_call.data["format"],
+                qrcodes=service_call.data["qr_codes"],
+                logo=service_call.data["logo"],
+            )
 
     hass.services.async_register(
         domain=DOMAIN,
         service=SERVICE_LIST,
         service_func=async_list,
-        schema=vol.Schema({}),
+        schema=vol.Schema(
+            {
+                vol.Optional("status"): vol.All(str, vol.Upper),
+                vol.Optional("note"): str,
+            }
+        ),
         supports_response=SupportsResponse.ONLY,
     )
     hass.services.async_register(
@@ -117,60 +153,42 @@ def async_setup_services(
         service_func=async_create,
         schema=vol.Schema(
             {
-                vol.Optional(
-                    "number",
-                    default=coordinator.get_entry_option(CONF_VOUCHER_NUMBER)
-                ): vol.All(
+                vol.Optional("number"): vol.All(
                     vol.Coerce(int),
                     vol.Range(
                         min=DEFAULT_VOUCHER[CONF_VOUCHER_NUMBER].get("min", 1),
                         max=DEFAULT_VOUCHER[CONF_VOUCHER_NUMBER].get("max", 10000),
                     )
                 ),
-                vol.Optional(
-                    "quota",
-                    default=coordinator.get_entry_option(CONF_VOUCHER_QUOTA)
-                ): vol.All(
+                vol.Optional("quota"): vol.All(
                     vol.Coerce(int),
                     vol.Range(
                         min=DEFAULT_VOUCHER[CONF_VOUCHER_QUOTA].get("min", 0),
                         max=DEFAULT_VOUCHER[CONF_VOUCHER_QUOTA].get("max", 10000),
                     )
                 ),
-                vol.Optional(
-                    "duration",
-                    default=coordinator.get_entry_option(CONF_VOUCHER_DURATION)
-                ): vol.All(
+                vol.Optional("duration"): vol.All(
                     vol.Coerce(int),
                     vol.Range(
                         min=DEFAULT_VOUCHER[CONF_VOUCHER_DURATION].get("min", 1),
                         max=DEFAULT_VOUCHER[CONF_VOUCHER_DURATION].get("max", 1000000),
                     )
                 ),
-                vol.Optional(
-                    "usage_quota",
-                    default=coordinator.get_entry_option(CONF_VOUCHER_USAGE_QUOTA)
-                ): vol.All(
+                vol.Optional("usage_quota"): vol.All(
                     vol.Coerce(int),
                     vol.Range(
                         min=DEFAULT_VOUCHER[CONF_VOUCHER_USAGE_QUOTA].get("min", 0),
                         max=DEFAULT_VOUCHER[CONF_VOUCHER_USAGE_QUOTA].get("max", 1048576),
                     )
                 ),
-                vol.Optional(
-                    "rate_max_up",
-                    default=coordinator.get_entry_option(CONF_VOUCHER_RATE_MAX_UP)
-                ): vol.All(
+                vol.Optional("rate_max_up"): vol.All(
                     vol.Coerce(int),
                     vol.Range(
                         min=DEFAULT_VOUCHER[CONF_VOUCHER_RATE_MAX_UP].get("min", 0),
                         max=DEFAULT_VOUCHER[CONF_VOUCHER_RATE_MAX_UP].get("max", 100000),
                     )
                 ),
-                vol.Optional(
-                    "rate_max_down",
-                    default=coordinator.get_entry_option(CONF_VOUCHER_RATE_MAX_DOWN)
-                ): vol.All(
+                vol.Optional("rate_max_down"): vol.All(
                     vol.Coerce(int),
                     vol.Range(
                         min=DEFAULT_VOUCHER[CONF_VOUCHER_RATE_MAX_DOWN].get("min", 0),
@@ -197,6 +215,40 @@ def async_setup_services(
         service_func=async_update,
         schema=vol.Schema({}),
     )
+    hass.services.async_register(
+        domain=DOMAIN,
+        service=SERVICE_PROFILE,
+        service_func=async_profile,
+        schema=vol.Schema(
+            {
+                vol.Optional("count", default=3): vol.All(
+                    vol.Coerce(int),
+                    vol.Range(min=1, max=100),
+                ),
+                vol.Optional("trace_memory", default=False): bool,
+                vol.Optional("timeout", default=900): vol.All(
+                    vol.Coerce(int),
+                    vol.Range(min=10, max=3600),
+                ),
+            }
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        domain=DOMAIN,
+        service=SERVICE_PRINT,
+        service_func=async_print,
+        schema=vol.Schema(
+            {
+                vol.Optional("status"): vol.All(str, vol.Upper),
+                vol.Optional("note"): str,
+                vol.Optional("format", default="pdf"): vol.In(SHEET_FORMATS),
+                vol.Optional("qr_codes", default=True): bool,
+                vol.Optional("logo", default=True): bool,
+            }
+        ),
+        supports_response=SupportsResponse.ONLY,
+    )
 
 @callback
 def async_unload_services(hass: HomeAssistant) -> None:
@@ -205,3 +257,5 @@ def async_unload_services(hass: HomeAssistant) -> None:
     hass.services.async_remove(DOMAIN, SERVICE_CREATE)
     hass.services.async_remove(DOMAIN, SERVICE_DELETE)
     hass.services.async_remove(DOMAIN, SERVICE_UPDATE)
+    hass.services.async_remove(DOMAIN, SERVICE_PROFILE)
+    hass.services.async_remove(DOMAIN, SERVICE_PRINT)
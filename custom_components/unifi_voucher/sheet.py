@@ -0,0 +1,372 @@
+"""Printable voucher sheets for UniFi Hotspot Manager."""
+from __future__ import annotations
+
+import contextlib
+import io
+import os
+import zlib
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+)
+
+from homeassistant.const import (
+    UnitOfDataRate,
+    UnitOfInformation,
+    UnitOfTime,
+)
+
+from .models import VoucherRecord
+from .qrcode import (
+    QrCodeRequest,
+    UnifiVoucherQrCodeCache,
+)
+
+if TYPE_CHECKING:
+    from PIL import (
+        Image,
+        ImageFont,
+    )
+
+SHEET_FORMATS = ("pdf", "png")
+# Below the configuration directory
+SHEET_DIRECTORY = "unifi_voucher_sheets"
+# A4 portrait at 150 dpi, ten vouchers per page
+SHEET_RESOLUTION = 150
+SHEET_SIZE = (1240, 1754)
+SHEET_MARGIN = 60
+SHEET_HEADER = 110
+SHEET_GAP = 20
+SHEET_COLUMNS = 2
+SHEET_ROWS = 5
+SHEET_VOUCHERS_PER_PAGE = SHEET_COLUMNS * SHEET_ROWS
+
+
+@dataclass(frozen=True, slots=True)
+class SheetVoucher:
+    """Text and QR code of a voucher card, everything a page needs."""
+
+    code: str
+    lines: tuple[str, ...]
+    qrcode: bytes | None = None
+
+    @classmethod
+    def from_record(
+        cls,
+        voucher: VoucherRecord,
+        qrcode: bytes | None = None,
+    ) -> SheetVoucher:
+        """Create voucher card from the snapshot."""
+        _code = voucher.code
+        if len(_code) == 10 and _code.isdigit():
+            # Same grouping as UniFi Network shows the code
+            _code = f"{_code[:5]}-{_code[5:]}"
+
+        _lines = [
+            f"Duration: {_format_duration(voucher.duration)}",
+            f"Quota: {voucher.quota if voucher.quota > 0 else 'unlimited'}",
+        ]
+        if voucher.qos_usage_quota > 0:
+            _lines.append(f"Usage quota: {voucher.qos_usage_quota} {UnitOfInformation.MEGABYTES}")
+
+        if voucher.qos_rate_max_up > 0:
+            _lines.append(f"Upload: {voucher.qos_rate_max_up} {UnitOfDataRate.KILOBITS_PER_SECOND}")
+
+        if voucher.qos_rate_max_down > 0:
+            _lines.append(f"Download: {voucher.qos_rate_max_down} {UnitOfDataRate.KILOBITS_PER_SECOND}")
+
+        if (_note := voucher.note_tag) is not None:
+            _lines.append(_note)
+
+        return cls(
+            code=_code,
+            lines=tuple(_lines),
+            qrcode=qrcode,
+        )
+
+
+class UnifiVoucherSheet:
+    """Printable sheet of voucher cards, written page by page.
+
+    Only the current page is held in memory. A PDF is extended page by page,
+    PNG pages are written to one file each. All methods except the
+    constructor run in the executor.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        kind: str,
+        title: str,
+        pages: int,
+        logo_path: str | None = None,
+    ) -> None:
+        """Initialize the sheet, path is the file name without extension."""
+        self.path = path
+        self.kind = kind
+        self.title = title
+        self.pages = pages
+        self.logo_path = logo_path
+        self.files: list[str] = []
+        self._fonts: dict[int, ImageFont.ImageFont] = {}
+        self._logo: Image.Image | None = None
+        self._pdf: UnifiVoucherPdfWriter | None = None
+
+    def open(
+        self,
+        qrcode_cache: UnifiVoucherQrCodeCache,
+    ) -> None:
+        """Create the directory, load fonts and logo once for all pages."""
+        from PIL import ImageFont
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        for _size in (24, 48):
+            self._fonts[_size] = ImageFont.load_default(_size)
+
+        if (_logo_stat := QrCodeRequest("", logo_path=self.logo_path).logo_stat()) is not None:
+            self._logo = qrcode_cache.get_logo(self.logo_path, _logo_stat, SHEET_HEADER - SHEET_GAP)
+
+    def write_page(
+        self,
+        page: int,
+        vouchers: list[SheetVoucher],
+    ) -> str:
+        """Render page and write it, return the file name."""
+        _image = self._render_page(page, vouchers)
+        if self.kind == "pdf":
+            _file = f"{self.path}.pdf"
+            if self._pdf is None:
+                self.files.append(_file)
+                self._pdf = UnifiVoucherPdfWriter(open(_file, "xb"), SHEET_RESOLUTION)
+            self._pdf.add_page(_image)
+        else:
+            _file = f"{self.path}.{page:03}.png"
+            self.files.append(_file)
+            with open(_file, "xb") as _fp:
+                _image.save(
+                    _fp,
+                    format="PNG",
+                    dpi=(SHEET_RESOLUTION, SHEET_RESOLUTION),
+                )
+        _image.close()
+        return _file
+
+    def close(self) -> None:
+        """Complete the PDF after the last page."""
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+    def remove(self) -> None:
+        """Remove the files written so far."""
+        if self._pdf is not None:
+            self._pdf.abort()
+            self._pdf = None
+        for _file in self.files:
+            with contextlib.suppress(OSError):
+                os.remove(_file)
+        self.files.clear()
+
+    def _render_page(
+        self,
+        page: int,
+        vouchers: list[SheetVoucher],
+    ) -> Image.Image:
+        """Render header and voucher cards of a page."""
+        from PIL import (
+            Image,
+            ImageDraw,
+        )
+
+        # Grayscale is a third of the size, colors are only needed for the logo
+        _image = Image.new("RGB" if self._logo is not None else "L", SHEET_SIZE, "white")
+        _draw = ImageDraw.Draw(_image)
+
+        # Header with logo, title and page number
+        _x = SHEET_MARGIN
+        if self._logo is not None:
+            _image.paste(self._logo, (_x, SHEET_MARGIN), self._logo)
+            _x += self._logo.size[0] + SHEET_GAP
+        _draw.text((_x, SHEET_MARGIN), self.title, fill="black", font=self._fonts[48])
+        _draw.text(
+            (SHEET_SIZE[0] - SHEET_MARGIN, SHEET_MARGIN),
+            f"{page} / {self.pages}",
+            fill="black",
+            font=self._fonts[24],
+            anchor="ra",
+        )
+
+        _top = SHEET_MARGIN + SHEET_HEADER
+        _width = (SHEET_SIZE[0] - 2 * SHEET_MARGIN - (SHEET_COLUMNS - 1) * SHEET_GAP) // SHEET_COLUMNS
+        _height = (SHEET_SIZE[1] - _top - SHEET_MARGIN - (SHEET_ROWS - 1) * SHEET_GAP) // SHEET_ROWS
+        for _i, _voucher in enumerate(vouchers):
+            _row, _column = divmod(_i, SHEET_COLUMNS)
+            _left = SHEET_MARGIN + _column * (_width + SHEET_GAP)
+            _card_top = _top + _row * (_height + SHEET_GAP)
+            self._render_card(_image, _draw, _voucher, (_left, _card_top, _left + _width, _card_top + _height))
+
+        return _image
+
+    def _render_card(
+        self,
+        image: Image.Image,
+        draw: any,
+        voucher: SheetVoucher,
+        box: tuple[int, int, int, int],
+    ) -> None:
+        """Render a voucher card with code, parameters and QR code."""
+        from PIL import Image
+
+        _left, _top, _right, _bottom = box
+        draw.rounded_rectangle(box, radius=12, outline="black", width=2)
+
+        _x = _left + SHEET_GAP
+        _y = _top + SHEET_GAP
+        draw.text((_x, _y), voucher.code, fill="black", font=self._fonts[48])
+        _y += 64
+
+        # QR code below the code, its quiet zone separates it from the text
+        if voucher.qrcode is not None:
+            _size = _bottom - _y - SHEET_GAP
+            with Image.open(io.BytesIO(voucher.qrcode)) as _qrcode:
+                # Modules stay sharp when scaled
+                _qrcode = _qrcode.convert(image.mode).resize((_size, _size), Image.Resampling.NEAREST)
+            image.paste(_qrcode, (_right - SHEET_GAP - _size, _y))
+
+        for _line in voucher.lines:
+            draw.text((_x, _y), _line, fill="black", font=self._fonts[24])
+            _y += 32
+
+
+class UnifiVoucherPdfWriter:
+    """Minimal PDF writer with one lossless image per page.
+
+    Every page is written to the file once, only the offsets of the
+    objects are kept until the cross-reference table is written on close.
+    """
+
+    def __init__(
+        self,
+        fp: BinaryIO,
+        resolution: int,
+    ) -> None:
+        """Initialize the writer and write the header."""
+        self._fp = fp
+        self._resolution = resolution
+        self._offsets: list[int | None] = []
+        self._page_ids: list[int] = []
+        self._fp.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        # The page tree is written last, the pages refer to it by number
+        self._pages_id = self._reserve()
+
+    def add_page(
+        self,
+        image: Image.Image,
+    ) -> None:
+        """Write image of mode L or RGB as the next page."""
+        _width, _height = image.size
+        _data = zlib.compress(image.tobytes(), 6)
+        _image_id = self._write_object(
+            f"<< /Type /XObject /Subtype /Image /Width {_width} /Height {_height} "
+            f"/ColorSpace /{'DeviceRGB' if image.mode == 'RGB' else 'DeviceGray'} "
+            f"/BitsPerComponent 8 /Filter /FlateDecode /Length {len(_data)} >>",
+            _data,
+        )
+        del _data
+
+        # Page size in points from the resolution of the image
+        _page_width = _width * 72 / self._resolution
+        _page_height = _height * 72 / self._resolution
+        _content = f"q {_page_width:.2f} 0 0 {_page_height:.2f} 0 0 cm /Im0 Do Q".encode()
+        _content_id = self._write_object(f"<< /Length {len(_content)} >>", _content)
+        self._page_ids.append(
+            self._write_object(
+                f"<< /Type /Page /Parent {self._pages_id} 0 R "
+                f"/MediaBox [0 0 {_page_width:.2f} {_page_height:.2f}] "
+                f"/Resources << /XObject << /Im0 {_image_id} 0 R >> >> "
+                f"/Contents {_content_id} 0 R >>"
+            )
+        )
+
+    def close(self) -> None:
+        """Write page tree, catalog and cross-reference table."""
+        self._write_object(
+            f"<< /Type /Pages /Kids [{' '.join(f'{_id} 0 R' for _id in self._page_ids)}] "
+            f"/Count {len(self._page_ids)} >>",
+            number=self._pages_id,
+        )
+        _catalog_id = self._write_object(f"<< /Type /Catalog /Pages {self._pages_id} 0 R >>")
+
+        _xref = self._fp.tell()
+        self._fp.write(f"xref\n0 {len(self._offsets) + 1}\n0000000000 65535 f \n".encode())
+        for _offset in self._offsets:
+            self._fp.write(f"{_offset:010} 00000 n \n".encode())
+        self._fp.write(
+            f"trailer\n<< /Size {len(self._offsets) + 1} /Root {_catalog_id} 0 R >>\n"
+            f"startxref\n{_xref}\n%%EOF\n".encode()
+        )
+        self._fp.close()
+
+    def abort(self) -> None:
+        """Close the incomplete file."""
+        self._fp.close()
+
+    def _reserve(self) -> int:
+        """Reserve the number of an object written later."""
+        self._offsets.append(None)
+        return len(self._offsets)
+
+    def _write_object(
+        self,
+        dictionary: str,
+        stream: bytes | None = None,
+        number: int | None = None,
+    ) -> int:
+        """Write object with optional stream, return its number."""
+        if number is None:
+            number = self._reserve()
+        self._offsets[number - 1] = self._fp.tell()
+        self._fp.write(f"{number} 0 obj\n{dictionary}\n".encode())
+        if stream is not None:
+            self._fp.write(b"stream\n")
+            self._fp.write(stream)
+            self._fp.write(b"\nendstream\n")
+        self._fp.write(b"endobj\n")
+        return number
+
+
+def get_page_count(
+    count: int,
+) -> int:
+    """Return number of pages for count vouchers, at least one."""
+    return max(-(-count // SHEET_VOUCHERS_PER_PAGE), 1)
+
+
+def get_page(
+    vouchers: list[VoucherRecord],
+    page: int,
+) -> list[VoucherRecord]:
+    """Return vouchers of page, the first page is 1."""
+    return vouchers[(page - 1) * SHEET_VOUCHERS_PER_PAGE:page * SHEET_VOUCHERS_PER_PAGE]
+
+
+def _format_duration(
+    duration: timedelta,
+) -> str:
+    """Return duration in days, hours and minutes."""
+    seconds = int(duration.total_seconds())
+    strings = []
+    for period_key, period_seconds in (
+        (UnitOfTime.DAYS, 60*60*24),
+        (UnitOfTime.HOURS, 60*60),
+        (UnitOfTime.MINUTES, 60),
+    ):
+        if seconds >= period_seconds:
+            period_value, seconds = divmod(seconds, period_seconds)
+            strings.append(f"{period_value} {period_key}")
+
+    return ", ".join(strings)
@@ -0,0 +1,209 @@
+"""QR code rendering of UniFi Hotspot Manager, also the entry point of its worker processes.
+
+The module is loaded from its own directory under a top-level name, so a
+worker process imports it without the integration package and Home
+Assistant. It must only import the standard library, segno and Pillow.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import os
+
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Logos decoded by a worker process, the same as QRCODE_LOGO_CACHE_SIZE
+WORKER_LOGO_CACHE_SIZE = 4
+
+
+@dataclass(frozen=True, slots=True)
+class QrCodeRequest:
+    """Parameters which define a rendered QR code."""
+
+    content: str
+    error: str = "h"
+    scale: int = 5
+    kind: str = "png"
+    logo_path: str | None = None
+
+    def logo_stat(self) -> tuple[int, int] | None:
+        """Return modification time and size of the logo, None if there is no logo file."""
+        if not self.logo_path:
+            return None
+
+        try:
+            _stat = os.stat(self.logo_path)
+        except OSError:
+            return None
+        return _stat.st_mtime_ns, _stat.st_size
+
+    def digest(
+        self,
+        logo_stat: tuple[int, int] | None,
+    ) -> bytes:
+        """Return digest of all parameters, a changed logo file changes the digest."""
+        _hash = hashlib.blake2b(digest_size=16)
+        for _value in (
+            self.content,
+            self.error,
+            self.scale,
+            self.kind,
+            self.logo_path if logo_stat is not None else None,
+            logo_stat,
+        ):
+            _hash.update(repr(_value).encode())
+            _hash.update(b"\0")
+        return _hash.digest()
+
+
+# Logos decoded by a worker process, rendered QR codes are cached by the caller
+_worker_logos: OrderedDict[tuple[str, int, int, int], Image.Image] = OrderedDict()
+
+
+def render_qrcodes(
+    requests: list[QrCodeRequest],
+) -> list[bytes]:
+    """Render a batch of QR codes, runs in a worker process."""
+    _images = []
+    for _request in requests:
+        _logo_stat = _request.logo_stat()
+        _images.append(
+            render_qrcode(
+                _request,
+                logo_loader=(
+                    partial(_get_worker_logo, _request.logo_path, _logo_stat)
+                    if _logo_stat is not None
+                    else None
+                ),
+            )
+        )
+    return _images
+
+
+def _get_worker_logo(
+    path: str,
+    logo_stat: tuple[int, int],
+    max_size: int,
+) -> Image.Image:
+    """Return logo decoded once per file version and size by the worker process."""
+    _key = (path, *logo_stat, max_size)
+    if (logo := _worker_logos.get(_key)) is None:
+        logo = _worker_logos[_key] = load_logo(path, max_size)
+        while len(_worker_logos) > WORKER_LOGO_CACHE_SIZE:
+            _worker_logos.popitem(last=False)
+    return logo
+
+
+def render_qrcode(
+    request: QrCodeRequest,
+    logo_loader: Callable[[int], Image.Image] | None = None,
+) -> bytes:
+    """Render QR code in the format of the request, with the logo of logo_loader in the center if given."""
+    # The imaging stack is loaded with the first QR code, not with the platform
+    import segno
+
+    img_byte_arr = io.BytesIO()
+    img_qrcode = segno.make(request.content, error=request.error)
+    if request.kind == "svg":
+        return _render_svg(img_qrcode, request.scale, logo_loader)
+
+    # segno writes the smallest PNG if there is no logo
+    if logo_loader is None and request.kind != "webp":
+        img_qrcode.save(
+            out=img_byte_arr,
+            kind="png",
+            scale=request.scale,
+        )
+        return img_byte_arr.getvalue()
+
+    from PIL import Image
+
+    # Compose from the module matrix, identical to segno's PNG with the default quiet zone
+    _width, _height = img_qrcode.symbol_size(scale=1)
+    img_qrcode = Image.frombytes(
+        "L",
+        (_width, _height),
+        bytes(
+            0 if _dark else 255
+            for _row in img_qrcode.matrix_iter(scale=1)
+            for _dark in _row
+        ),
+    ).resize(
+        (_width * request.scale, _height * request.scale),
+        Image.Resampling.NEAREST,
+    ).convert("RGB")  # Ensure colors for the output
+    if logo_loader is not None:
+        img_width, img_height = img_qrcode.size
+        img_logo = logo_loader(img_height // 3)
+        img_qrcode.paste(
+            img_logo, ((img_width - img_logo.size[0]) // 2, (img_height - img_logo.size[1]) // 2), img_logo
+        )
+
+    if request.kind == "webp":
+        img_qrcode.save(
+            img_byte_arr,
+            format="WEBP",
+            # Lossless keeps the module edges sharp
+            lossless=True,
+        )
+    else:
+        img_qrcode.save(
+            img_byte_arr,
+            format="PNG",
+            optimize=request.kind == "png_optimized",
+        )
+    return img_byte_arr.getvalue()
+
+
+def _render_svg(
+    img_qrcode: any,
+    scale: int,
+    logo_loader: Callable[[int], Image.Image] | None = None,
+) -> bytes:
+    """Render QR code as SVG, the logo is embedded as PNG."""
+    img_byte_arr = io.BytesIO()
+    # With a viewBox instead of a fixed size the QR code scales with the card
+    img_qrcode.save(
+        out=img_byte_arr,
+        kind="svg",
+        scale=scale,
+        light="white",
+        omitsize=True,
+        xmldecl=False,
+    )
+    if logo_loader is None:
+        return img_byte_arr.getvalue()
+
+    img_width, img_height = img_qrcode.symbol_size(scale=scale)
+    img_logo = logo_loader(img_height // 3)
+    logo_byte_arr = io.BytesIO()
+    img_logo.save(logo_byte_arr, format="PNG")
+    _logo_width, _logo_height = img_logo.size
+    _image = (
+        f'<image x="{(img_width - _logo_width) // 2}" y="{(img_height - _logo_height) // 2}" '
+        f'width="{_logo_width}" height="{_logo_height}" '
+        f'href="data:image/png;base64,{base64.b64encode(logo_byte_arr.getvalue()).decode()}"/>'
+    )
+    return img_byte_arr.getvalue().replace(b"</svg>", _image.encode() + b"</svg>")
+
+
+def load_logo(
+    path: str,
+    max_size: int,
+) -> Image.Image:
+    """Decode logo, resize it to max_size and convert it for alpha compositing."""
+    from PIL import Image
+
+    with Image.open(path, "r") as img_logo:
+        # Decode large JPEGs at a reduced size right away
+        img_logo.draft("RGB", (max_size, max_size))
+        img_logo.thumbnail((max_size, max_size)) # Resize the logo to logo_max_size
+        return img_logo.convert("RGBA")
@@ -0,0 +1 @@
+"""Tests for the UniFi Hotspot Manager integration."""
@@ -0,0 +1,113 @@
+"""Fixtures for UniFi Hotspot Manager tests."""
+from __future__ import annotations
+
+from collections.abc import (
+    AsyncGenerator,
+    Callable,
+)
+from datetime import datetime
+
+import pytest
+
+from aiounifi.models.voucher import Voucher
+from homeassistant.core import HomeAssistant
+
+from benchmarks.controller_simulator import (
+    ControllerSimulator,
+    SimulatorConfig,
+)
+from custom_components.unifi_voucher.api import (
+    UnifiVoucherApiClient,
+    UnifiVoucherConnectionManager,
+)
+from custom_components.unifi_voucher.const import DEFAULT_IDENTIFIER_STRING
+from custom_components.unifi_voucher.models import VoucherRecord
+
+CREATE_TIME = 1700000000
+
+
+@pytest.fixture(name="raw_voucher")
+def raw_voucher_fixture() -> Callable[..., dict[str, any]]:
+    """Return factory of raw vouchers as listed by UniFi Network."""
+
+    def _raw_voucher(
+        index: int = 0,
+        **kwargs: any,
+    ) -> dict[str, any]:
+        _raw = {
+            "_id": f"{index:024x}",
+            "site_id": "5f0c0a8b4543a5559017060f",
+            "note": DEFAULT_IDENTIFIER_STRING,
+            "code": f"{index:010d}",
+            "quota": 1,
+            "duration": 1440.0,
+            "qos_overwrite": False,
+            "used": 0,
+            "create_time": CREATE_TIME,
+            "admin_name": "homeassistant",
+            "status": "VALID_ONE",
+            "status_expires": 0,
+        }
+        _raw.update(kwargs)
+        return _raw
+
+    return _raw_voucher
+
+
+@pytest.fixture(name="voucher")
+def voucher_fixture(
+    raw_voucher: Callable[..., dict[str, any]],
+) -> Callable[..., VoucherRecord]:
+    """Return factory of voucher records."""
+
+    def _voucher(
+        index: int = 0,
+        fetch_time: datetime | None = None,
+        **kwargs: any,
+    ) -> VoucherRecord:
+        return VoucherRecord.from_voucher(Voucher(raw_voucher(index, **kwargs)), fetch_time)
+
+    return _voucher
+
+
+@pytest.fixture(name="simulator_config")
+def simulator_config_fixture() -> SimulatorConfig:
+    """Return configuration of the controller simulator, parametrize to change it."""
+    return SimulatorConfig(
+        vouchers=20,
+        foreign_vouchers=5,
+        seed=0,
+    )
+
+
+@pytest.fixture(name="simulator")
+async def simulator_fixture(
+    socket_enabled: None,
+    simulator_config: SimulatorConfig,
+) -> AsyncGenerator[ControllerSimulator]:
+    """Return running controller simulator, connections are made to localhost only."""
+    async with ControllerSimulator(simulator_config) as simulator:
+        yield simulator
+
+
+@pytest.fixture(name="client")
+async def client_fixture(
+    hass: HomeAssistant,
+    simulator: ControllerSimulator,
+) -> AsyncGenerator[UnifiVoucherApiClient]:
+    """Return API client for the default site of the controller simulator."""
+    _connection = {
+        "host": "127.0.0.1",
+        "username": simulator.config.username,
+        "password": simulator.config.password,
+        "port": simulator.port,
+        "verify_ssl": False,
+    }
+    client = UnifiVoucherApiClient(
+        hass,
+        site_id="default",
+        connection=UnifiVoucherConnectionManager.get(hass).acquire(**_connection),
+        **_connection,
+    )
+    yield client
+    await client.async_close()
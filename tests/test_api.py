@@ -0,0 +1,377 @@
+"""Tests for the API client of UniFi Hotspot Manager."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import time
+
+from email.utils import formatdate
+
+import aiounifi
+import pytest
+
+from aiounifi.models.voucher import (
+    VoucherCreateRequest,
+    VoucherDeleteRequest,
+)
+
+from benchmarks.controller_simulator import (
+    ControllerSimulator,
+    SimulatorConfig,
+)
+from custom_components.unifi_voucher.api import (
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    METRICS_RECENT_SAMPLES,
+    UnifiVoucherApiCircuitOpenError,
+    UnifiVoucherApiClient,
+    UnifiVoucherApiConnectionError,
+    UnifiVoucherApiMetrics,
+    UnifiVoucherCircuitBreaker,
+    UnifiVoucherListRequest,
+    UnifiVoucherSiteRequest,
+    _get_jwt_expiry,
+    _get_operation,
+    _get_session_expiry,
+)
+
+
+def _open_breaker(
+    breaker: UnifiVoucherCircuitBreaker,
+) -> None:
+    """Record failures until the circuit opens."""
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_breaker_opens_after_threshold() -> None:
+    """Test that the circuit opens after the consecutive failures of the threshold."""
+    breaker = UnifiVoucherCircuitBreaker(failure_threshold=3, backoff_base=10)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+    breaker.before_request()
+
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 1
+    assert 5 <= breaker.retry_in <= 10
+    with pytest.raises(UnifiVoucherApiCircuitOpenError):
+        breaker.before_request()
+
+
+def test_breaker_success_resets_failures() -> None:
+    """Test that a response resets the consecutive failures."""
+    breaker = UnifiVoucherCircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.failures == 1
+
+
+def test_breaker_half_open_allows_one_trial() -> None:
+    """Test that only one trial request passes after the backoff."""
+    breaker = UnifiVoucherCircuitBreaker()
+    _open_breaker(breaker)
+    breaker.retry_at = time.monotonic()
+
+    breaker.before_request()
+    assert breaker.state == BREAKER_HALF_OPEN
+    with pytest.raises(UnifiVoucherApiCircuitOpenError):
+        breaker.before_request()
+
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED
+    assert breaker.trips == 0
+    breaker.before_request()
+
+
+def test_breaker_failed_trial_reopens_with_longer_backoff() -> None:
+    """Test that a failed trial request opens the circuit again."""
+    breaker = UnifiVoucherCircuitBreaker(backoff_base=10, backoff_max=15)
+    _open_breaker(breaker)
+    breaker.retry_at = time.monotonic()
+    breaker.before_request()
+
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 2
+    # Doubled backoff limited by backoff_max, with equal jitter
+    assert 7.5 <= breaker.backoff() <= 15
+
+
+def test_breaker_ignores_failures_while_open() -> None:
+    """Test that failures of requests started before the circuit opened do not trip it again."""
+    breaker = UnifiVoucherCircuitBreaker()
+    _open_breaker(breaker)
+    _retry_at = breaker.retry_at
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == BREAKER_OPEN
+    assert breaker.trips == 1
+    assert breaker.failures == breaker.failure_threshold
+    assert breaker.retry_at == _retry_at
+
+
+def test_breaker_context_manager() -> None:
+    """Test that the context manager records connection errors only."""
+
+    async def _request(
+        breaker: UnifiVoucherCircuitBreaker,
+        exception: Exception | None,
+    ) -> None:
+        async with breaker:
+            if exception is not None:
+                raise exception
+
+    breaker = UnifiVoucherCircuitBreaker(failure_threshold=2)
+    with pytest.raises(aiounifi.RequestError):
+        asyncio.run(_request(breaker, aiounifi.RequestError()))
+    assert breaker.failures == 1
+
+    # The controller responded
+    with pytest.raises(aiounifi.Unauthorized):
+        asyncio.run(_request(breaker, aiounifi.Unauthorized()))
+    assert breaker.failures == 0
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(_request(breaker, TimeoutError()))
+    asyncio.run(_request(breaker, None))
+    assert breaker.as_dict() == {
+        "state": BREAKER_CLOSED,
+        "failures": 0,
+        "trips": 0,
+        "retry_in": None,
+    }
+
+
+def _jwt(
+    payload: dict[str, any],
+) -> str:
+    """Return unsigned JSON web token with payload."""
+    _payload = base64.urlsafe_b64encode(json.dumps(payload).encode()).rstrip(b"=").decode()
+    return f"eyJhbGciOiJIUzI1NiJ9.{_payload}.c2lnbmF0dXJl"
+
+
+@pytest.mark.parametrize(
+    "cookie_header",
+    [None, "", "TOKEN=abc", 'TOKEN="unterminated'],
+)
+def test_session_expiry_unknown(
+    cookie_header: str | None,
+) -> None:
+    """Test that sessions without expiry are not renewed early."""
+    assert _get_session_expiry(cookie_header) is None
+
+
+def test_session_expiry_max_age() -> None:
+    """Test session expiry from the max-age attribute."""
+    _expiry = _get_session_expiry("unifises=abc; Max-Age=3600")
+    assert _expiry == pytest.approx(time.time() + 3600, abs=5)
+
+
+def test_session_expiry_expires() -> None:
+    """Test session expiry from the expires attribute."""
+    _expires = int(time.time()) + 7200
+    _expiry = _get_session_expiry(f'unifises=abc; expires="{formatdate(_expires, usegmt=True)}"')
+    assert _expiry == _expires
+
+
+def test_session_expiry_jwt() -> None:
+    """Test session expiry of a UniFi OS token, the earliest of all cookies."""
+    _expires = int(time.time()) + 600
+    assert _get_session_expiry(f"TOKEN={_jwt({'exp': _expires})}") == _expires
+    assert _get_session_expiry(
+        f"TOKEN={_jwt({'exp': _expires})}; other={_jwt({'exp': _expires + 60})}"
+    ) == _expires
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "abc",
+        "a.b",
+        "a.!!!.c",
+        _jwt({"sub": "homeassistant"}),
+        _jwt({"exp": "tomorrow"}),
+        "a." + base64.urlsafe_b64encode(b"[1]").decode() + ".c",
+    ],
+)
+def test_jwt_expiry_invalid(
+    value: str,
+) -> None:
+    """Test that values without exp claim are no token."""
+    assert _get_jwt_expiry(value) is None
+
+
+def test_site_request_fingerprint() -> None:
+    """Test that an identical response is detected and not decoded."""
+    _raw = b'{"meta": {"rc": "ok"}, "data": [{"_id": "abc"}]}'
+    request = UnifiVoucherSiteRequest.create(UnifiVoucherListRequest.create(), "lobby")
+    assert request.decode(_raw) == {"meta": {"rc": "ok"}, "data": [{"_id": "abc"}]}
+    assert not request.unchanged
+    assert request.size == len(_raw)
+    assert request.full_path("default", False) == "/api/s/lobby/stat/voucher"
+
+    unchanged = UnifiVoucherSiteRequest.create(
+        UnifiVoucherListRequest.create(),
+        "lobby",
+        fingerprint=request.fingerprint,
+    )
+    assert unchanged.decode(_raw) == {}
+    assert unchanged.unchanged
+    assert unchanged.fingerprint == request.fingerprint
+
+    changed = UnifiVoucherSiteRequest.create(
+        UnifiVoucherListRequest.create(),
+        "lobby",
+        fingerprint=request.fingerprint,
+    )
+    assert changed.decode(b'{"meta": {"rc": "ok"}, "data": []}') == {"meta": {"rc": "ok"}, "data": []}
+    assert not changed.unchanged
+    assert changed.fingerprint != request.fingerprint
+
+
+def test_site_request_error_response() -> None:
+    """Test that error responses raise, even with a fingerprint."""
+    _raw = b'{"meta": {"rc": "error", "msg": "api.err.LoginRequired"}, "data": []}'
+    request = UnifiVoucherSiteRequest.create(
+        UnifiVoucherListRequest.create(),
+        "default",
+        fingerprint=b"0" * 16,
+    )
+    with pytest.raises(aiounifi.LoginRequired):
+        request.decode(_raw)
+
+
+def test_metrics_record() -> None:
+    """Test latency, error and payload metrics of an operation."""
+    metrics = UnifiVoucherApiMetrics()
+    assert metrics.get("list") is None
+
+    metrics.record("list", 0.2, size=100)
+    metrics.record("list", 0.04, size=300)
+    metrics.record("list", 3.0, error=UnifiVoucherApiConnectionError())
+
+    _metrics = metrics.get("list")
+    assert _metrics.count == 3
+    assert _metrics.last == 3.0
+    assert _metrics.max == 3.0
+    assert _metrics.percentile(50) == 0.2
+    assert _metrics.percentile(95) == 3.0
+    assert _metrics.errors == {"UnifiVoucherApiConnectionError": 1}
+
+    _x = _metrics.as_dict()
+    assert _x["latency_ms"]["mean"] == 1080.0
+    assert _x["histogram"]["le_50"] == 1
+    assert _x["histogram"]["le_250"] == 1
+    assert _x["histogram"]["le_5000"] == 1
+    assert _x["payload_bytes"] == {"total": 400, "last": 300, "max": 300}
+
+
+def test_metrics_record_without_duration() -> None:
+    """Test that requests which have not been made only count as error."""
+    metrics = UnifiVoucherApiMetrics()
+    metrics.record("create", None, error=UnifiVoucherApiCircuitOpenError())
+
+    _metrics = metrics.get("create")
+    assert _metrics.count == 0
+    assert _metrics.percentile(95) is None
+    assert _metrics.as_dict()["latency_ms"]["mean"] is None
+    assert metrics.errors == {"UnifiVoucherApiCircuitOpenError": 1}
+
+
+def test_metrics_errors_and_listeners() -> None:
+    """Test error totals of all operations and listener callbacks."""
+    metrics = UnifiVoucherApiMetrics()
+    _calls = []
+    remove_listener = metrics.async_add_listener(lambda: _calls.append(True))
+
+    metrics.record("login", 0.1, error=aiounifi.Unauthorized())
+    metrics.record("list", 0.1, error=aiounifi.Unauthorized())
+    metrics.record("delete", 0.1, error=aiounifi.RequestError())
+    assert metrics.errors == {"Unauthorized": 2, "RequestError": 1}
+    assert len(_calls) == 3
+
+    remove_listener()
+    metrics.record("list", 0.1)
+    assert len(_calls) == 3
+    assert set(metrics.as_dict()["operations"]) == {"login", "list", "delete"}
+
+
+def test_metrics_recent_samples_bounded() -> None:
+    """Test that percentiles are calculated of the recent samples only."""
+    metrics = UnifiVoucherApiMetrics()
+    for _ in range(METRICS_RECENT_SAMPLES):
+        metrics.record("list", 5.0)
+    for _ in range(METRICS_RECENT_SAMPLES):
+        metrics.record("list", 0.01)
+
+    _metrics = metrics.get("list")
+    assert _metrics.count == 2 * METRICS_RECENT_SAMPLES
+    assert _metrics.percentile(95) == 0.01
+    assert _metrics.max == 5.0
+
+
+def test_get_operation() -> None:
+    """Test operation names of the requests."""
+    assert _get_operation(UnifiVoucherListRequest.create()) == "list"
+    assert _get_operation(UnifiVoucherListRequest.create(create_time=1700000000)) == "list"
+    assert _get_operation(
+        VoucherCreateRequest.create(expire_number=1, expire_unit=60)
+    ) == "create"
+    assert _get_operation(VoucherDeleteRequest.create("abc")) == "delete"
+
+
+async def test_client_login_expiry(
+    client: UnifiVoucherApiClient,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that a request rejected with an expired session is made again after a new login."""
+    assert len(await client.list_vouchers()) == 25
+    assert simulator.stats.logins == 1
+
+    simulator.expire_sessions()
+    assert len(await client.list_vouchers()) == 25
+    assert simulator.stats.logins == 2
+    assert simulator.stats.rejected == 1
+
+
+async def test_client_fingerprint(
+    client: UnifiVoucherApiClient,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that an unchanged voucher list is recognized by its fingerprint."""
+    _fingerprint, _vouchers = await client.list_vouchers_if_changed(None)
+    assert len(_vouchers) == 25
+    assert await client.list_vouchers_if_changed(_fingerprint) == (_fingerprint, None)
+
+    simulator.use_voucher("default", _vouchers[0]["_id"])
+    _changed, _vouchers = await client.list_vouchers_if_changed(_fingerprint)
+    assert _changed != _fingerprint
+    assert len(_vouchers) == 25
+
+
+@pytest.mark.parametrize(
+    "simulator_config",
+    [SimulatorConfig(error_rate=1.0, seed=0)],
+)
+async def test_client_breaker_opens(
+    client: UnifiVoucherApiClient,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that the circuit opens after failed requests and later requests are not made."""
+    breaker = client.connection.breaker
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(UnifiVoucherApiConnectionError):
+            await client.list_vouchers()
+    assert breaker.state == BREAKER_OPEN
+
+    _requests = simulator.stats.requests.total()
+    with pytest.raises(UnifiVoucherApiCircuitOpenError):
+        await client.list_vouchers()
+    assert simulator.stats.requests.total() == _requests
@@ -0,0 +1,325 @@
+"""Tests for the coordinator of UniFi Hotspot Manager."""
+from __future__ import annotations
+
+import asyncio
+
+from collections.abc import (
+    AsyncGenerator,
+    Callable,
+)
+
+import pytest
+
+from aiounifi.models.voucher import (
+    VoucherCreateRequest,
+    VoucherDeleteRequest,
+)
+
+from homeassistant.const import (
+    CONF_HOST,
+    CONF_PASSWORD,
+    CONF_PORT,
+    CONF_USERNAME,
+    CONF_VERIFY_SSL,
+)
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from benchmarks.controller_simulator import (
+    SIMULATOR_PASSWORD,
+    SIMULATOR_USERNAME,
+    ControllerSimulator,
+    SimulatorConfig,
+)
+from custom_components.unifi_voucher.api import BREAKER_OPEN
+from custom_components.unifi_voucher.const import (
+    DOMAIN,
+    CONF_SITE_ID,
+    CONF_PUSH_UPDATES,
+    DEFAULT_IDENTIFIER_STRING,
+    FETCH_INCREMENTAL_RECENT_BATCHES,
+)
+from custom_components.unifi_voucher import coordinator as coordinator_module
+from custom_components.unifi_voucher.coordinator import UnifiVoucherCoordinator
+
+from .conftest import CREATE_TIME
+
+
+async def async_create_coordinator(
+    hass: HomeAssistant,
+    port: int = 8443,
+    **options: any,
+) -> UnifiVoucherCoordinator:
+    """Create coordinator of a config entry for the controller simulator."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_HOST: "127.0.0.1",
+            CONF_USERNAME: SIMULATOR_USERNAME,
+            CONF_PASSWORD: SIMULATOR_PASSWORD,
+            CONF_PORT: port,
+            CONF_SITE_ID: "default",
+            CONF_VERIFY_SSL: False,
+        },
+        options=options,
+    )
+    config_entry.add_to_hass(hass)
+    return UnifiVoucherCoordinator(hass, config_entry)
+
+
+async def async_close_coordinator(
+    coordinator: UnifiVoucherCoordinator,
+) -> None:
+    """Stop push updates, scheduled updates and release the connection."""
+    coordinator.async_stop_push()
+    if coordinator._scheduled_update_listeners is not None:
+        coordinator._scheduled_update_listeners.cancel()
+    await coordinator.client.async_close()
+
+
+async def async_wait_for(
+    condition: Callable[[], bool],
+) -> None:
+    """Wait until condition is true, e.g. after a push message."""
+    async with asyncio.timeout(5):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+@pytest.fixture(name="coordinator")
+async def coordinator_fixture(
+    hass: HomeAssistant,
+) -> AsyncGenerator[UnifiVoucherCoordinator]:
+    """Return coordinator without a controller."""
+    coordinator = await async_create_coordinator(hass)
+    yield coordinator
+    await async_close_coordinator(coordinator)
+
+
+@pytest.fixture(name="simulator_coordinator")
+async def simulator_coordinator_fixture(
+    hass: HomeAssistant,
+    simulator: ControllerSimulator,
+) -> AsyncGenerator[UnifiVoucherCoordinator]:
+    """Return coordinator of the controller simulator with push updates, the snapshot is fetched."""
+    coordinator = await async_create_coordinator(
+        hass,
+        simulator.port,
+        **{CONF_PUSH_UPDATES: True},
+    )
+    await coordinator.initialize()
+    await coordinator.async_fetch_vouchers(force=True)
+    yield coordinator
+    await async_close_coordinator(coordinator)
+
+
+def _voucher_list_requests(
+    simulator: ControllerSimulator,
+    method: str,
+) -> int:
+    """Return number of voucher list requests with method served by the simulator."""
+    return sum(
+        _count
+        for _request, _count in simulator.stats.requests.items()
+        if _request.startswith(method) and _request.endswith("/stat/voucher")
+    )
+
+
+async def test_push_message_malformed(
+    coordinator: UnifiVoucherCoordinator,
+    raw_voucher: Callable[..., dict[str, any]],
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Test that a malformed message is skipped and later messages are applied."""
+    _first = raw_voucher(0)
+    _malformed = raw_voucher(1)
+    del _malformed["quota"]
+    _second = raw_voucher(2)
+
+    coordinator._async_handle_push_message({"meta": {"message": "voucher:add"}, "data": [_first]})
+    coordinator._async_handle_push_message({"meta": {"message": "voucher:add"}, "data": [_malformed, _second]})
+    coordinator._async_handle_push_message({"meta": {"message": "voucher:delete"}, "data": [_first["_id"]]})
+    assert "Skip malformed UniFi Network message" in caplog.text
+    assert list(coordinator.vouchers) == [_first["_id"]]
+    # Snapshot is refreshed for the skipped messages
+    assert coordinator._push_refresh is not None
+
+    coordinator._async_handle_push_message({"meta": {"message": "voucher:add"}, "data": [_second]})
+    coordinator._async_handle_push_message({"meta": {"message": "voucher:delete"}, "data": [{"_id": _first["_id"]}]})
+    assert list(coordinator.vouchers) == [_second["_id"]]
+    assert coordinator.latest_voucher_id == _second["_id"]
+
+
+async def test_fetch_incremental_batches(
+    coordinator: UnifiVoucherCoordinator,
+    raw_voucher: Callable[..., dict[str, any]],
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that active and latest batches are fetched incrementally, the others are kept."""
+    # One voucher per batch, the oldest one is in use
+    _raw = [
+        raw_voucher(_i, create_time=CREATE_TIME + _i)
+        for _i in range(8)
+    ]
+    _raw[0].update(quota=0, used=1, start_time=CREATE_TIME, status="VALID_MULTI")
+    _requests = []
+
+    async def _list_vouchers_if_changed(
+        fingerprint: bytes | None,
+        create_time: int | None = None,
+    ) -> tuple[bytes | None, list[dict[str, any]]]:
+        _requests.append(create_time)
+        return None, [
+            _v
+            for _v in _raw
+            if create_time is None or _v["create_time"] == create_time
+        ]
+
+    monkeypatch.setattr(coordinator.client, "list_vouchers_if_changed", _list_vouchers_if_changed)
+
+    await coordinator._async_fetch_vouchers()
+    assert _requests == [None]
+    assert len(coordinator.vouchers) == 8
+
+    _requests.clear()
+    _raw[7]["used"] = 1
+    _raw[7]["status"] = "USED"
+    await coordinator._async_fetch_vouchers()
+    assert _requests == [CREATE_TIME] + [CREATE_TIME + _i for _i in range(8 - FETCH_INCREMENTAL_RECENT_BATCHES, 8)]
+    assert len(_requests) > 2
+    # Used up voucher is dropped, vouchers of the batches not requested are kept
+    assert len(coordinator.vouchers) == 7
+    assert coordinator.last_changes.removed == {_raw[7]["_id"]}
+
+
+async def test_simulator_fetch(
+    simulator_coordinator: UnifiVoucherCoordinator,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that HA generated vouchers not used up are fetched with a full list."""
+    # Every second voucher of the simulator is used up
+    assert len(simulator_coordinator.vouchers) == 10
+    assert _voucher_list_requests(simulator, "GET") == 1
+    assert _voucher_list_requests(simulator, "POST") == 0
+
+
+@pytest.mark.parametrize(
+    "simulator_config",
+    [SimulatorConfig(vouchers=2, seed=0)],
+)
+async def test_simulator_login_expiry(
+    simulator_coordinator: UnifiVoucherCoordinator,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that the snapshot is fetched after the controller rejected the session."""
+    # One voucher, one batch request
+    simulator.expire_sessions()
+    _id = simulator_coordinator.latest_voucher_id
+    simulator.use_voucher("default", _id)
+
+    changes = await simulator_coordinator.async_fetch_vouchers(force=True)
+    assert changes.removed == {_id}
+    assert simulator.stats.logins == 2
+    assert simulator.stats.rejected == 1
+
+
+async def test_simulator_fetch_incremental(
+    simulator_coordinator: UnifiVoucherCoordinator,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that the batches of the latest and the used vouchers are fetched incrementally."""
+    # Every voucher of the simulator is a batch of its own
+    _oldest = simulator_coordinator.index.ids_by_create_time()[0]
+    simulator.use_voucher("default", _oldest)
+    await simulator_coordinator.async_fetch_vouchers(force=True)
+    assert _voucher_list_requests(simulator, "GET") == 1
+    assert _voucher_list_requests(simulator, "POST") == FETCH_INCREMENTAL_RECENT_BATCHES
+    # Voucher used up is only found with the next full list
+    assert _oldest in simulator_coordinator.vouchers
+
+    simulator_coordinator._reconcile_time = None
+    changes = await simulator_coordinator.async_fetch_vouchers(force=True)
+    assert _voucher_list_requests(simulator, "GET") == 2
+    assert changes.removed == {_oldest}
+
+
+async def test_simulator_fingerprint(
+    simulator_coordinator: UnifiVoucherCoordinator,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that unchanged responses keep the snapshot without decoding it."""
+    # Incremental fetch, fingerprints of the batches are not known yet
+    await simulator_coordinator.async_fetch_vouchers(force=True)
+    _vouchers = simulator_coordinator.vouchers
+    _hits = simulator_coordinator.fingerprint_hits
+
+    changes = await simulator_coordinator.async_fetch_vouchers(force=True)
+    assert not changes
+    assert simulator_coordinator.fingerprint_hits == _hits + 1
+    assert simulator_coordinator.vouchers is _vouchers
+
+    _latest = simulator_coordinator.latest_voucher_id
+    simulator.use_voucher("default", _latest)
+    changes = await simulator_coordinator.async_fetch_vouchers(force=True)
+    assert changes.removed == {_latest}
+    assert simulator_coordinator.fingerprint_hits == _hits + 1
+
+
+async def test_simulator_push_messages(
+    simulator_coordinator: UnifiVoucherCoordinator,
+    simulator: ControllerSimulator,
+) -> None:
+    """Test that created and deleted vouchers are applied from the event stream."""
+    simulator_coordinator.async_update_push()
+    await async_wait_for(lambda: simulator_coordinator.push_connected)
+
+    # Created and deleted by another client of the controller
+    await simulator_coordinator.client.request(
+        VoucherCreateRequest.create(
+            number=2,
+            quota=1,
+            expire_number=60,
+            note=DEFAULT_IDENTIFIER_STRING,
+        )
+    )
+    await async_wait_for(lambda: len(simulator_coordinator.vouchers) == 12)
+    _latest = simulator_coordinator.latest_voucher_id
+    assert _latest in simulator.vouchers["default"]
+
+    await simulator_coordinator.client.request(
+        VoucherDeleteRequest.create(
+            obj_id=_latest,
+        )
+    )
+    await async_wait_for(lambda: _latest not in simulator_coordinator.vouchers)
+    assert len(simulator_coordinator.vouchers) == 11
+    assert _voucher_list_requests(simulator, "GET") == 1
+
+
+@pytest.mark.parametrize(
+    "simulator_config",
+    [SimulatorConfig(vouchers=2, seed=0)],
+)
+async def test_simulator_breaker_opens(
+    simulator_coordinator: UnifiVoucherCoordinator,
+    simulator: ControllerSimulator,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that the circuit opens with a failing controller and the snapshot is kept."""
+    # One voucher, one batch request per refresh
+    # Every refresh fetches
+    monkeypatch.setattr(coordinator_module, "FETCH_FRESHNESS", 0)
+    _vouchers = dict(simulator_coordinator.vouchers)
+    breaker = simulator_coordinator.client.connection.breaker
+    simulator.config.error_rate = 1.0
+    for _ in range(breaker.failure_threshold):
+        await simulator_coordinator.async_refresh()
+        assert not simulator_coordinator.last_update_success
+    assert breaker.state == BREAKER_OPEN
+    assert simulator.stats.errors == breaker.failure_threshold
+
+    # Refresh fails without a request while the circuit is open
+    await simulator_coordinator.async_refresh()
+    assert not simulator_coordinator.last_update_success
+    assert simulator.stats.errors == breaker.failure_threshold
+    assert simulator_coordinator.vouchers == _vouchers
@@ -0,0 +1,232 @@
+"""Tests for the voucher records, change sets and indexes."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import (
+    datetime,
+    timedelta,
+)
+
+from aiounifi.models.voucher import Voucher
+
+from custom_components.unifi_voucher.const import DEFAULT_IDENTIFIER_STRING
+from custom_components.unifi_voucher.models import (
+    UnifiVoucherChangeSet,
+    VoucherIndex,
+    VoucherRecord,
+)
+
+from .conftest import CREATE_TIME
+
+
+def test_change_set() -> None:
+    """Test that a change set is true only with changes."""
+    assert not UnifiVoucherChangeSet()
+    assert UnifiVoucherChangeSet(added={"a"})
+    assert UnifiVoucherChangeSet(removed={"a"})
+    assert UnifiVoucherChangeSet(changed={"a"})
+
+
+def test_record_from_voucher(
+    raw_voucher: Callable[..., dict[str, any]],
+) -> None:
+    """Test that the record has the fields of the aiounifi voucher."""
+    _raw = raw_voucher(
+        1,
+        note=f"{DEFAULT_IDENTIFIER_STRING}: Lobby",
+        qos_usage_quota=500,
+        start_time=CREATE_TIME + 60,
+        end_time=CREATE_TIME + 86460,
+    )
+    voucher = Voucher(_raw)
+    record = VoucherRecord.from_voucher(voucher)
+
+    assert record.id == voucher.id
+    assert record.code == "00000-00001"
+    assert record.duration == timedelta(hours=24)
+    assert record.create_time == voucher.create_time
+    assert record.start_time == voucher.start_time
+    assert record.end_time == voucher.end_time
+    assert record.qos_usage_quota == 500
+    assert record.note_tag == "Lobby"
+    assert record.status_expires_at is None
+    assert record.status_expires is None
+    assert record == VoucherRecord.from_voucher(Voucher(dict(_raw)))
+    assert record != VoucherRecord.from_voucher(Voucher(dict(_raw, used=1)))
+
+
+def test_record_note_tag(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test note without the default identifier."""
+    assert voucher().note_tag is None
+    assert voucher(note=f"{DEFAULT_IDENTIFIER_STRING}: ").note_tag is None
+    assert voucher(note=f"{DEFAULT_IDENTIFIER_STRING}: Guest 1").note_tag == "Guest 1"
+
+
+def test_record_status_expires(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that the status expiry is absolute from the fetch time."""
+    _fetch_time = datetime.now() - timedelta(minutes=20)
+    record = voucher(status_expires=3600, fetch_time=_fetch_time)
+
+    assert record.status_expires_at == _fetch_time + timedelta(hours=1)
+    assert timedelta(minutes=39) < record.status_expires <= timedelta(minutes=40)
+    assert record.as_service_dict()["status_expires"] == 0
+    # Fetched a second later, the record is unchanged
+    assert record == voucher(status_expires=3600, fetch_time=_fetch_time + timedelta(seconds=1))
+
+    expired = voucher(status_expires=600, fetch_time=_fetch_time)
+    assert expired.status_expires is None
+    assert "status_expires" not in expired.as_service_dict()
+
+
+def test_record_storage(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that records are restored from the snapshot storage."""
+    record = voucher(
+        2,
+        note=f"{DEFAULT_IDENTIFIER_STRING}: Lobby",
+        used=1,
+        start_time=CREATE_TIME + 60,
+        end_time=CREATE_TIME + 86460,
+        status="USED_MULTIPLE",
+        status_expires=3600,
+    )
+    restored = VoucherRecord.from_storage_dict(record.as_storage_dict())
+
+    assert restored == record
+    assert restored.status_expires_at == record.status_expires_at
+    assert restored.as_service_dict() == record.as_service_dict()
+
+
+def test_record_storage_legacy(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that snapshots with the seconds left are restored relative to the last poll."""
+    _last_pull = datetime.now() - timedelta(minutes=10)
+    _data = voucher(status_expires=3600).as_storage_dict()
+    del _data["status_expires_at"]
+    _data["status_expires"] = 3600.0
+
+    assert VoucherRecord.from_storage_dict(_data, _last_pull).status_expires_at == _last_pull + timedelta(hours=1)
+    assert VoucherRecord.from_storage_dict(_data).status_expires_at is None
+
+
+def test_index(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test the secondary indexes of a snapshot."""
+    _vouchers = {
+        _v.id: _v
+        for _v in (
+            voucher(0, create_time=CREATE_TIME),
+            voucher(1, create_time=CREATE_TIME + 100, note=f"{DEFAULT_IDENTIFIER_STRING}: Lobby"),
+            voucher(2, create_time=CREATE_TIME + 100, status="USED_MULTIPLE"),
+        )
+    }
+    index = VoucherIndex()
+    assert index.latest_id is None
+
+    index.rebuild(_vouchers)
+    _ids = list(_vouchers)
+    assert index.ids_by_create_time() == _ids
+    assert index.latest_id == _ids[2]
+    assert index.create_timestamps() == [CREATE_TIME, CREATE_TIME + 100]
+    assert index.id_by_code("00000-00001") == _ids[1]
+    assert index.id_by_code("99999-99999") is None
+    assert index.ids_by_status("VALID_ONE") == {_ids[0], _ids[1]}
+    assert index.ids_by_note_tag("Lobby") == {_ids[1]}
+    assert index.ids_by_note_tag("Unknown") == set()
+
+
+def test_index_update(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that the indexes follow the changes between two snapshots."""
+    _previous = {
+        _v.id: _v
+        for _v in (
+            voucher(0),
+            voucher(1, note=f"{DEFAULT_IDENTIFIER_STRING}: Lobby"),
+        )
+    }
+    index = VoucherIndex()
+    index.rebuild(_previous)
+
+    _changed = voucher(1, status="USED_MULTIPLE", used=1)
+    _added = voucher(2, create_time=CREATE_TIME + 100)
+    _vouchers = {
+        _changed.id: _changed,
+        _added.id: _added,
+    }
+    index.update(
+        _previous,
+        _vouchers,
+        UnifiVoucherChangeSet(
+            added={_added.id},
+            removed={voucher(0).id},
+            changed={_changed.id},
+        ),
+    )
+
+    assert index.ids_by_create_time() == [_changed.id, _added.id]
+    assert index.latest_id == _added.id
+    assert index.id_by_code("00000-00000") is None
+    assert index.ids_by_status("VALID_ONE") == {_added.id}
+    assert index.ids_by_status("USED_MULTIPLE") == {_changed.id}
+    # Changed record without note tag
+    assert index.ids_by_note_tag("Lobby") == set()
+
+    index.remove(_added)
+    index.remove(_added)
+    assert index.ids_by_create_time() == [_changed.id]
+    assert index.ids_by_status("VALID_ONE") == set()
+
+
+def test_record_in_use_and_deadlines(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test the usage and the deadlines of a record."""
+    _fetch_time = datetime.fromtimestamp(CREATE_TIME)
+    record = voucher(fetch_time=_fetch_time)
+    assert not record.in_use
+    assert record.deadlines == ()
+
+    assert voucher(used=1).in_use
+    record = voucher(
+        fetch_time=_fetch_time,
+        start_time=CREATE_TIME + 60,
+        end_time=CREATE_TIME + 86460,
+        status_expires=600,
+    )
+    assert record.in_use
+    assert record.deadlines == (CREATE_TIME + 86460, CREATE_TIME + 600)
+
+
+def test_index_deadlines(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that the next deadline follows the indexed vouchers."""
+    _fetch_time = datetime.fromtimestamp(CREATE_TIME)
+    _first = voucher(0, fetch_time=_fetch_time, status_expires=600)
+    _second = voucher(1, fetch_time=_fetch_time, start_time=CREATE_TIME, end_time=CREATE_TIME + 300)
+    index = VoucherIndex()
+    index.rebuild({_first.id: _first})
+    assert not index.in_use
+    assert index.next_deadline(CREATE_TIME) == CREATE_TIME + 600
+
+    index.add(_second)
+    assert index.in_use
+    assert index.next_deadline(CREATE_TIME) == CREATE_TIME + 300
+
+    # Deadlines of removed vouchers and deadlines reached are dropped
+    index.remove(_second)
+    assert not index.in_use
+    assert index.next_deadline(CREATE_TIME) == CREATE_TIME + 600
+    assert index.next_deadline(CREATE_TIME + 600) is None
+
+    index.remove(_first)
+    assert index.next_deadline(CREATE_TIME) is None
@@ -0,0 +1,113 @@
+"""Tests for the QR code requests and the QR code cache."""
+from __future__ import annotations
+
+import os
+
+from pathlib import Path
+
+import pytest
+
+from PIL import Image
+
+from custom_components.unifi_voucher.qrcode import (
+    QrCodeRequest,
+    UnifiVoucherQrCodeCache,
+)
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture(name="logo_path")
+def logo_path_fixture(
+    tmp_path: Path,
+) -> str:
+    """Return path of a logo file."""
+    _path = tmp_path / "logo.png"
+    Image.new("RGBA", (64, 32), (0, 128, 255, 255)).save(_path)
+    return str(_path)
+
+
+def test_digest() -> None:
+    """Test that every parameter changes the digest."""
+    request = QrCodeRequest("12345-67890")
+    assert request.digest(None) == QrCodeRequest("12345-67890").digest(None)
+    assert len(request.digest(None)) == 16
+
+    _digests = {
+        request.digest(None),
+        QrCodeRequest("12345-67891").digest(None),
+        QrCodeRequest("12345-67890", error="m").digest(None),
+        QrCodeRequest("12345-67890", scale=6).digest(None),
+        QrCodeRequest("12345-67890", kind="svg").digest(None),
+        request.digest((1, 100)),
+    }
+    assert len(_digests) == 6
+
+
+def test_digest_logo(
+    logo_path: str,
+) -> None:
+    """Test that the logo is part of the digest only if the file exists."""
+    request = QrCodeRequest("12345-67890", logo_path=logo_path)
+    _logo_stat = request.logo_stat()
+    _stat = os.stat(logo_path)
+    assert _logo_stat == (_stat.st_mtime_ns, _stat.st_size)
+    assert request.digest(_logo_stat) != QrCodeRequest("12345-67890").digest(None)
+
+    # A missing logo renders the QR code without logo
+    missing = QrCodeRequest("12345-67890", logo_path=f"{logo_path}.missing")
+    assert missing.logo_stat() is None
+    assert missing.digest(None) == QrCodeRequest("12345-67890").digest(None)
+
+    # A replaced logo file changes the digest
+    os.utime(logo_path, ns=(_stat.st_atime_ns, _stat.st_mtime_ns + 1_000_000_000))
+    assert request.digest(request.logo_stat()) != request.digest(_logo_stat)
+
+
+def test_cache_render() -> None:
+    """Test that rendered QR codes are cached."""
+    cache = UnifiVoucherQrCodeCache(maxsize=2)
+    _png = cache.render(QrCodeRequest("12345-67890"))
+    assert _png.startswith(PNG_SIGNATURE)
+    assert cache.render(QrCodeRequest("12345-67890")) is _png
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    _svg = cache.render(QrCodeRequest("12345-67890", kind="svg"))
+    assert b"<svg" in _svg
+    assert cache.as_dict()["size"] == 2
+
+
+def test_cache_eviction() -> None:
+    """Test that the least recently used QR code is evicted."""
+    cache = UnifiVoucherQrCodeCache(maxsize=2)
+    cache.render(QrCodeRequest("a"))
+    cache.render(QrCodeRequest("b"))
+    cache.render(QrCodeRequest("a"))
+    cache.render(QrCodeRequest("c"))
+    assert cache.evictions == 1
+
+    # b was evicted, a is still cached
+    cache.render(QrCodeRequest("a"))
+    cache.render(QrCodeRequest("b"))
+    _x = cache.as_dict()
+    assert (_x["hits"], _x["misses"]) == (2, 4)
+    assert _x["size"] == 2
+    assert _x["hit_ratio"] == round(2 / 6, 3)
+
+
+def test_cache_logo(
+    logo_path: str,
+) -> None:
+    """Test that the logo is decoded once and part of the cache key."""
+    cache = UnifiVoucherQrCodeCache()
+    _plain = cache.render(QrCodeRequest("12345-67890"))
+    _logo = cache.render(QrCodeRequest("12345-67890", logo_path=logo_path))
+    assert _logo != _plain
+    cache.render(QrCodeRequest("12345-67891", logo_path=logo_path))
+    assert (cache.logo_hits, cache.logo_misses) == (1, 1)
+
+    cache.clear(logos=False)
+    assert cache.as_dict()["size"] == 0
+    assert cache.as_dict()["logos"] == 1
+    cache.clear()
+    assert cache.as_dict()["logos"] == 0
@@ -0,0 +1,151 @@
+"""Tests for the printable voucher sheets."""
+from __future__ import annotations
+
+import zlib
+
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from PIL import PdfParser
+
+from custom_components.unifi_voucher.const import DEFAULT_IDENTIFIER_STRING
+from custom_components.unifi_voucher.models import VoucherRecord
+from custom_components.unifi_voucher.qrcode import UnifiVoucherQrCodeCache
+from custom_components.unifi_voucher.sheet import (
+    SHEET_SIZE,
+    SHEET_VOUCHERS_PER_PAGE,
+    SheetVoucher,
+    UnifiVoucherSheet,
+    get_page,
+    get_page_count,
+)
+
+
+def test_sheet_voucher_from_record(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test text lines of a voucher card."""
+    card = SheetVoucher.from_record(
+        voucher(
+            note=f"{DEFAULT_IDENTIFIER_STRING}: Lobby",
+            duration=1500.0,
+            quota=0,
+            qos_usage_quota=500,
+            qos_rate_max_up=1000,
+            qos_rate_max_down=2000,
+        ),
+        qrcode=b"png",
+    )
+    assert card.code == "00000-00000"
+    assert card.qrcode == b"png"
+    assert card.lines == (
+        "Duration: 1 d, 1 h",
+        "Quota: unlimited",
+        "Usage quota: 500 MB",
+        "Upload: 1000 kbit/s",
+        "Download: 2000 kbit/s",
+        "Lobby",
+    )
+
+
+def test_sheet_voucher_minimal(
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that unset limits and notes are left out."""
+    card = SheetVoucher.from_record(voucher(duration=90.0, quota=3))
+    assert card.lines == (
+        "Duration: 1 h, 30 min",
+        "Quota: 3",
+    )
+    assert card.qrcode is None
+
+
+@pytest.mark.parametrize(
+    ("count", "pages"),
+    [
+        (0, 1),
+        (1, 1),
+        (SHEET_VOUCHERS_PER_PAGE, 1),
+        (SHEET_VOUCHERS_PER_PAGE + 1, 2),
+        (5 * SHEET_VOUCHERS_PER_PAGE, 5),
+    ],
+)
+def test_page_count(
+    count: int,
+    pages: int,
+) -> None:
+    """Test number of pages, an empty sheet has one page."""
+    assert get_page_count(count) == pages
+
+
+def test_get_page() -> None:
+    """Test that every voucher is on exactly one page."""
+    _vouchers = list(range(2 * SHEET_VOUCHERS_PER_PAGE + 3))
+    _pages = [
+        get_page(_vouchers, _page)
+        for _page in range(1, get_page_count(len(_vouchers)) + 1)
+    ]
+    assert [len(_page) for _page in _pages] == [SHEET_VOUCHERS_PER_PAGE, SHEET_VOUCHERS_PER_PAGE, 3]
+    assert [_voucher for _page in _pages for _voucher in _page] == _vouchers
+    assert get_page([], 1) == []
+
+
+def test_write_pdf(
+    tmp_path: Path,
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that the PDF is written page by page with lossless images."""
+    cache = UnifiVoucherQrCodeCache()
+    sheet = UnifiVoucherSheet(
+        path=str(tmp_path / "sheets" / "test"),
+        kind="pdf",
+        title="Guest",
+        pages=2,
+    )
+    sheet.open(cache)
+    sheet.write_page(1, [SheetVoucher.from_record(voucher(_i)) for _i in range(SHEET_VOUCHERS_PER_PAGE)])
+    _file = sheet.write_page(2, [SheetVoucher.from_record(voucher(SHEET_VOUCHERS_PER_PAGE))])
+    sheet.close()
+    assert sheet.files == [_file]
+    assert _file == str(tmp_path / "sheets" / "test.pdf")
+
+    pdf = PdfParser.PdfParser(_file)
+    assert len(pdf.pages) == 2
+    _page = pdf.read_indirect(pdf.pages[0])
+    _image = pdf.read_indirect(_page[b"Resources"][b"XObject"][b"Im0"])
+    assert _image.dictionary[b"Filter"] == PdfParser.PdfName(b"FlateDecode")
+    assert _image.dictionary[b"ColorSpace"] == PdfParser.PdfName(b"DeviceGray")
+    assert len(zlib.decompress(_image.buf)) == SHEET_SIZE[0] * SHEET_SIZE[1]
+    pdf.close()
+
+
+def test_write_png_and_remove(
+    tmp_path: Path,
+    voucher: Callable[..., VoucherRecord],
+) -> None:
+    """Test that PNG pages are written once and removed on failure."""
+    sheet = UnifiVoucherSheet(
+        path=str(tmp_path / "test"),
+        kind="png",
+        title="Guest",
+        pages=2,
+    )
+    sheet.open(UnifiVoucherQrCodeCache())
+    _files = [
+        sheet.write_page(_page, [SheetVoucher.from_record(voucher(_page))])
+        for _page in (1, 2)
+    ]
+    assert _files == [str(tmp_path / "test.001.png"), str(tmp_path / "test.002.png")]
+    assert all(Path(_file).exists() for _file in _files)
+
+    # Files of another call are never overwritten
+    other = UnifiVoucherSheet(path=str(tmp_path / "test"), kind="png", title="Guest", pages=1)
+    other.open(UnifiVoucherQrCodeCache())
+    with pytest.raises(FileExistsError):
+        other.write_page(1, [])
+
+    sheet.remove()
+    assert sheet.files == []
+    assert not any(Path(_file).exists() for _file in _files)